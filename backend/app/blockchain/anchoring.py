@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.blockchain import merkle
+from app.blockchain.smart_contract import BlockchainService
+from app.config.db import get_database
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Outbox of registrations waiting to be anchored, drained by the background worker
+ANCHOR_OUTBOX_COLLECTION = "anchor_outbox"
+# One record per anchored batch (root and transaction) and one per document (leaf and proof)
+ANCHOR_BATCHES_COLLECTION = "anchor_batches"
+DOCUMENT_ANCHORS_COLLECTION = "document_anchors"
+# Lease naming the single process allowed to send anchoring transactions
+WORKER_LEASES_COLLECTION = "worker_leases"
+_LEASE_ID = "document_anchoring"
+# How long an anchoring result waits for its listing entry to be written
+LISTING_SYNC_TIMEOUT = timedelta(hours=1)
+
+
+def anchor_leaf(document_hash: str, owner_id: str, document_id: str, timestamp: str) -> str:
+    """
+    Leaf value for a document: its hash bound to owner, id and registration time
+    (the value previously sent on chain for each document)
+    """
+    return hashlib.sha256(f"{document_hash}|{owner_id}|{document_id}|{timestamp}".encode()).hexdigest()
+
+
+class DocumentAnchoringService:
+    """
+    Anchors document hashes on chain in batches, through a Mongo-backed outbox.
+
+    register_document only records a pending registration, so uploads never
+    wait for the chain. A background worker collects due registrations every
+    ANCHOR_BATCH_WINDOW_MS (up to ANCHOR_MAX_BATCH_SIZE at a time), builds a
+    Merkle tree over them and sends only its root, in one transaction. Every
+    document then receives an inclusion proof, stored in document_anchors and
+    copied onto its listing entry.
+
+    Only the process holding the worker lease sends transactions, so its local
+    nonce allocator is the only one in use for the account. A batch is anchored
+    once its transaction has a successful receipt; a failed or unconfirmed batch
+    is retried with exponential backoff; registrations that keep failing are
+    marked failed after ANCHOR_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, window_ms: int, max_batch_size: int, retry_base_seconds: int, retry_max_seconds: int,
+                 max_attempts: int, lease_seconds: int, receipt_timeout_seconds: int):
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.max_attempts = max_attempts
+        self.receipt_timeout_seconds = receipt_timeout_seconds
+        # Leases cover a whole pass, including the wait for the receipt
+        self.lease = timedelta(seconds=lease_seconds + receipt_timeout_seconds)
+        self._worker_id = str(uuid.uuid4())
+        self._task: Optional[asyncio.Task] = None
+        self._blockchain: Optional[BlockchainService] = None
+
+        # Metrics
+        self.enqueued = 0
+        self.documents = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.failed_documents = 0
+        self.max_batch = 0
+        self.last_error: Optional[str] = None
+
+    async def _get_blockchain(self) -> BlockchainService:
+        # Connects on first use, so importing this module never touches the network
+        if self._blockchain is None:
+            self._blockchain = await BlockchainService.create()
+        return self._blockchain
+
+    async def register_document(self, document_hash: str, owner_id: str, document_id: str, timestamp: str) -> Dict[str, Any]:
+        """
+        Record a document for anchoring and return at once
+
+        :return: {'status': 'pending', 'leaf'}; the transaction and proof follow once its batch is sent
+        """
+        leaf = anchor_leaf(document_hash, owner_id, document_id, timestamp)
+        now = datetime.utcnow()
+        db = await get_database()
+        await db[ANCHOR_OUTBOX_COLLECTION].insert_one({
+            "_id": document_id,
+            "leaf": leaf,
+            "document_hash": document_hash,
+            "owner_id": owner_id,
+            "timestamp": timestamp,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        })
+        self.enqueued += 1
+        return {"status": "pending", "leaf": leaf}
+
+    async def _acquire_lease(self, db) -> bool:
+        now = datetime.utcnow()
+        try:
+            await db[WORKER_LEASES_COLLECTION].find_one_and_update(
+                {"_id": _LEASE_ID, "$or": [{"owner": self._worker_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self._worker_id, "expires_at": now + self.lease}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Another process holds a live lease
+            return False
+        return True
+
+    async def drain_once(self) -> int:
+        """
+        Anchor one batch of due registrations, returning how many were attempted
+        """
+        db = await get_database()
+        if not await self._acquire_lease(db):
+            return 0
+        attempted = await self._anchor_due(db)
+        await self._sync_listings(db)
+        return attempted
+
+    async def _anchor_due(self, db) -> int:
+        outbox = db[ANCHOR_OUTBOX_COLLECTION]
+        now = datetime.utcnow()
+        due = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            # Claimed by a sender that stopped before finishing
+            {"status": "sending", "lease_until": {"$lt": now}}
+        ]}
+        items = await outbox.find(due).sort("created_at", 1).limit(self.max_batch_size).to_list(length=self.max_batch_size)
+        if not items:
+            return 0
+
+        ids = [item["_id"] for item in items]
+        await outbox.update_many({"_id": {"$in": ids}}, {"$set": {"status": "sending", "lease_until": now + self.lease}})
+
+        try:
+            levels = merkle.build_tree([item["leaf"] for item in items])
+            root = merkle.root_of(levels)
+            blockchain = await self._get_blockchain()
+            tx_hash = await blockchain.store_document_hash(root)
+            await blockchain.wait_for_receipt(tx_hash, self.receipt_timeout_seconds)
+        except Exception as e:
+            await self._schedule_retry(db, items, e)
+            return len(items)
+
+        batch_id = str(uuid.uuid4())
+        anchored_at = datetime.utcnow()
+        anchors = [{
+            "_id": item["_id"],
+            "document_hash": item["document_hash"],
+            "owner_id": item["owner_id"],
+            "timestamp": item["timestamp"],
+            "leaf": item["leaf"],
+            "merkle_root": root,
+            "merkle_proof": merkle.inclusion_proof(levels, index),
+            "tx_hash": tx_hash,
+            "batch_id": batch_id,
+            "anchored_at": anchored_at
+        } for index, item in enumerate(items)]
+
+        await db[ANCHOR_BATCHES_COLLECTION].insert_one({
+            "_id": batch_id,
+            "merkle_root": root,
+            "tx_hash": tx_hash,
+            "leaf_count": len(items),
+            "anchored_at": anchored_at
+        })
+        await db[DOCUMENT_ANCHORS_COLLECTION].bulk_write(
+            [ReplaceOne({"_id": anchor["_id"]}, anchor, upsert=True) for anchor in anchors], ordered=False
+        )
+        await outbox.bulk_write([
+            UpdateOne({"_id": anchor["_id"]}, {
+                "$set": {"status": "anchored", "tx_hash": tx_hash, "batch_id": batch_id, "anchored_at": anchored_at,
+                         "merkle_root": root, "merkle_proof": anchor["merkle_proof"], "listing_synced": False},
+                "$unset": {"lease_until": ""}
+            }) for anchor in anchors
+        ], ordered=False)
+
+        self.batches += 1
+        self.documents += len(items)
+        self.max_batch = max(self.max_batch, len(items))
+        logger.info(f"Anchored {len(items)} documents under root {root} in {tx_hash}")
+        return len(items)
+
+    async def _schedule_retry(self, db, items: List[dict], error: Exception):
+        """
+        Put a failed batch back in the outbox with exponential backoff
+        """
+        self.failed_batches += 1
+        self.last_error = str(error)
+        logger.error(f"Failed to anchor batch of {len(items)} documents: {str(error)}")
+
+        now = datetime.utcnow()
+        updates = []
+        for item in items:
+            attempts = item.get("attempts", 0) + 1
+            if attempts >= self.max_attempts:
+                self.failed_documents += 1
+                update = {"status": "failed", "attempts": attempts, "last_error": str(error), "listing_synced": False}
+            else:
+                delay = min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+                update = {"status": "pending", "attempts": attempts, "last_error": str(error),
+                          "next_attempt_at": now + timedelta(seconds=delay)}
+            updates.append(UpdateOne({"_id": item["_id"]}, {"$set": update}))
+        await db[ANCHOR_OUTBOX_COLLECTION].bulk_write(updates, ordered=False)
+
+    async def _sync_listings(self, db):
+        """
+        Copy final anchoring results onto the listing entries.
+
+        Registration starts while the listing is still being uploaded, so its
+        entry may not exist yet when the batch is sent; unsynced results are
+        retried on later passes until the entry appears or LISTING_SYNC_TIMEOUT passes.
+        """
+        outbox = db[ANCHOR_OUTBOX_COLLECTION]
+        items = await outbox.find({"listing_synced": False}).limit(self.max_batch_size).to_list(length=self.max_batch_size)
+        if not items:
+            return
+
+        expired_before = datetime.utcnow() - LISTING_SYNC_TIMEOUT
+        synced = []
+        for item in items:
+            fields = {"documents.$.blockchain_status": item["status"]}
+            if item["status"] == "anchored":
+                fields.update({
+                    "documents.$.blockchain_tx_hash": item["tx_hash"],
+                    "documents.$.merkle_root": item["merkle_root"],
+                    "documents.$.merkle_proof": item["merkle_proof"]
+                })
+            result = await db["properties"].update_one({"documents.document_id": item["_id"]}, {"$set": fields})
+            # Listings whose upload failed never appear
+            if result.matched_count or item["created_at"] < expired_before:
+                synced.append(item["_id"])
+
+        if synced:
+            await outbox.update_many({"_id": {"$in": synced}}, {"$set": {"listing_synced": True}})
+
+    async def _run(self):
+        while True:
+            try:
+                drained = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Anchoring worker pass failed: {str(e)}")
+                drained = 0
+            # Keep going straight away while full batches are waiting
+            if drained < self.max_batch_size:
+                await asyncio.sleep(self.window_seconds)
+
+    def start(self):
+        """Start the outbox worker. Called from the application lifespan."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """Stop the worker and give up the sender lease so another process can take over at once"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        db = await get_database()
+        await db[WORKER_LEASES_COLLECTION].delete_one({"_id": _LEASE_ID, "owner": self._worker_id})
+
+    async def verify_document(self, document_id: str, document_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Check a document hash against its stored inclusion proof, and the root
+        against the data of the anchoring transaction. Returns None for unknown documents.
+        """
+        db = await get_database()
+        anchor = await db[DOCUMENT_ANCHORS_COLLECTION].find_one({"_id": document_id})
+        if anchor is None:
+            registration = await db[ANCHOR_OUTBOX_COLLECTION].find_one({"_id": document_id})
+            if registration is None:
+                return None
+            return {"document_id": document_id, "status": registration["status"], "valid": None}
+
+        leaf = anchor_leaf(document_hash, anchor["owner_id"], document_id, anchor["timestamp"])
+        proof_valid = leaf == anchor["leaf"] and merkle.verify_proof(leaf, anchor["merkle_proof"], anchor["merkle_root"])
+
+        root_on_chain = None
+        try:
+            blockchain = await self._get_blockchain()
+            root_on_chain = await blockchain.get_stored_hash(anchor["tx_hash"]) == anchor["merkle_root"]
+        except Exception as e:
+            logger.warning(f"Could not read anchoring transaction {anchor['tx_hash']}: {str(e)}")
+
+        return {
+            "document_id": document_id,
+            "status": "anchored",
+            "valid": proof_valid and root_on_chain is not False,
+            "proof_valid": proof_valid,
+            "root_on_chain": root_on_chain,
+            "merkle_root": anchor["merkle_root"],
+            "merkle_proof": anchor["merkle_proof"],
+            "tx_hash": anchor["tx_hash"],
+            "anchored_at": anchor["anchored_at"].isoformat()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window_seconds,
+            "max_batch_size": self.max_batch_size,
+            "worker_running": self._task is not None,
+            "enqueued": self.enqueued,
+            "documents": self.documents,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "failed_documents": self.failed_documents,
+            "max_batch": self.max_batch,
+            "documents_per_transaction": (self.documents / self.batches) if self.batches else None,
+            "last_error": self.last_error
+        }
+
+
+# Singleton instance; the worker is started by the application lifespan
+document_anchoring = DocumentAnchoringService(
+    window_ms=settings.ANCHOR_BATCH_WINDOW_MS,
+    max_batch_size=settings.ANCHOR_MAX_BATCH_SIZE,
+    retry_base_seconds=settings.ANCHOR_RETRY_BASE_SECONDS,
+    retry_max_seconds=settings.ANCHOR_RETRY_MAX_SECONDS,
+    max_attempts=settings.ANCHOR_MAX_ATTEMPTS,
+    lease_seconds=settings.ANCHOR_LEASE_SECONDS,
+    receipt_timeout_seconds=settings.ANCHOR_RECEIPT_TIMEOUT_SECONDS
+)
@@ -0,0 +1,70 @@
+import hashlib
+from typing import Dict, List
+
+# Leaves and interior nodes are hashed with different prefixes, so an interior
+# node can never be presented as a leaf (second-preimage protection)
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def leaf_hash(value_hex: str) -> bytes:
+    return hashlib.sha256(_LEAF_PREFIX + bytes.fromhex(value_hex)).digest()
+
+
+def _node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(_NODE_PREFIX + left + right).digest()
+
+
+def build_tree(values_hex: List[str]) -> List[List[bytes]]:
+    """
+    Build a Merkle tree over hex-encoded hashes, returning every level from the
+    leaves up to the root. An unpaired node is carried up unchanged rather than
+    duplicated, so no two different leaf lists share a root.
+    """
+    if not values_hex:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+
+    levels = [[leaf_hash(value) for value in values_hex]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [_node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def root_of(levels: List[List[bytes]]) -> str:
+    return levels[-1][0].hex()
+
+
+def inclusion_proof(levels: List[List[bytes]], index: int) -> List[Dict[str, str]]:
+    """
+    Sibling hashes from leaf index up to the root, each with the side it sits on
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"position": "left" if sibling < index else "right", "hash": level[sibling].hex()})
+        index //= 2
+    return proof
+
+
+def verify_proof(value_hex: str, proof: List[Dict[str, str]], root_hex: str) -> bool:
+    """
+    Check that value_hex is a leaf of the tree with root root_hex
+    """
+    try:
+        node = leaf_hash(value_hex)
+        for step in proof:
+            sibling = bytes.fromhex(step["hash"])
+            if step["position"] == "left":
+                node = _node_hash(sibling, node)
+            elif step["position"] == "right":
+                node = _node_hash(node, sibling)
+            else:
+                return False
+    except (KeyError, TypeError, ValueError):
+        return False
+    return node.hex() == root_hex
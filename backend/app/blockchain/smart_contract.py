@@ -1,35 +1,92 @@
 import asyncio
 import os
 import json
+import time
+from typing import Optional
 from web3 import Web3
 import logging
 import traceback
 import hashlib
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+class NonceAllocator:
+    """
+    Hands out transaction nonces locally, so concurrent sends never race on
+    get_transaction_count. Synced from the chain's pending count on first use
+    and again after any failed send, since a failure may or may not have
+    consumed its nonce.
+    """
+    def __init__(self, w3: Web3, address: str):
+        self._w3 = w3
+        self._address = address
+        self._next: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    async def allocate(self) -> int:
+        async with self._lock:
+            if self._next is None:
+                loop = asyncio.get_event_loop()
+                self._next = await loop.run_in_executor(None, self._w3.eth.get_transaction_count, self._address, 'pending')
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def reset(self):
+        self._next = None
+
+class GasPriceCache:
+    """
+    Gas price fetched at most once per refresh interval
+    """
+    def __init__(self, w3: Web3, refresh_seconds: int):
+        self._w3 = w3
+        self.refresh_seconds = refresh_seconds
+        self._value: Optional[int] = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> int:
+        async with self._lock:
+            if self._value is None or time.monotonic() - self._fetched_at >= self.refresh_seconds:
+                loop = asyncio.get_event_loop()
+                self._value = await loop.run_in_executor(None, lambda: self._w3.eth.gas_price)
+                self._fetched_at = time.monotonic()
+            return self._value
+
 class BlockchainService:
     @classmethod
     async def create(cls):
-        """Factory method to create a BlockchainService instance"""
+        """
+        Factory method to create a BlockchainService instance
+        
+        The connection check is a network round trip, so it runs in a worker thread
+        """
         instance = cls()
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, instance._check_connection)
         return instance
 
     def __init__(self):
+        provider = settings.BLOCKCHAIN_PROVIDER.lower()
+        if provider == "tester":
+            self._init_tester()
+        else:
+            self._init_http()
+        
+        self.w3.eth.default_account = self._account.address
+        self.nonces = NonceAllocator(self.w3, self._account.address)
+        self.gas_price = GasPriceCache(self.w3, settings.GAS_PRICE_REFRESH_SECONDS)
+
+    def _init_http(self):
         infura_url = os.getenv('INFURA_URL')
         if not infura_url:
             raise ValueError("INFURA_URL environment variable not set")
 
-        try:
-            self.w3 = Web3(Web3.HTTPProvider(infura_url))
-            if not self.w3.is_connected():
-                raise ConnectionError("Failed to connect to Ethereum network")
-
-            logger.info(f"Connected to Ethereum network: {infura_url}")
-        except Exception as e:
-            logger.error(f"Failed to connect to Ethereum network: {e}")
-            raise
+        self.provider_url = infura_url
+        self.w3 = Web3(Web3.HTTPProvider(infura_url))
 
         self.contract_address = os.getenv('CONTRACT_ADDRESS')
         if not self.contract_address or not Web3.is_address(self.contract_address):
@@ -42,14 +99,44 @@ class BlockchainService:
         if not private_key:
             raise ValueError("Ethereum private key not found in environment variables")
 
-        account = self.w3.eth.account.from_key(private_key)
-        self.w3.eth.default_account = account.address
-        self._account = account
+        self._account = self.w3.eth.account.from_key(private_key)
+
+    def _init_tester(self):
+        """
+        In-process EVM (eth-tester) for local development and exercising the
+        anchoring worker without a network. Needs the optional eth-tester package.
+        """
+        try:
+            from web3 import EthereumTesterProvider
+        except ImportError:
+            raise ValueError("BLOCKCHAIN_PROVIDER=tester requires the eth-tester package (pip install eth-tester[py-evm])")
+
+        self.provider_url = "eth-tester"
+        self.w3 = Web3(EthereumTesterProvider())
+        funded, recipient = self.w3.eth.accounts[0], self.w3.eth.accounts[1]
+
+        # Send from a key-backed account so transactions are signed exactly as on a real network
+        self._account = self.w3.eth.account.create()
+        self.w3.eth.send_transaction({'from': funded, 'to': self._account.address, 'value': 10 ** 20})
+        self.contract_address = recipient
+
+    def _check_connection(self):
+        try:
+            if not self.w3.is_connected():
+                raise ConnectionError("Failed to connect to Ethereum network")
+
+            logger.info(f"Connected to Ethereum network: {self.provider_url}")
+        except Exception as e:
+            logger.error(f"Failed to connect to Ethereum network: {e}")
+            raise
 
     async def store_document_hash(self, document_hash: str) -> str:
         """
         Asynchronously store a document hash on the blockchain
         
+        The nonce comes from the local allocator and the gas price from the cache,
+        so only signing and the send itself run per transaction.
+        
         :param document_hash: SHA-256 hash of the document
         :return: Transaction hash if successful
         """
@@ -63,37 +150,26 @@ class BlockchainService:
                 logger.error(f"Invalid document hash format: {document_hash}")
                 raise ValueError("Document hash must be a 64-character hexadecimal string")
 
-            # Prepare transaction
-            def prepare_transaction():
-                nonce = self.w3.eth.get_transaction_count(self._account.address)
-                gas_price = self.w3.eth.gas_price
-                
-                transaction = {
-                    'nonce': nonce,
-                    'to': self.contract_address,
-                    'value': 0,
-                    'gas': 100000,  # Adjust as needed
-                    'gasPrice': gas_price,
-                    'data': document_hash.encode('utf-8')
-                }
-                
-                return transaction
+            transaction = {
+                'nonce': await self.nonces.allocate(),
+                'to': self.contract_address,
+                'value': 0,
+                'gas': 100000,  # Adjust as needed
+                'gasPrice': await self.gas_price.get(),
+                'data': document_hash.encode('utf-8')
+            }
             
-            transaction = await loop.run_in_executor(None, prepare_transaction)
-            
-            # Sign transaction
-            def sign_transaction():
+            # Sign and send transaction
+            def sign_and_send():
                 signed_txn = self._account.sign_transaction(transaction)
-                return signed_txn
-            
-            signed_txn = await loop.run_in_executor(None, sign_transaction)
-            
-            # Send transaction
-            def send_transaction():
-                tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-                return tx_hash
+                return self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
             
-            tx_hash = await loop.run_in_executor(None, send_transaction)
+            try:
+                tx_hash = await loop.run_in_executor(None, sign_and_send)
+            except Exception:
+                # The nonce may or may not have been used; resync before the next send
+                self.nonces.reset()
+                raise
             
             logger.info(f"Document hash stored successfully: {tx_hash.hex()}")
             return tx_hash.hex()
@@ -103,6 +179,38 @@ class BlockchainService:
             logger.error(traceback.format_exc())
             raise
 
+    async def wait_for_receipt(self, tx_hash: str, timeout: int):
+        """
+        Wait until a transaction is mined and check it succeeded
+
+        :param tx_hash: Transaction hash returned by store_document_hash
+        :param timeout: Seconds to wait before giving up
+        :return: The transaction receipt
+        """
+        loop = asyncio.get_event_loop()
+        try:
+            receipt = await loop.run_in_executor(
+                None, lambda: self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+            )
+        except Exception:
+            # Dropped or stuck; resync the nonce from the chain before the next send
+            self.nonces.reset()
+            raise
+        if receipt['status'] != 1:
+            raise RuntimeError(f"Transaction {tx_hash} reverted in block {receipt['blockNumber']}")
+        return receipt
+
+    async def get_stored_hash(self, tx_hash: str) -> str:
+        """
+        Read back the hash sent as data by store_document_hash
+        
+        :param tx_hash: Transaction hash returned by store_document_hash
+        :return: The stored 64-character hash
+        """
+        loop = asyncio.get_event_loop()
+        transaction = await loop.run_in_executor(None, self.w3.eth.get_transaction, tx_hash)
+        return bytes(transaction['input']).decode('utf-8')
+
     async def register_document(self, document_hash: str, owner_id: str, document_id: str, timestamp: str) -> str:
         """
         Register a document on the blockchain with its hash and metadata
@@ -1,61 +1,139 @@
 import os
 from azure.storage.blob.aio import BlobServiceClient
-from azure.storage.blob import generate_blob_sas, BlobSasPermissions, ContentSettings
+from azure.storage.blob import generate_blob_sas, BlobSasPermissions, ContentSettings, BlobBlock
 from datetime import datetime, timedelta
-from azure.core.exceptions import AzureError, ResourceExistsError
+from azure.core import MatchConditions
+from azure.core.exceptions import AzureError, ResourceExistsError, ResourceNotFoundError, ResourceNotModifiedError, HttpResponseError
 from fastapi import HTTPException
 import logging
-import uuid
-import hashlib
 import asyncio
 import urllib.parse
+import base64
+import aiohttp
+from typing import Optional, AsyncIterator, List, Tuple
+from azure.core.pipeline.transport import AioHttpTransport
+from app.core.config import settings
+from app.storage.base import BlobStream, StorageBackend
+from app.storage.cache import CachedBlob, CachedBlobStream, blob_cache
+from app.utils.http_range import is_not_modified, not_modified
+from app.core.concurrency import blob_fetches
 
-class AzureStorageService:
+# Containers already created and configured by this process
+_known_containers = set()
+
+class AzureBlobStream(BlobStream):
+    """
+    Async iterator over a blob download, yielding one bounded chunk at a time.
+    The next chunk is only fetched once the consumer asks for it, so a slow
+    client applies backpressure to the storage download.
+    """
+    def __init__(self, downloader, offset: int = 0):
+        self._downloader = downloader
+        self.size = downloader.size
+        self.properties = downloader.properties
+        self.offset = offset
+        self.total_size = self._parse_total_size(downloader.properties, offset + downloader.size)
+        self.etag = getattr(downloader.properties, 'etag', None)
+        self.last_modified = getattr(downloader.properties, 'last_modified', None)
+        
+    @staticmethod
+    def _parse_total_size(properties, default: int) -> int:
+        # Ranged downloads report the full blob size after the slash in Content-Range
+        content_range = getattr(properties, 'content_range', None)
+        if content_range and '/' in content_range:
+            total = content_range.rsplit('/', 1)[1]
+            if total.isdigit():
+                return int(total)
+        return default
+        
+    @property
+    def content_type(self):
+        content_settings = getattr(self.properties, 'content_settings', None)
+        return content_settings.content_type if content_settings else None
+        
+    async def __aiter__(self):
+        async for chunk in self._downloader.chunks():
+            yield chunk
+
+class AzureStorageService(StorageBackend):
     def __init__(self):
+        # Container names and access policy
+        super().__init__()
+        
         # Azure storage credentials
         self.connection_string = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
         self.account_name = os.getenv('AZURE_STORAGE_ACCOUNT_NAME')
         self.account_key = os.getenv('AZURE_STORAGE_ACCOUNT_KEY')
-        
-        # Container names from environment variables
-        self.container_user_selfies = os.getenv('AZURE_CONTAINER_USER_SELFIES', 'sec-user-kyc-images')
-        self.container_property_docs = os.getenv('AZURE_CONTAINER_PROPERTY_DOCUMENTS', 'sec-property-legal-docs')
-        self.container_property_images = os.getenv('AZURE_CONTAINER_PROPERTY_IMAGES', 'sec-property-verification-images')
-        self.container_secure_docs = os.getenv('AZURE_CONTAINER_SECURE_DOCUMENTS', 'documents')
-        self.container_doc_metadata = os.getenv('AZURE_CONTAINER_DOCUMENT_METADATA', 'document-metadata')
+        self.endpoint_suffix = settings.AZURE_ENDPOINT_SUFFIX
         
         # Security configuration
-        self.public_access = os.getenv('AZURE_CONTAINER_PUBLIC_ACCESS', 'false').lower() == 'true'
         self.encryption_enabled = os.getenv('AZURE_BLOB_ENCRYPTION_ENABLED', 'true').lower() == 'true'
         self.container_policy = os.getenv('AZURE_CONTAINER_DEFAULT_POLICY', 'private')
         
+        # Connection pool configuration
+        self.max_connections = settings.AZURE_POOL_CONNECTIONS
+        self.keepalive_seconds = settings.AZURE_KEEPALIVE_SECONDS
+        self.stream_chunk_size = settings.AZURE_STREAM_CHUNK_SIZE
+        self.upload_block_size = settings.AZURE_UPLOAD_BLOCK_SIZE
+        self.upload_concurrency = settings.AZURE_UPLOAD_CONCURRENCY
+        
+        # Containers served through the local read-through cache (KYC and secure documents stay out)
+        self.cached_containers = {
+            self._resolve_download_container(name.strip())
+            for name in settings.BLOB_CACHE_CONTAINERS.split(',') if name.strip()
+        }
+        
         # Initialize blob service client to None
         self.blob_service_client = None
+        self._client_lock = asyncio.Lock()
+        
+    def _create_client(self) -> BlobServiceClient:
+        """
+        Create a blob service client on a pooled keep-alive HTTP session
+        """
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            keepalive_timeout=self.keepalive_seconds
+        )
+        transport = AioHttpTransport(session=aiohttp.ClientSession(connector=connector))
+        # Bound each download GET so streamed responses hold at most one chunk in memory
+        return BlobServiceClient.from_connection_string(
+            self.connection_string,
+            transport=transport,
+            max_single_get_size=self.stream_chunk_size,
+            max_chunk_get_size=self.stream_chunk_size
+        )
         
     async def get_blob_service_client(self):
-        """Get a blob service client, creating a new one if necessary"""
-        if not self.blob_service_client:
+        """Get the shared blob service client, creating it on first use"""
+        if self.blob_service_client:
+            return self.blob_service_client
+        
+        async with self._client_lock:
+            if self.blob_service_client:
+                return self.blob_service_client
+            
             # Check credentials and create a fallback connection string if needed
             if not self.connection_string or 'SharedAccessSignature' in self.connection_string:
                 # If connection string is missing or contains SAS (which might expire),
                 # create a new connection string from account name and key
                 if self.account_name and self.account_key:
-                    self.connection_string = f"DefaultEndpointsProtocol=https;AccountName={self.account_name};AccountKey={self.account_key};EndpointSuffix=core.windows.net"
+                    self.connection_string = f"DefaultEndpointsProtocol=https;AccountName={self.account_name};AccountKey={self.account_key};EndpointSuffix={self.endpoint_suffix}"
                     logging.info("Created new connection string from account credentials")
                 else:
                     raise ValueError("Azure Storage account name or key not set")
-            
+        
             if not self.account_name or not self.account_key:
                 raise ValueError("Azure Storage account name or key not set")
-            
+        
             try:
-                self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
-                logging.info("Successfully initialized Azure Blob Service client")
+                self.blob_service_client = self._create_client()
+                logging.info(f"Successfully initialized Azure Blob Service client (pool size {self.max_connections})")
             except Exception as e:
                 logging.error(f"Failed to initialize Azure Blob Service client: {str(e)}")
                 raise ValueError(f"Azure Storage initialization failed: {str(e)}")
-                
-        return self.blob_service_client
+            
+            return self.blob_service_client
             
     async def refresh_connection(self):
         """
@@ -68,14 +146,14 @@ class AzureStorageService:
                 return False
                 
             # Create direct connection string without SAS token
-            self.connection_string = f"DefaultEndpointsProtocol=https;AccountName={self.account_name};AccountKey={self.account_key};EndpointSuffix=core.windows.net"
+            self.connection_string = f"DefaultEndpointsProtocol=https;AccountName={self.account_name};AccountKey={self.account_key};EndpointSuffix={self.endpoint_suffix}"
             
             # Close existing client if it exists
             if self.blob_service_client:
                 await self.blob_service_client.close()
                 
             # Reinitialize blob service client
-            self.blob_service_client = BlobServiceClient.from_connection_string(self.connection_string)
+            self.blob_service_client = self._create_client()
             logging.info("Successfully refreshed Azure Blob Service connection")
             return True
         except Exception as e:
@@ -110,11 +188,18 @@ class AzureStorageService:
     async def create_secure_container(self, container_name):
         """
         Create a secured container with proper access controls
+        
+        Creation and policy setting run once per process, later calls only
+        return a container client from the registry of known containers
         """
         try:
             blob_service_client = await self.get_blob_service_client()
             container_client = blob_service_client.get_container_client(container_name)
             
+            # Skip the create/set-policy round trips for containers we already set up
+            if container_name in _known_containers:
+                return container_client
+            
             # Property images container should be public
             public_access = 'blob' if container_name == self.container_property_images else None
             
@@ -129,57 +214,50 @@ class AzureStorageService:
                         public_access=public_access,
                         signed_identifiers={}  # Required parameter, empty dict for no custom policy
                     )
-                
+            
+            _known_containers.add(container_name)
             return container_client
         except Exception as e:
             logging.error(f"Failed to create secure container {container_name}: {str(e)}")
             raise
         
-    def generate_secure_filename(self, original_filename, user_id=None):
+    def generate_url(self, container_name: str, blob_name: str, signed: bool = True, expiry: Optional[timedelta] = None) -> str:
         """
-        Generate a secure, non-guessable filename for storage
-        
-        :param original_filename: Original file name
-        :param user_id: Optional user ID to include in the hash
-        :return: Secure filename
+        Direct URL of a blob, with a read SAS token when signed is set
         """
-        # Get file extension
-        if '.' in original_filename:
-            ext = original_filename.rsplit('.', 1)[1].lower()
-        else:
-            ext = 'bin'
-        
-        # Generate a random UUID
-        random_id = str(uuid.uuid4())
-        
-        # Add user_id to the hash if provided
-        if user_id:
-            hash_base = f"{random_id}_{user_id}_{datetime.utcnow().timestamp()}"
+        # Generate direct URL
+        if self.blob_service_client:
+            account_url = self.blob_service_client.url.rstrip('/')
         else:
-            hash_base = f"{random_id}_{datetime.utcnow().timestamp()}"
-        
-        # Create a hash of the base
-        filename_hash = hashlib.sha256(hash_base.encode()).hexdigest()[:16]
+            account_url = f"https://{self.account_name}.blob.{self.endpoint_suffix}"
+        direct_url = f"{account_url}/{container_name}/{urllib.parse.quote(blob_name, safe='~/')}"
         
-        # Return secure filename
-        return f"{filename_hash}.{ext}"
+        # Generate a SAS URL for private access
+        if signed:
+            # A client created from a connection string carries the shared key itself
+            credential = getattr(self.blob_service_client, 'credential', None)
+            now = datetime.utcnow()
+            sas_token = generate_blob_sas(
+                account_name=self.account_name or getattr(credential, 'account_name', None),
+                container_name=container_name,
+                blob_name=blob_name,
+                account_key=self.account_key or getattr(credential, 'account_key', None),
+                permission=BlobSasPermissions(read=True),
+                # Backdated start tolerates clock skew between us and the storage service
+                start=now - timedelta(minutes=5),
+                expiry=now + (expiry or timedelta(days=7))
+            )
+            direct_url = f"{direct_url}?{sas_token}"
         
+        return direct_url
+
     async def upload_file(self, container_name: str, file_name: str, file_content: bytes, content_type=None, metadata=None):
         """
         Upload a file to Azure Blob Storage and return a URL
         """
         try:
             # Map container type to actual container name if needed
-            if container_name == 'user_selfies':
-                container_name = self.container_user_selfies
-            elif container_name == 'property_documents' or container_name == 'property-documents':
-                container_name = self.container_property_docs
-            elif container_name == 'property_images' or container_name == 'property-images':
-                container_name = self.container_property_images
-            elif container_name == 'secure_documents' or container_name == 'documents':
-                container_name = self.container_secure_docs
-            elif container_name == 'document_metadata' or container_name == 'document-metadata':
-                container_name = self.container_doc_metadata
+            container_name = self._resolve_upload_container(container_name)
             
             # Create and get container with proper security settings
             container_client = await self.create_secure_container(container_name)
@@ -199,36 +277,110 @@ class AzureStorageService:
                 metadata = {str(k): str(v) for k, v in metadata.items()}
             
             # Upload file with content settings and metadata
-            await blob_client.upload_blob(
-                file_content, 
-                overwrite=True,
-                content_settings=content_settings,
-                metadata=metadata
+            try:
+                await blob_client.upload_blob(
+                    file_content, 
+                    overwrite=True,
+                    content_settings=content_settings,
+                    metadata=metadata
+                )
+            except ResourceNotFoundError:
+                # Container was removed behind our back, forget it and recreate once
+                _known_containers.discard(container_name)
+                container_client = await self.create_secure_container(container_name)
+                blob_client = container_client.get_blob_client(file_name)
+                await blob_client.upload_blob(
+                    file_content, 
+                    overwrite=True,
+                    content_settings=content_settings,
+                    metadata=metadata
+                )
+            
+            await blob_cache.invalidate(f"{container_name}/{file_name}")
+            return self.generate_url(container_name, file_name, signed=not self.public_access)
+            
+        except Exception as e:
+            logging.error(f"Failed to upload file {file_name} to container {container_name}: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to upload file: {str(e)}"
             )
+
+    async def upload_stream(self, container_name: str, file_name: str, stream: AsyncIterator[bytes], content_type=None, metadata=None):
+        """
+        Upload an async byte stream as staged blocks and return a URL
+        
+        The stream is cut into blocks of AZURE_UPLOAD_BLOCK_SIZE bytes and at most
+        AZURE_UPLOAD_CONCURRENCY blocks are staged at once, so memory stays bounded
+        regardless of the upload size. Errors raised by the stream itself (for
+        example a 413 from a size limit) are propagated unchanged.
+        """
+        pending = set()
+        try:
+            container_name = self._resolve_upload_container(container_name)
+            container_client = await self.create_secure_container(container_name)
+            blob_client = container_client.get_blob_client(file_name)
             
-            # Generate direct URL
-            direct_url = blob_client.url
-            
-            # If container is private, generate a SAS URL
-            if not self.public_access:
-                sas_token = generate_blob_sas(
-                    account_name=self.account_name,
-                    container_name=container_name,
-                    blob_name=file_name,
-                    account_key=self.account_key,
-                    permission=BlobSasPermissions(read=True),
-                    expiry=datetime.utcnow() + timedelta(days=7)
-                )
-                direct_url = f"{direct_url}?{sas_token}"
+            block_list = []
+            buffer = bytearray()
             
-            return direct_url
+            async def stage(block_bytes: bytes):
+                # Block ids must all have the same length within a blob
+                block_id = base64.b64encode(f"{len(block_list):08d}".encode()).decode()
+                block_list.append(BlobBlock(block_id=block_id))
+                pending.add(asyncio.ensure_future(blob_client.stage_block(block_id, block_bytes)))
+                
+                # Wait for a slot before reading more of the stream
+                while len(pending) >= self.upload_concurrency:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        pending.discard(task)
+                        task.result()
             
+            async for chunk in stream:
+                buffer.extend(chunk)
+                while len(buffer) >= self.upload_block_size:
+                    await stage(bytes(buffer[:self.upload_block_size]))
+                    del buffer[:self.upload_block_size]
+            
+            if buffer or not block_list:
+                await stage(bytes(buffer))
+            
+            # Wait for the remaining blocks
+            while pending:
+                task = pending.pop()
+                await task
+            
+            # Convert metadata to string if it's a dictionary
+            if isinstance(metadata, dict):
+                metadata = {str(k): str(v) for k, v in metadata.items()}
+            
+            await blob_client.commit_block_list(
+                block_list,
+                content_settings=ContentSettings(
+                    content_type=content_type,
+                    content_disposition=f"inline; filename={file_name}",
+                    cache_control="public, max-age=31536000"  # 1 year cache
+                ),
+                metadata=metadata
+            )
+            
+            logging.info(f"Uploaded {file_name} to {container_name} in {len(block_list)} blocks")
+            await blob_cache.invalidate(f"{container_name}/{file_name}")
+            return self.generate_url(container_name, file_name, signed=not self.public_access)
+            
+        except HTTPException:
+            raise
         except Exception as e:
             logging.error(f"Failed to upload file {file_name} to container {container_name}: {str(e)}")
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to upload file: {str(e)}"
             )
+        finally:
+            # Uncommitted blocks are discarded by the service, just stop the in-flight ones
+            for task in pending:
+                task.cancel()
 
     async def download_file(self, container_name: str, blob_path: str) -> bytes:
         """
@@ -244,72 +396,38 @@ class AzureStorageService:
         # URL decode the blob path to handle any encoded characters
         blob_path = urllib.parse.unquote(blob_path)
         
-        # Map container names for backward compatibility
-        if container_name == 'property-images':
-            container_name = 'property_images'
-        elif container_name == 'property-documents':
-            container_name = 'property_documents'
-        elif container_name == 'secure-documents':
-            container_name = 'secure_documents'
-        elif container_name == 'document-metadata':
-            container_name = 'document_metadata'
-            
-        # Map container type to actual container name if needed
-        if container_name == 'user_selfies':
-            container_name = self.container_user_selfies
-        elif container_name == 'property_documents':
-            container_name = self.container_property_docs
-        elif container_name == 'property_images':
-            container_name = self.container_property_images
-        elif container_name == 'secure_documents' or container_name == 'documents':
-            container_name = self.container_secure_docs
-        elif container_name == 'document_metadata' or container_name == 'document-metadata':
-            container_name = self.container_doc_metadata
-            
+        container_name = self._resolve_download_container(container_name)
         logging.info(f"Mapped container name '{container_name}' for download")
         
-        blob_service_client = None
-        container_client = None
-        blob_client = None
-        content = None
-        
         try:
             # Get blob service client
             blob_service_client = await self.get_blob_service_client()
             
-            # Check if container exists
-            container_exists = False
-            try:
-                container_client = blob_service_client.get_container_client(container_name)
-                container_properties = await container_client.get_container_properties()
-                container_exists = True
-                logging.info(f"Container '{container_name}' exists")
-            except Exception as container_error:
-                logging.error(f"Container '{container_name}' does not exist: {str(container_error)}")
-                raise HTTPException(status_code=404, detail=f"Container '{container_name}' not found")
-                
-            if not container_exists:
-                logging.error(f"Container '{container_name}' does not exist")
-                raise HTTPException(status_code=404, detail=f"Container '{container_name}' not found")
-            
             # Get the blob client
             blob_client = blob_service_client.get_blob_client(
                 container=container_name,
                 blob=blob_path
             )
             
-            # Check if blob exists
+            async def fetch_content() -> bytes:
+                download_stream = await blob_client.download_blob()
+                return await download_stream.readall()
+            
+            # Download the blob in a single GET, a missing container or blob surfaces as not found.
+            # Concurrent downloads of the same blob share one request.
             try:
-                blob_properties = await blob_client.get_blob_properties()
-                logging.info(f"Blob '{blob_path}' exists in container '{container_name}'")
-            except Exception as blob_error:
-                logging.error(f"Blob '{blob_path}' not found in container '{container_name}': {str(blob_error)}")
+                if container_name in self.cached_containers:
+                    cached, download_stream = await self._read_through(container_name, blob_path)
+                    content = cached.data if cached is not None else await download_stream.readall()
+                else:
+                    content, _ = await blob_fetches.do(("file", container_name, blob_path), fetch_content)
+            except ResourceNotFoundError as not_found:
+                if getattr(not_found, 'error_code', None) == 'ContainerNotFound':
+                    logging.error(f"Container '{container_name}' does not exist")
+                    raise HTTPException(status_code=404, detail=f"Container '{container_name}' not found")
+                logging.error(f"Blob '{blob_path}' not found in container '{container_name}'")
                 raise HTTPException(status_code=404, detail=f"File '{blob_path}' not found")
             
-            # Download the blob
-            download_stream = await blob_client.download_blob()
-            content = await download_stream.readall()
-            
             if not content:
                 logging.error(f"Downloaded content is empty from {container_name}/{blob_path}")
                 raise HTTPException(status_code=500, detail="Downloaded content is empty")
@@ -320,6 +438,205 @@ class AzureStorageService:
             logging.error(f"Download failed: {str(e)}")
             raise
 
+    async def open_stream(self, container_name: str, blob_path: str, offset: Optional[int] = None, length: Optional[int] = None,
+                          if_none_match: Optional[str] = None, if_modified_since: Optional[datetime] = None) -> BlobStream:
+        """
+        Open a chunked download of a blob for streaming responses
+        
+        Args:
+            container_name: Name of the container
+            blob_path: Path of the blob within the container
+            offset: Optional start of a byte range
+            length: Optional number of bytes to read from offset (None reads to the end)
+            if_none_match: Entity tag held by the client; a match raises 304 without a download
+            if_modified_since: Client copy date; an unchanged blob raises 304 without a download
+            
+        Returns:
+            BlobStream: Async iterator of chunks, with size and properties
+        """
+        # URL decode the blob path to handle any encoded characters
+        blob_path = urllib.parse.unquote(blob_path)
+        container_name = self._resolve_download_container(container_name)
+        
+        if container_name in self.cached_containers:
+            try:
+                cached, downloader = await self._read_through(container_name, blob_path)
+            except ResourceNotFoundError:
+                logging.error(f"Blob '{blob_path}' not found in container '{container_name}'")
+                raise HTTPException(status_code=404, detail=f"File '{blob_path}' not found")
+            if cached is not None:
+                if is_not_modified(cached.etag, cached.last_modified, if_none_match, if_modified_since):
+                    raise not_modified(cached.etag, cached.last_modified)
+                return self._cached_stream(cached, offset, length)
+            properties = downloader.properties
+            if is_not_modified(properties.etag, properties.last_modified, if_none_match, if_modified_since):
+                raise not_modified(properties.etag, properties.last_modified)
+            if offset is None:
+                return AzureBlobStream(downloader, 0)
+            # Too large to cache, fall through to a ranged download
+        
+        blob_service_client = await self.get_blob_service_client()
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name,
+            blob=blob_path
+        )
+        
+        # Let storage evaluate the client's validators so a match costs no body transfer
+        conditions = {}
+        if if_none_match:
+            conditions = {"etag": if_none_match, "match_condition": MatchConditions.IfModified}
+        elif if_modified_since:
+            conditions = {"if_modified_since": if_modified_since}
+        
+        async def open_download() -> Tuple[Optional[CachedBlob], Optional[object]]:
+            downloader = await blob_client.download_blob(offset=offset, length=length, max_concurrency=1, **conditions)
+            if offset is None and downloader.size <= self.stream_chunk_size:
+                # The first GET already holds the whole blob, so its bytes can be shared
+                return await self._buffer(downloader), None
+            return None, downloader
+        
+        # The first GET happens here, so a missing blob is reported before any bytes are sent.
+        # Concurrent whole-blob reads of the same version share it.
+        try:
+            if offset is None:
+                flight_key = ("stream", container_name, blob_path, if_none_match, if_modified_since)
+                (buffered, downloader), shared = await blob_fetches.do(flight_key, open_download)
+                if downloader is not None and shared:
+                    # A chunked download has a single consumer, open our own
+                    buffered, downloader = None, await blob_client.download_blob(max_concurrency=1, **conditions)
+            else:
+                buffered, downloader = await open_download()
+        except ResourceNotModifiedError:
+            raise not_modified(if_none_match)
+        except ResourceNotFoundError:
+            logging.error(f"Blob '{blob_path}' not found in container '{container_name}'")
+            raise HTTPException(status_code=404, detail=f"File '{blob_path}' not found")
+        except HttpResponseError as e:
+            if e.status_code != 416:
+                raise
+            # Range starts past the end of the blob
+            blob_size = await self.get_blob_size(container_name, blob_path)
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{blob_size}"}
+            )
+        
+        if buffered is not None:
+            return self._cached_stream(buffered, None, None)
+        
+        logging.info(f"Streaming {downloader.size} bytes from {container_name}/{blob_path} at offset {offset or 0}")
+        return AzureBlobStream(downloader, offset or 0)
+
+    async def _read_through(self, container_name: str, blob_path: str) -> Tuple[Optional[CachedBlob], Optional[object]]:
+        """
+        Read a blob of an opted-in container through the local cache
+        
+        Fresh entries are served without contacting storage. Stale entries are
+        revalidated with a conditional GET on their ETag, so an unchanged blob
+        costs a 304 instead of a full transfer. Returns (cached_blob, None), or
+        (None, downloader) when the blob is too large to cache. Missing blobs
+        raise ResourceNotFoundError and are dropped from the cache.
+        """
+        key = f"{container_name}/{blob_path}"
+        cached, tier = await blob_cache.get(key)
+        if cached is not None and blob_cache.is_fresh(cached):
+            blob_cache.record(f"{tier}_hit")
+            return cached, None
+        
+        blob_service_client = await self.get_blob_service_client()
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name,
+            blob=blob_path
+        )
+        
+        async def fetch():
+            return await self._fetch_into_cache(key, blob_client, cached)
+        
+        # Concurrent misses and revalidations of the same cached version share one GET
+        version = cached.etag if cached is not None else None
+        (fetched, downloader), shared = await blob_fetches.do(("cache", container_name, blob_path, version), fetch)
+        if downloader is not None and shared:
+            # A chunked download has a single consumer, open our own
+            downloader = await blob_client.download_blob(max_concurrency=1)
+        return fetched, downloader
+
+    async def _fetch_into_cache(self, key: str, blob_client, cached: Optional[CachedBlob]) -> Tuple[Optional[CachedBlob], Optional[object]]:
+        """
+        Fetch or revalidate one cache entry from storage
+        """
+        try:
+            if cached is not None and cached.etag:
+                downloader = await blob_client.download_blob(
+                    etag=cached.etag,
+                    match_condition=MatchConditions.IfModified,
+                    max_concurrency=1
+                )
+            else:
+                downloader = await blob_client.download_blob(max_concurrency=1)
+        except ResourceNotModifiedError:
+            blob_cache.mark_validated(key, cached)
+            blob_cache.record("revalidated")
+            return cached, None
+        except ResourceNotFoundError:
+            await blob_cache.invalidate(key)
+            raise
+        
+        if not blob_cache.cacheable(downloader.size):
+            await blob_cache.invalidate(key)
+            blob_cache.record("uncacheable")
+            return None, downloader
+        
+        fetched = await self._buffer(downloader)
+        blob_cache.mark_validated(key, fetched)
+        await blob_cache.put(key, fetched)
+        blob_cache.record("refreshed" if cached is not None else "miss")
+        return fetched, None
+
+    @staticmethod
+    async def _buffer(downloader) -> CachedBlob:
+        """
+        Read a whole download into memory along with its validators
+        """
+        properties = downloader.properties
+        content_settings = getattr(properties, 'content_settings', None)
+        return CachedBlob(
+            await downloader.readall(),
+            properties.etag,
+            content_settings.content_type if content_settings else None,
+            properties.last_modified
+        )
+
+    def _cached_stream(self, cached: CachedBlob, offset: Optional[int], length: Optional[int]) -> CachedBlobStream:
+        """
+        Serve a cached blob, or a byte range of it, with the same 416 behaviour as storage
+        """
+        start = offset or 0
+        if offset is not None and start >= cached.size:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{cached.size}"}
+            )
+        size = cached.size - start if length is None else min(length, cached.size - start)
+        return CachedBlobStream(cached, start, size, self.stream_chunk_size)
+
+    async def get_blob_size(self, container_name: str, blob_path: str) -> int:
+        """
+        Size of a blob in bytes, used to resolve suffix byte ranges
+        """
+        container_name = self._resolve_download_container(container_name)
+        blob_service_client = await self.get_blob_service_client()
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name,
+            blob=blob_path
+        )
+        try:
+            properties = await blob_client.get_blob_properties()
+        except ResourceNotFoundError:
+            raise HTTPException(status_code=404, detail=f"File '{blob_path}' not found")
+        return properties.size
+
     async def delete_file(self, container_name: str, blob_name: str) -> bool:
         """
         Delete a file from Azure Blob Storage
@@ -343,6 +660,7 @@ class AzureStorageService:
             
             # Delete the blob
             await blob_client.delete_blob()
+            await blob_cache.invalidate(f"{self._resolve_download_container(container_name)}/{blob_name}")
             
             return True
             
@@ -350,9 +668,32 @@ class AzureStorageService:
             logging.error(f"Error deleting file from Azure: {str(e)}")
             return False
 
+    async def list_blobs(self, container_name: str, prefix: str = "") -> List[str]:
+        """
+        Names of the blobs in a container that start with prefix
+        """
+        container_name = self._resolve_download_container(container_name)
+        blob_service_client = await self.get_blob_service_client()
+        container_client = blob_service_client.get_container_client(container_name)
+        
+        names = []
+        try:
+            async for blob in container_client.list_blobs(name_starts_with=prefix or None):
+                names.append(blob.name)
+        except ResourceNotFoundError:
+            return []
+        return names
+
+    async def connect(self):
+        """
+        Open the pooled blob client ahead of the first request
+        """
+        await self.get_blob_service_client()
+
     async def close(self):
         """
-        Close the blob service client and all associated connections
+        Close the blob service client and all associated connections.
+        Only called at application shutdown, the client is shared by all requests.
         """
         if self.blob_service_client:
             try:
@@ -360,4 +701,55 @@ class AzureStorageService:
                 self.blob_service_client = None
                 logging.info("Azure Blob Service client closed")
             except Exception as e:
-                logging.error(f"Error closing Azure Blob Service client: {str(e)}")
\ No newline at end of file
+                logging.error(f"Error closing Azure Blob Service client: {str(e)}")
+
+
+# Application-lifetime storage service shared by every request
+_storage_service: Optional[StorageBackend] = None
+
+def create_storage_service() -> StorageBackend:
+    """
+    Build the storage backend selected by STORAGE_BACKEND ("azure" or "local")
+    """
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend == "local":
+        from app.storage.local import LocalStorageService
+        logging.info(f"Using local filesystem storage at {settings.LOCAL_STORAGE_PATH}")
+        return LocalStorageService()
+    if backend != "azure":
+        raise ValueError(f"Unknown STORAGE_BACKEND '{settings.STORAGE_BACKEND}'")
+    return AzureStorageService()
+
+def get_storage_service() -> StorageBackend:
+    """
+    Get the shared storage service. Also used as a FastAPI dependency.
+    """
+    global _storage_service
+    
+    if _storage_service is None:
+        _storage_service = create_storage_service()
+    
+    return _storage_service
+
+async def init_storage_service() -> StorageBackend:
+    """
+    Create the shared storage service and open its connection pool.
+    Called from the application lifespan.
+    """
+    storage = get_storage_service()
+    try:
+        await storage.connect()
+    except Exception as e:
+        # Keep serving non-storage routes; the client is retried on first use
+        logging.error(f"Storage unavailable at startup: {str(e)}")
+    return storage
+
+async def close_storage_service():
+    """
+    Close the shared storage service. Called at application shutdown.
+    """
+    global _storage_service
+    
+    if _storage_service is not None:
+        await _storage_service.close()
+        _storage_service = None
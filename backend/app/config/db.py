@@ -1,15 +1,161 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
-import os
-from dotenv import load_dotenv
+from pymongo import monitoring
 
-load_dotenv()
+from app.core.config import settings
 
-MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017')
-DATABASE_NAME = os.getenv('DATABASE_NAME', 'real_estate_platform')
+logger = logging.getLogger(__name__)
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters for the shared client, across all servers.
+    Events arrive on driver threads, so updates take a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.max_checked_out = 0
+        self.max_waiting = 0
+        self.connections_created = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+            self.checkouts += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+            "min_pool_size": settings.MONGO_MIN_POOL_SIZE,
+            "open_connections": self.open_connections,
+            "checked_out": self.checked_out,
+            "waiting": self.waiting,
+            "max_checked_out": self.max_checked_out,
+            "max_waiting": self.max_waiting,
+            "connections_created": self.connections_created,
+            "checkouts": self.checkouts,
+            "checkout_failures": self.checkout_failures,
+            "pool_clears": self.pool_clears
+        }
+
+
+# Singleton pool monitor registered on the shared client
+pool_monitor = PoolMonitor()
+
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def create_client() -> AsyncIOMotorClient:
+    """
+    Build the Motor client with the pool, timeout, compression and read
+    preference settings. Creating it opens no connections.
+    """
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS or None,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS or None,
+        "readPreference": settings.MONGO_READ_PREFERENCE,
+        "event_listeners": [pool_monitor]
+    }
+    compressors = [name.strip() for name in settings.MONGO_COMPRESSORS.split(",") if name.strip()]
+    if compressors:
+        options["compressors"] = compressors
+    return AsyncIOMotorClient(settings.MONGO_URI, **options)
+
+
+def get_client() -> AsyncIOMotorClient:
+    """
+    Get the shared Motor client, created on first use outside the lifespan
+    (scripts and one-off jobs)
+    """
+    global _client
+
+    if _client is None:
+        _client = create_client()
+
+    return _client
 
-# Create a single client instance
-client = AsyncIOMotorClient(MONGO_URI)
-database = client[DATABASE_NAME]
 
 async def get_database():
-    return database
\ No newline at end of file
+    """
+    Get the application database on the shared client. No round trip is made;
+    connections are taken from the pool by each operation.
+    """
+    return get_client()[settings.DATABASE_NAME]
+
+
+async def init_database():
+    """
+    Create the shared client and check the server is reachable.
+    Called from the application lifespan.
+    """
+    client = get_client()
+    try:
+        await client.admin.command('ping')
+        logger.info(f"Connected to MongoDB database {settings.DATABASE_NAME}")
+    except Exception as e:
+        # Keep starting; operations retry server selection on their own
+        logger.error(f"MongoDB unavailable at startup: {str(e)}")
+    return client
+
+
+def close_database():
+    """
+    Close the shared client and its pool. Called at application shutdown.
+    """
+    global _client
+
+    if _client is not None:
+        _client.close()
+        _client = None
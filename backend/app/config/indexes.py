@@ -0,0 +1,158 @@
+import logging
+from typing import Any, Dict, List
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+from app.config.db import get_database
+from app.blockchain.anchoring import ANCHOR_OUTBOX_COLLECTION
+from app.services.secure_document_service import DOCUMENT_BLOBS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+# Users registered without a value must not collide on null
+_HAS_STRING = {"$type": "string"}
+
+# Declared indexes per collection, applied at startup by ensure_indexes().
+# Unique indexes enforce what the controllers already assume: one listing per
+# id, one account per email or mobile number, one download counter per buyer
+# and document, one lawyer verification per access token.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "properties": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("seller_id", ASCENDING), ("created_at", DESCENDING)], name="seller_listings"),
+        IndexModel([("status", ASCENDING)], name="status"),
+        # Anchoring results are copied onto the listing entry by document id
+        IndexModel([("documents.document_id", ASCENDING)], name="document_id")
+    ],
+    "sellers": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True,
+                   partialFilterExpression={"email": _HAS_STRING}),
+        IndexModel([("mobile_number", ASCENDING)], name="mobile_number_unique", unique=True,
+                   partialFilterExpression={"mobile_number": _HAS_STRING})
+    ],
+    "buyers": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True,
+                   partialFilterExpression={"email": _HAS_STRING}),
+        IndexModel([("mobile_number", ASCENDING)], name="mobile_number_unique", unique=True,
+                   partialFilterExpression={"mobile_number": _HAS_STRING})
+    ],
+    "document_requests": [
+        # Request lists are paged by _id
+        IndexModel([("seller_id", ASCENDING), ("_id", ASCENDING)], name="seller_requests"),
+        IndexModel([("buyer_id", ASCENDING), ("_id", ASCENDING)], name="buyer_requests"),
+        IndexModel([("property_id", ASCENDING), ("buyer_id", ASCENDING), ("status", ASCENDING)], name="property_buyer_status")
+    ],
+    "document_access_limits": [
+        IndexModel([("buyer_id", ASCENDING), ("property_id", ASCENDING), ("document_index", ASCENDING)],
+                   name="buyer_document_unique", unique=True)
+    ],
+    "lawyer_verifications": [
+        IndexModel([("access_token", ASCENDING)], name="access_token_unique", unique=True),
+        IndexModel([("property_id", ASCENDING), ("buyer_id", ASCENDING), ("is_active", ASCENDING)], name="property_buyer_active")
+    ],
+    ANCHOR_OUTBOX_COLLECTION: [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="due"),
+        IndexModel([("listing_synced", ASCENDING)], name="unsynced",
+                   partialFilterExpression={"listing_synced": False})
+    ],
+    DOCUMENT_BLOBS_COLLECTION: [
+        # Key rotation scans records not yet on the active KEK
+        IndexModel([("kek_version", ASCENDING)], name="kek_version",
+                   partialFilterExpression={"wrapped_key": {"$exists": True}})
+    ]
+}
+
+# Query shapes on request paths, explained by index_report() to catch
+# collection scans. Values are placeholders; only the shape affects the plan.
+HOT_QUERIES: List[Dict[str, Any]] = [
+    {"name": "seller listing", "collection": "properties", "filter": {"id": "", "seller_id": ""}},
+    {"name": "listing by id", "collection": "properties", "filter": {"id": ""}},
+    {"name": "seller listings", "collection": "properties", "filter": {"seller_id": ""}},
+    {"name": "live listings", "collection": "properties", "filter": {"status": "LIVE"}},
+    {"name": "seller document requests", "collection": "document_requests", "filter": {"seller_id": ""}},
+    {"name": "buyer document requests", "collection": "document_requests", "filter": {"buyer_id": ""}},
+    {"name": "open document request", "collection": "document_requests",
+     "filter": {"property_id": "", "buyer_id": "", "status": {"$in": ["pending", "approved"]}}},
+    {"name": "download counter", "collection": "document_access_limits",
+     "filter": {"buyer_id": "", "property_id": "", "document_index": 0}},
+    {"name": "lawyer access token", "collection": "lawyer_verifications",
+     "filter": {"property_id": "", "access_token": "", "is_active": True}},
+    {"name": "active lawyer verification", "collection": "lawyer_verifications",
+     "filter": {"property_id": "", "buyer_id": "", "is_active": True}},
+    {"name": "seller login", "collection": "sellers", "filter": {"email": ""}},
+    {"name": "buyer login", "collection": "buyers", "filter": {"email": ""}},
+    {"name": "anchoring due", "collection": ANCHOR_OUTBOX_COLLECTION,
+     "filter": {"status": "pending", "next_attempt_at": {"$lte": 0}}}
+]
+
+# Indexes that could not be built at the last startup, by collection and name
+_failures: Dict[str, Dict[str, str]] = {}
+
+
+async def ensure_indexes():
+    """
+    Create every declared index. Idempotent: indexes that already exist with the
+    same definition are left alone. A failure (e.g. existing duplicates blocking
+    a unique index) is logged and reported by index_report(), and never stops startup.
+    """
+    db = await get_database()
+    _failures.clear()
+    try:
+        for collection, models in INDEXES.items():
+            for model in models:
+                name = model.document["name"]
+                try:
+                    await db[collection].create_indexes([model])
+                except OperationFailure as e:
+                    logger.error(f"Could not create index {collection}.{name}: {str(e)}")
+                    _failures.setdefault(collection, {})[name] = str(e)
+    except ConnectionFailure as e:
+        # Server unreachable; indexes are created at the next startup
+        logger.error(f"Skipped index creation, MongoDB unavailable: {str(e)}")
+        return
+    logger.info(f"Ensured indexes on {len(INDEXES)} collections ({sum(len(f) for f in _failures.values())} failed)")
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+async def index_report() -> Dict[str, Any]:
+    """
+    Existing and missing indexes per declared collection, and the winning
+    plan of every hot query, flagging those that scan the whole collection
+    """
+    db = await get_database()
+
+    collections = {}
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        declared = [model.document["name"] for model in models]
+        collections[collection] = {
+            "indexes": {name: info["key"] for name, info in existing.items()},
+            "missing": [name for name in declared if name not in existing],
+            "errors": _failures.get(collection, {})
+        }
+
+    queries = []
+    for query in HOT_QUERIES:
+        explain = await db[query["collection"]].find(query["filter"]).explain()
+        winning_plan = explain["queryPlanner"]["winningPlan"]
+        stages = _plan_stages(winning_plan)
+        queries.append({
+            "name": query["name"],
+            "collection": query["collection"],
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages
+        })
+
+    return {
+        "collections": collections,
+        "queries": queries,
+        "collection_scans": [query["name"] for query in queries if query["collection_scan"]]
+    }
@@ -2,14 +2,16 @@ from fastapi import APIRouter, HTTPException, UploadFile, File, Depends, Backgro
 from fastapi.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 import os
 import uuid
 from azure.storage.blob import BlobServiceClient
 from app.models.user import Seller, Buyer
 from app.middleware.auth_middleware import AuthHandler
 from app.config.db import get_database
-from app.config.azure_config import AzureStorageService
-from datetime import datetime
+from app.config.azure_config import get_storage_service
+from app.utils.uploads import iter_upload, max_image_bytes
+from datetime import datetime, timedelta
 import logging
 import asyncio
 
@@ -50,8 +52,11 @@ class AuthController:
         # Convert to dictionary for insertion
         user_dict = user.model_dump(by_alias=True, exclude_unset=True)
         
-        # Insert user to database
-        result = await db[f"{user_type}s"].insert_one(user_dict)
+        # Insert user to database; the unique email and mobile indexes catch concurrent registrations
+        try:
+            result = await db[f"{user_type}s"].insert_one(user_dict)
+        except DuplicateKeyError:
+            raise HTTPException(status_code=400, detail="User already exists")
         
         return str(result.inserted_id)
 
@@ -60,19 +65,15 @@ class AuthController:
         """
         Upload user selfie to Azure Blob Storage with enhanced security
         """
-        azure_storage = None
         try:
-            # Create Azure storage service
-            azure_storage = AzureStorageService()
+            # Shared application-lifetime Azure storage service
+            azure_storage = get_storage_service()
             
             # Generate unique filename - includes user type for additional context
             timestamp = datetime.now().timestamp()
             file_extension = selfie.filename.split('.')[-1] if '.' in selfie.filename else 'jpg'
             blob_name = f"{user_type}_{user_id}_{timestamp}_selfie.{file_extension}"
             
-            # Read selfie file
-            selfie_content = await selfie.read()
-            
             # Set metadata for the blob
             metadata = {
                 "user_id": user_id,
@@ -86,11 +87,11 @@ class AuthController:
             container_name = USER_SELFIES_CONTAINER
             logging.info(f"Uploading selfie to container: {container_name}")
             
-            # Upload to Azure using the container from .env
-            upload_result = await azure_storage.upload_file(
+            # Stream to Azure using the container from .env, rejecting oversized selfies early
+            upload_result = await azure_storage.upload_stream(
                 container_name=container_name,
                 file_name=blob_name,
-                file_content=selfie_content,
+                stream=iter_upload(selfie, max_image_bytes()),
                 content_type=selfie.content_type,
                 metadata=metadata
             )
@@ -117,13 +118,11 @@ class AuthController:
                 "timestamp": upload_result["timestamp"]
             }
         
+        except HTTPException:
+            raise
         except Exception as e:
             logging.error(f"Selfie upload failed: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Selfie upload failed: {str(e)}")
-        finally:
-            # Close Azure storage client
-            if azure_storage:
-                await azure_storage.close()
 
     @staticmethod
     async def login(email: str, password: str, user_type: str):
@@ -150,8 +149,6 @@ class AuthController:
     @classmethod
     async def complete_user_registration(cls, user_data, selfie, user_type):
         db = await get_database()
-        azure_storage = None
-        
         # Check if user already exists
         existing_user = await db[f"{user_type}s"].find_one({
             "$or": [
@@ -164,8 +161,8 @@ class AuthController:
             raise HTTPException(status_code=400, detail=f"{user_type.capitalize()} already exists")
             
         try:
-            # Initialize Azure storage service
-            azure_storage = AzureStorageService()
+            # Shared application-lifetime Azure storage service
+            azure_storage = get_storage_service()
             
             # Hash password
             user_data['password'] = AuthHandler.hash_password(user_data['password'])
@@ -181,16 +178,16 @@ class AuthController:
             # Convert to dictionary for insertion
             user_dict = user.model_dump(by_alias=True, exclude_unset=True)
             
-            # Insert user to database
-            result = await db[collection].insert_one(user_dict)
+            # Insert user to database; the unique email and mobile indexes catch concurrent registrations
+            try:
+                result = await db[collection].insert_one(user_dict)
+            except DuplicateKeyError:
+                raise HTTPException(status_code=400, detail="User already exists")
             user_id = str(result.inserted_id)
             
             # Upload selfie to Azure Storage
             upload_result = None  # Initialize upload_result
             if selfie:
-                # Read selfie file
-                selfie_content = await selfie.read()
-                
                 # Set metadata for the blob
                 metadata = {
                     "user_id": user_id,
@@ -205,11 +202,11 @@ class AuthController:
                 file_extension = selfie.filename.split('.')[-1] if '.' in selfie.filename else 'jpg'
                 secure_filename = f"{user_type}_{user_id}_{timestamp}_selfie.{file_extension}"
                 
-                # Upload to Azure Blob Storage with enhanced security
-                upload_result = await azure_storage.upload_file(
+                # Stream to Azure Blob Storage with enhanced security, rejecting oversized selfies early
+                upload_result = await azure_storage.upload_stream(
                     container_name=USER_SELFIES_CONTAINER,
                     file_name=secure_filename,
-                    file_content=selfie_content,
+                    stream=iter_upload(selfie, max_image_bytes()),
                     content_type=selfie.content_type,
                     metadata=metadata
                 )
@@ -240,12 +237,10 @@ class AuthController:
             # Rollback user creation if any step fails
             if 'result' in locals() and result.inserted_id:
                 await db[collection].delete_one({"_id": result.inserted_id})
+            if isinstance(e, HTTPException):
+                raise
             logging.error(f"Registration failed: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
-        finally:
-            # Close Azure storage client
-            if azure_storage:
-                await azure_storage.close()
 
     @staticmethod
     async def get_user_selfie(user_id: str, user_type: str):
@@ -253,8 +248,6 @@ class AuthController:
         Get user selfie URL and container information with enhanced debugging
         """
         db = await get_database()
-        azure_storage = None
-        
         try:
             user = await db[f"{user_type}s"].find_one({"_id": ObjectId(user_id)})
             
@@ -272,8 +265,8 @@ class AuthController:
             container = user.get('selfie_container', USER_SELFIES_CONTAINER)
             
             if filename and container:
-                # Initialize Azure storage
-                azure_storage = AzureStorageService()
+                # Shared application-lifetime Azure storage service
+                azure_storage = get_storage_service()
                 
                 try:
                     # Download selfie
@@ -300,10 +293,6 @@ class AuthController:
         except Exception as e:
             logging.error(f"Error getting selfie: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to get selfie: {str(e)}")
-        finally:
-            # Close Azure storage client
-            if azure_storage:
-                await azure_storage.close()
 
     @staticmethod
     async def update_user_selfie_container(user_id: str, user_type: str, container_name: str, blob_name: str):
@@ -311,8 +300,6 @@ class AuthController:
         Update user selfie container information
         """
         db = await get_database()
-        azure_storage = None
-        
         try:
             # Find user
             user = await db[f"{user_type}s"].find_one({"_id": ObjectId(user_id)})
@@ -320,22 +307,12 @@ class AuthController:
             if not user:
                 raise HTTPException(status_code=404, detail=f"{user_type.capitalize()} not found")
             
-            # Initialize Azure storage for URL generation
-            azure_storage = AzureStorageService()
-            
-            # Generate direct URL
-            direct_url = f"https://{azure_storage.account_name}.blob.core.windows.net/{container_name}/{blob_name}"
+            # Shared application-lifetime Azure storage service
+            azure_storage = get_storage_service()
             
-            # Generate SAS URL
-            sas_token = generate_blob_sas(
-                account_name=azure_storage.account_name,
-                container_name=container_name,
-                blob_name=blob_name,
-                account_key=azure_storage.account_key,
-                permission=BlobSasPermissions(read=True),
-                expiry=datetime.utcnow() + timedelta(days=7)  # 7-day expiry
-            )
-            sas_url = f"{direct_url}?{sas_token}"
+            # Generate direct URL and a 7-day read URL
+            direct_url = azure_storage.generate_url(container_name, blob_name, signed=False)
+            sas_url = azure_storage.generate_url(container_name, blob_name, expiry=timedelta(days=7))
             
             # Update user with new selfie container information
             await db[f"{user_type}s"].update_one(
@@ -356,8 +333,4 @@ class AuthController:
             }
         except Exception as e:
             logging.error(f"Failed to update selfie container: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to update selfie container: {str(e)}")
-        finally:
-            # Close Azure storage client
-            if azure_storage:
-                await azure_storage.close()
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Failed to update selfie container: {str(e)}")
\ No newline at end of file
@@ -7,15 +7,19 @@ import logging
 import secrets
 from app.middleware.auth_middleware import AuthHandler
 from app.config.db import get_database
-from app.config.azure_config import AzureStorageService
+from app.config.azure_config import get_storage_service
+from app.utils.uploads import iter_upload, max_image_bytes
 from app.models.document_request import DocumentRequestCreate
 from app.models.document_access import LawyerVerification
 from app.utils.email_service import send_lawyer_verification_email
+from app.utils.lookups import find_page, properties_by_id
+from app.services.access_summary import DEFAULT_MAX_DOWNLOADS, download_counts
 
 class BuyerController:
     def __init__(self):
         self.auth_handler = AuthHandler()
-        self.azure_storage = AzureStorageService()
+        # Shared application-lifetime storage service, never closed per request
+        self.azure_storage = get_storage_service()
 
     async def list_all_properties(self):
         """
@@ -118,12 +122,12 @@ class BuyerController:
                 file_ext = profile_image.filename.split('.')[-1]
                 new_filename = f"{uuid.uuid4().hex}.{file_ext}"
                 
-                # Upload to Azure
-                content = await profile_image.read()
-                upload_result = await self.azure_storage.upload_file(
+                # Stream to Azure, rejecting oversized images early
+                upload_result = await self.azure_storage.upload_stream(
                     container_name,
                     new_filename,
-                    content
+                    iter_upload(profile_image, max_image_bytes()),
+                    content_type=profile_image.content_type
                 )
                 
                 # Add image info to update data
@@ -144,6 +148,8 @@ class BuyerController:
                     except Exception as delete_error:
                         logging.error(f"Error deleting old profile image: {str(delete_error)}")
                 
+            except HTTPException:
+                raise
             except Exception as upload_error:
                 logging.error(f"Error uploading profile image: {str(upload_error)}")
                 raise HTTPException(
@@ -248,7 +254,6 @@ class BuyerController:
             db = await get_database()
             document_requests_collection = db['document_requests']
             properties_collection = db['properties']
-            access_limits_collection = db['document_access_limits']
             
             # Check if the buyer has an approved request
             access_request = await document_requests_collection.find_one({
@@ -278,36 +283,22 @@ class BuyerController:
             # Get document information and return with access URLs
             documents = property_doc.get('documents', [])
             
-            # Get document download limits for each document
+            # Download counts for every document of the listing in one read
+            counts = await download_counts(db, token_payload['sub'], property_id)
+            
             document_limits = []
             for i in range(len(documents)):
-                # Find access limit record for this buyer and document
-                limit_record = await access_limits_collection.find_one({
-                    'buyer_id': token_payload['sub'],
-                    'property_id': property_id,
-                    'document_index': i
-                })
+                # Documents without a record yet have all downloads remaining
+                document_counts = counts.get(i, {})
+                max_downloads = document_counts.get('max_downloads', DEFAULT_MAX_DOWNLOADS)
+                current_count = document_counts.get('download_count', 0)
                 
-                if limit_record:
-                    # Calculate remaining downloads
-                    max_downloads = limit_record.get('max_downloads', 3)
-                    current_count = limit_record.get('download_count', 0)
-                    remaining = max(0, max_downloads - current_count)
-                    
-                    document_limits.append({
-                        'document_index': i,
-                        'max_downloads': max_downloads,
-                        'download_count': current_count,
-                        'remaining_downloads': remaining
-                    })
-                else:
-                    # No record yet, so all downloads remaining
-                    document_limits.append({
-                        'document_index': i,
-                        'max_downloads': 3,
-                        'download_count': 0,
-                        'remaining_downloads': 3
-                    })
+                document_limits.append({
+                    'document_index': i,
+                    'max_downloads': max_downloads,
+                    'download_count': current_count,
+                    'remaining_downloads': max(0, max_downloads - current_count)
+                })
             
             return {
                 "has_access": True,
@@ -322,19 +313,22 @@ class BuyerController:
             logging.error(f"Error in get_document_access: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error getting document access: {str(e)}")
 
-    async def list_my_document_requests(self, token_payload: dict):
+    async def list_my_document_requests(self, token_payload: dict, limit: Optional[int] = None, cursor: Optional[str] = None):
         """
-        List all document requests made by the buyer
+        List document requests made by the buyer. Returns the page and the
+        cursor for the next one.
         """
         try:
             db = await get_database()
             document_requests_collection = db['document_requests']
-            properties_collection = db['properties']
             
-            # Find all document requests made by this buyer
-            requests = await document_requests_collection.find({
-                'buyer_id': token_payload['sub']
-            }).to_list(length=None)
+            # Find document requests made by this buyer, oldest first
+            requests, next_cursor = await find_page(
+                document_requests_collection, {'buyer_id': token_payload['sub']}, limit, cursor
+            )
+            
+            # Listings for the whole page in one query
+            properties = await properties_by_id(db, (request.get('property_id') for request in requests))
             
             # Enrich requests with property information
             for request in requests:
@@ -342,15 +336,16 @@ class BuyerController:
                     request['id'] = str(request['_id'])
                     del request['_id']
                     
-                # Get property details
-                if 'property_id' in request:
-                    property_doc = await properties_collection.find_one({'id': request['property_id']})
-                    if property_doc:
-                        request['property_location'] = property_doc.get('location') or property_doc.get('area', 'Unknown location')
-                        request['property_reference'] = property_doc.get('reference_number') or property_doc.get('id')
+                # Property details
+                property_doc = properties.get(request.get('property_id'))
+                if property_doc:
+                    request['property_location'] = property_doc.get('location') or property_doc.get('area', 'Unknown location')
+                    request['property_reference'] = property_doc.get('reference_number') or property_doc.get('id')
             
-            return requests
+            return requests, next_cursor
             
+        except HTTPException:
+            raise
         except Exception as e:
             logging.error(f"Error in list_my_document_requests: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error listing document requests: {str(e)}")
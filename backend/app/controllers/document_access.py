@@ -3,10 +3,14 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Tuple, List
 from bson import ObjectId
 from fastapi import HTTPException, Request
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from app.config.db import get_database
-from app.utils.document_security import document_security_service
+from app.utils.document_security import document_security_service, watermark_pdf
+from app.core.executors import run_crypto, run_watermark
 from app.models.document_access import DocumentAccessLog, DocumentAccessLimit
+from app.services.access_summary import record_download
 
 class SecureDocumentController:
     """
@@ -82,7 +86,12 @@ class SecureDocumentController:
                 download_count=1  # This will be the first download
             ).dict()
             
-            await access_limits_collection.insert_one(limit_record)
+            try:
+                await access_limits_collection.insert_one(limit_record)
+            except DuplicateKeyError:
+                # A concurrent first download created the record; count this one against it
+                return await self.check_access_limits(buyer_id, property_id, document_index)
+            await record_download(db, buyer_id, property_id, document_index, 1, limit_record['max_downloads'])
             return True
         
         # Convert to model
@@ -110,13 +119,17 @@ class SecureDocumentController:
             )
         
         # Update download count and last access
-        await access_limits_collection.update_one(
+        updated = await access_limits_collection.find_one_and_update(
             {'_id': limit_record['_id']},
             {
                 '$inc': {'download_count': 1},
                 '$set': {'last_access': datetime.utcnow()}
-            }
+            },
+            projection={'download_count': 1},
+            return_document=ReturnDocument.AFTER
         )
+        if updated:
+            await record_download(db, buyer_id, property_id, document_index, updated['download_count'], limit.max_downloads)
         
         return True
     
@@ -202,9 +215,9 @@ class SecureDocumentController:
             
             # Apply watermark based on content type
             if content_type.lower() == 'application/pdf':
-                # Add watermark to PDF
-                content = document_security_service.add_watermark_to_pdf(
-                    content, buyer_info, property_info
+                # Add watermark to PDF in the watermark process pool
+                content = await run_watermark(
+                    watermark_pdf, content, buyer_info, property_info
                 )
             elif content_type.lower() in ['application/msword', 
                                         'application/vnd.openxmlformats-officedocument.wordprocessingml.document']:
@@ -214,7 +227,7 @@ class SecureDocumentController:
                 )
             
             # Apply digital signature
-            content, signature = document_security_service.sign_document(content)
+            content, signature = await run_crypto(document_security_service.sign_document, content)
             
             return content, signature
         except Exception as e:
@@ -253,9 +266,9 @@ class SecureDocumentController:
                 # Validate the content is a PDF before attempting to watermark
                 if content.startswith(b'%PDF'):
                     try:
-                        # Add watermark
-                        secured_content = document_security_service.add_watermark_to_pdf(
-                            content, buyer_info, property_info
+                        # Add watermark in the watermark process pool
+                        secured_content = await run_watermark(
+                            watermark_pdf, content, buyer_info, property_info
                         )
                         is_watermarked = True
                         logging.info(f"PDF watermarking successful: {len(secured_content)} bytes")
@@ -270,7 +283,9 @@ class SecureDocumentController:
                 
             # Only apply digital signature if needed
             try:
-                secured_content, signature = document_security_service.sign_document(secured_content)
+                secured_content, signature = await run_crypto(
+                    document_security_service.sign_document, secured_content
+                )
                 logging.info("Digital signature applied successfully")
             except Exception as e:
                 logging.error(f"Error applying digital signature: {str(e)}")
@@ -4,10 +4,10 @@ import hashlib
 import json
 from typing import Tuple, Optional
 from app.services.secure_document_service import SecureDocumentService
-from app.config.azure_config import AzureStorageService
+from app.storage.base import StorageBackend
 
 class SecureDocumentController:
-    def __init__(self, azure_storage: AzureStorageService):
+    def __init__(self, azure_storage: StorageBackend):
         self.azure_storage = azure_storage
         self.secure_document_service = SecureDocumentService(azure_storage)
         
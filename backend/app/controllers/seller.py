@@ -7,16 +7,24 @@ import logging
 from azure.core.exceptions import AzureError
 from app.middleware.auth_middleware import AuthHandler
 from app.config.db import get_database
-from app.blockchain.smart_contract import BlockchainService
+from app.blockchain.anchoring import document_anchoring
 from app.services.secure_document_service import SecureDocumentService
-from app.config.azure_config import AzureStorageService
+from app.config.azure_config import get_storage_service
+from app.utils.uploads import iter_upload, read_upload_limited, max_image_bytes, max_document_bytes
 import urllib.parse
+import asyncio
+import functools
+from app.core.concurrency import gather_files, listing_limiter
+from app.core.executors import run_image
+from app.utils.image_variants import generate_variants, variant_filename
+from app.utils.lookups import PROPERTY_SUMMARY_FIELDS, find_page, properties_by_id, buyers_by_id
 
 class PropertyListingController:
     def __init__(self):
         self.auth_handler = AuthHandler()
-        self.blockchain_service = None
-        self.azure_storage = AzureStorageService()
+        self.anchoring_service = document_anchoring
+        # Shared application-lifetime storage service, never closed per request
+        self.azure_storage = get_storage_service()
         self.secure_document_service = SecureDocumentService(self.azure_storage)
 
     async def list_seller_properties(self, token_payload):
@@ -90,59 +98,118 @@ class PropertyListingController:
         
         return property_doc
 
-    async def upload_property_images(self, seller_id: str, images: List[UploadFile]):
+    async def upload_property_images(self, seller_id: str, images: List[UploadFile], limiter: Optional[asyncio.Semaphore] = None):
         """
         Upload property images to Azure Blob Storage (without encryption)
+        
+        Images upload concurrently under the per-listing and global file limits,
+        results keep the order of the input list. Each image also gets resized
+        WebP and JPEG variants (see app.utils.image_variants).
         """
-        image_urls = []
+        async def upload_image(index: int, image: UploadFile):
+            # Generate unique filename (index keeps same-named images apart when uploaded together)
+            filename = f"{seller_id}_{datetime.now().timestamp()}_{index}_{image.filename}"
+            
+            # Keep a copy of the (size-limited) bytes for the variants while streaming
+            original = bytearray()
+            
+            async def tee_upload():
+                async for chunk in iter_upload(image, max_image_bytes()):
+                    original.extend(chunk)
+                    yield chunk
+            
+            # Stream to Azure Blob Storage (property-images container), rejecting oversized images early
+            blob_url = await self.azure_storage.upload_stream(
+                container_name=self.azure_storage.container_property_images,  # Use container from AzureStorageService
+                file_name=filename, 
+                stream=tee_upload(),
+                content_type=image.content_type
+            )
+            
+            image_entry = {
+                'url': blob_url,  # This will be the direct URL if container is public
+                'filename': filename,
+                'content_type': image.content_type
+            }
+            try:
+                image_entry.update(await self.store_image_variants(filename, bytes(original)))
+            except Exception:
+                await self.delete_images([image_entry])
+                raise
+            return image_entry
+        
+        # Images that did upload are deleted again when any image of the batch fails
+        return await gather_files(
+            [functools.partial(upload_image, index, image) for index, image in enumerate(images or [])],
+            limiter,
+            cleanup=self.delete_images
+        )
+
+    async def delete_images(self, images: List[dict]):
+        """
+        Delete uploaded images and their variants, for uploads whose listing
+        could not be saved
+        """
+        filenames = []
+        for image in images:
+            filenames.append(image['filename'])
+            filenames.extend(variant['filename'] for variant in image.get('variants', []))
+        
+        results = await asyncio.gather(*(
+            self.azure_storage.delete_file(self.azure_storage.container_property_images, filename)
+            for filename in filenames
+        ), return_exceptions=True)
+        for filename, result in zip(filenames, results):
+            if isinstance(result, Exception):
+                logging.error(f"Failed to delete image {filename}: {str(result)}")
+
+    async def store_image_variants(self, filename: str, image_bytes: bytes) -> dict:
+        """
+        Generate and store the resized variants of an uploaded image
         
+        Returns the fields to merge into the image's entry in property.images.
+        An image Pillow cannot decode keeps only its original, it is not an upload error.
+        """
         try:
-            # Initialize Azure storage if not already done
-            if not hasattr(self, 'azure_storage') or self.azure_storage is None:
-                self.azure_storage = AzureStorageService()
-                
-            for image in images:
-                # Read image file
-                image_content = await image.read()
-                
-                # Generate unique filename
-                filename = f"{seller_id}_{datetime.now().timestamp()}_{image.filename}"
-                
-                # Upload to Azure Blob Storage (property-images container)
-                blob_url = await self.azure_storage.upload_file(
-                    container_name=self.azure_storage.container_property_images,  # Use container from AzureStorageService
-                    file_name=filename, 
-                    file_content=image_content,
-                    content_type=image.content_type
-                )
-                
-                # Store both the SAS URL and direct URL
-                image_urls.append({
-                    'url': blob_url,  # This will be the direct URL if container is public
-                    'filename': filename,
-                    'content_type': image.content_type
-                })
-            
-            return image_urls
-        finally:
-            if hasattr(self, 'azure_storage') and self.azure_storage is not None:
-                await self.azure_storage.close()
+            (width, height), variants = await run_image(generate_variants, image_bytes)
+        except Exception as e:
+            logging.warning(f"Could not generate variants for {filename}: {str(e)}")
+            return {'variants': []}
+        
+        async def store(variant: dict):
+            variant_name = variant_filename(filename, variant['size'], variant['format'])
+            await self.azure_storage.upload_file(
+                container_name=self.azure_storage.container_property_images,
+                file_name=variant_name,
+                file_content=variant.pop('data'),
+                content_type=variant['content_type']
+            )
+            variant['filename'] = variant_name
+            return variant
+        
+        results = await asyncio.gather(*(store(variant) for variant in variants), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            # Remove the variants that were stored; the caller removes the original
+            await self.delete_images([
+                {'filename': variant['filename']} for variant in results if not isinstance(variant, BaseException)
+            ])
+            raise errors[0]
+        logging.info(f"Stored {len(results)} variants for {filename}")
+        return {'width': width, 'height': height, 'variants': list(results)}
 
-    async def upload_property_documents(self, seller_id: str, property_id: str, documents: List[UploadFile], document_types: List[str]):
+    async def upload_property_documents(self, seller_id: str, property_id: str, documents: List[UploadFile], document_types: List[str], limiter: Optional[asyncio.Semaphore] = None):
         """
         Upload property documents to Azure Blob Storage with encryption and blockchain verification
-        """
-        document_metadata_list = []
         
+        Documents are processed concurrently under the per-listing and global file
+        limits, the returned list keeps the input order so document indices stay stable
+        """
         try:
-            # Initialize services if not already done
-            if not self.blockchain_service:
-                self.blockchain_service = await BlockchainService.create()
-            
-            for doc, doc_type in zip(documents, document_types):
+            async def process(doc: UploadFile, doc_type: str):
                 try:
-                    # Read document file
-                    doc_content = await doc.read()
+                    # Read document file, rejecting it once it passes the size limit
+                    doc_content = await read_upload_limited(doc, max_document_bytes())
                     
                     # Process document using SecureDocumentService with blockchain integration
                     doc_metadata = await self.secure_document_service.process_document(
@@ -151,13 +218,15 @@ class PropertyListingController:
                         owner_id=seller_id,
                         content_type=doc.content_type,
                         property_id=property_id,  # Pass property_id to process_document
-                        blockchain_service=self.blockchain_service
+                        anchoring_service=self.anchoring_service
                     )
                     
                     # Add document type to metadata
                     doc_metadata['type'] = doc_type
-                    document_metadata_list.append(doc_metadata)
+                    return doc_metadata
                     
+                except HTTPException:
+                    raise
                 except Exception as e:
                     logging.error(f"Error processing document {doc.filename}: {str(e)}")
                     raise HTTPException(
@@ -165,18 +234,21 @@ class PropertyListingController:
                         detail=f"Failed to process document {doc.filename}: {str(e)}"
                     )
             
-            return document_metadata_list
+            # Documents that were stored give their references back when any document of the batch fails
+            return await gather_files(
+                [functools.partial(process, doc, doc_type) for doc, doc_type in zip(documents, document_types)],
+                limiter,
+                cleanup=self.release_documents
+            )
             
+        except HTTPException:
+            raise
         except Exception as e:
             logging.error(f"Error uploading property documents: {str(e)}")
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to upload documents: {str(e)}"
             )
-        finally:
-            # Close any open connections
-            if self.azure_storage:
-                await self.azure_storage.close()
 
     async def create_property_listing(
         self, token_payload, 
@@ -197,19 +269,39 @@ class PropertyListingController:
             # Generate a unique identifier for the property
             unique_property_id = str(uuid.uuid4())
             
-            # Upload images
-            encrypted_image_urls = await self.upload_property_images(
-                token_payload['sub'], 
-                images
+            # Images and documents share one per-listing limit and run together
+            limiter = listing_limiter()
+            
+            async def no_documents():
+                return []
+            
+            # Both sides always finish, so a failure on one side can undo the other
+            encrypted_image_urls, document_metadata_list = await asyncio.gather(
+                # Upload images
+                self.upload_property_images(
+                    token_payload['sub'], 
+                    images,
+                    limiter
+                ),
+                # Upload documents
+                self.upload_property_documents(
+                    token_payload['sub'],
+                    unique_property_id,
+                    documents,
+                    document_types,
+                    limiter
+                ) if documents and document_types else no_documents(),
+                return_exceptions=True
             )
             
-            # Upload documents
-            document_metadata_list = await self.upload_property_documents(
-                token_payload['sub'],
-                unique_property_id,
-                documents,
-                document_types
-            ) if documents and document_types else []
+            # A failed side has already removed its own files; remove the other side's
+            failures = [result for result in (encrypted_image_urls, document_metadata_list) if isinstance(result, BaseException)]
+            if failures:
+                if not isinstance(encrypted_image_urls, BaseException):
+                    await self.delete_images(encrypted_image_urls)
+                if not isinstance(document_metadata_list, BaseException):
+                    await self.release_documents(document_metadata_list)
+                raise failures[0]
             
             # Extract document hashes for blockchain verification
             document_hashes = [doc['document_hash'] for doc in document_metadata_list]
@@ -232,13 +324,20 @@ class PropertyListingController:
             
             # Insert into database
             properties_collection = db['properties']
-            await properties_collection.insert_one(property_listing)
+            try:
+                await properties_collection.insert_one(property_listing)
+            except Exception:
+                await self.delete_images(encrypted_image_urls)
+                await self.release_documents(document_metadata_list)
+                raise
             
             # Convert ObjectId to string for response
             property_listing['_id'] = str(property_listing['_id'])
             
             return property_listing
             
+        except HTTPException:
+            raise
         except Exception as e:
             logging.error(f"Error creating property listing: {str(e)}")
             raise HTTPException(
@@ -261,44 +360,44 @@ class PropertyListingController:
         """
         Update an existing property listing
         """
+        # Find the property and validate ownership
+        db = await get_database()
+        properties_collection = db['properties']
+        
+        property_doc = await properties_collection.find_one({
+            'id': property_id,
+            'seller_id': token_payload['sub']
+        })
+        
+        if not property_doc:
+            raise HTTPException(status_code=404, detail="Property not found or you don't have permission")
+        
+        # Initialize update fields
+        update_fields = {}
+        
+        # Handle basic property fields
+        if property_type:
+            update_fields['property_type'] = property_type
+        if square_feet:
+            update_fields['square_feet'] = square_feet
+        if price:
+            update_fields['price'] = price
+        if area:
+            update_fields['area'] = area
+        if description:
+            update_fields['description'] = description
+        if location:
+            update_fields['location'] = location
+        
+        # Handle images if provided
+        if images and len(images) > 0:
+            encrypted_image_urls = await self.upload_property_images(
+                token_payload['sub'], 
+                images
+            )
+            update_fields['images'] = encrypted_image_urls
+        
         try:
-            # Find the property and validate ownership
-            db = await get_database()
-            properties_collection = db['properties']
-            
-            property_doc = await properties_collection.find_one({
-                'id': property_id,
-                'seller_id': token_payload['sub']
-            })
-            
-            if not property_doc:
-                raise HTTPException(status_code=404, detail="Property not found or you don't have permission")
-            
-            # Initialize update fields
-            update_fields = {}
-            
-            # Handle basic property fields
-            if property_type:
-                update_fields['property_type'] = property_type
-            if square_feet:
-                update_fields['square_feet'] = square_feet
-            if price:
-                update_fields['price'] = price
-            if area:
-                update_fields['area'] = area
-            if description:
-                update_fields['description'] = description
-            if location:
-                update_fields['location'] = location
-            
-            # Handle images if provided
-            if images and len(images) > 0:
-                encrypted_image_urls = await self.upload_property_images(
-                    token_payload['sub'], 
-                    images
-                )
-                update_fields['images'] = encrypted_image_urls
-            
             # Handle documents if provided
             if documents and document_types and len(documents) > 0:
                 if len(documents) != len(document_types):
@@ -326,26 +425,30 @@ class PropertyListingController:
             
             if result.modified_count == 0:
                 raise HTTPException(status_code=500, detail="Failed to update property")
-            
-            # Get updated property
-            updated_property = await properties_collection.find_one({
-                'id': property_id,
-                'seller_id': token_payload['sub']
-            })
-            
-            # Convert MongoDB ObjectId to string
-            if '_id' in updated_property:
-                updated_property['_id'] = str(updated_property['_id'])
-            
-            return {
-                "message": "Property updated successfully",
-                "property": updated_property
-            }
-        finally:
-            # Ensure we close the Azure storage client after all operations
-            if hasattr(self, 'azure_storage') and self.azure_storage is not None:
-                await self.azure_storage.close()
-
+        except Exception:
+            # Nothing references the new uploads when the update did not go through
+            await self.delete_images(update_fields.get('images', []))
+            await self.release_documents(update_fields.get('documents', []))
+            raise
+        
+        # Drop the references held by the documents that were replaced
+        if 'documents' in update_fields:
+            await self.release_documents(property_doc.get('documents', []))
+        
+        # Get updated property
+        updated_property = await properties_collection.find_one({
+            'id': property_id,
+            'seller_id': token_payload['sub']
+        })
+        
+        # Convert MongoDB ObjectId to string
+        if '_id' in updated_property:
+            updated_property['_id'] = str(updated_property['_id'])
+        
+        return {
+            "message": "Property updated successfully",
+            "property": updated_property
+        }
     async def delete_property_listing(self, token_payload, property_id):
         """
         Delete a specific property listing
@@ -353,16 +456,31 @@ class PropertyListingController:
         db = await get_database()
         properties_collection = db['properties']
         
-        result = await properties_collection.delete_one({
+        property_doc = await properties_collection.find_one_and_delete({
             'id': property_id,
             'seller_id': token_payload['sub']
         })
         
-        if result.deleted_count == 0:
+        if not property_doc:
             raise HTTPException(status_code=404, detail="Property not found or you don't have permission")
         
+        await self.release_documents(property_doc.get('documents', []))
+        
         return {"message": "Property deleted successfully"}
 
+    async def release_documents(self, documents: List[dict]):
+        """
+        Release the stored content referenced by a listing's documents.
+        Content shared with other listings is kept until its last reference goes.
+        """
+        for document in documents:
+            if not document.get('content_ref'):
+                continue
+            try:
+                await self.secure_document_service.release_document(document['content_ref'])
+            except Exception as e:
+                logging.error(f"Failed to release document content {document['content_ref']}: {str(e)}")
+
     async def upload_additional_documents(
         self, 
         token_payload: dict, 
@@ -373,41 +491,41 @@ class PropertyListingController:
         """
         Upload additional documents for an existing property
         """
-        try:
-            # Ensure documents and types match
-            if len(documents) != len(document_types):
-                raise HTTPException(
-                    status_code=400, 
-                    detail="Number of documents must match document types"
-                )
-                
-            # Find the property and validate ownership
-            db = await get_database()
-            properties_collection = db['properties']
-            
-            property_doc = await properties_collection.find_one({
-                'id': property_id,
-                'seller_id': token_payload['sub']
-            })
-            
-            if not property_doc:
-                raise HTTPException(
-                    status_code=404, 
-                    detail="Property not found or you don't have permission"
-                )
-            
-            # Upload new documents
-            document_metadata_list = await self.upload_property_documents(
-                token_payload['sub'],
-                property_id,
-                documents,
-                document_types
+        # Ensure documents and types match
+        if len(documents) != len(document_types):
+            raise HTTPException(
+                status_code=400, 
+                detail="Number of documents must match document types"
             )
             
-            # Update the property with new documents
-            existing_documents = property_doc.get('documents', [])
-            
-            # Add new documents
+        # Find the property and validate ownership
+        db = await get_database()
+        properties_collection = db['properties']
+        
+        property_doc = await properties_collection.find_one({
+            'id': property_id,
+            'seller_id': token_payload['sub']
+        })
+        
+        if not property_doc:
+            raise HTTPException(
+                status_code=404, 
+                detail="Property not found or you don't have permission"
+            )
+        
+        # Upload new documents
+        document_metadata_list = await self.upload_property_documents(
+            token_payload['sub'],
+            property_id,
+            documents,
+            document_types
+        )
+        
+        # Update the property with new documents
+        existing_documents = property_doc.get('documents', [])
+        
+        # Add new documents, giving their references back if the listing is not updated
+        try:
             result = await properties_collection.update_one(
                 {'id': property_id, 'seller_id': token_payload['sub']},
                 {
@@ -425,16 +543,14 @@ class PropertyListingController:
                     status_code=500, 
                     detail="Failed to update property with new documents"
                 )
-            
-            return {
-                "message": "Documents uploaded successfully",
-                "added_documents": len(document_metadata_list)
-            }
-        finally:
-            # Ensure we close the Azure storage client after all operations
-            if hasattr(self, 'azure_storage') and self.azure_storage is not None:
-                await self.azure_storage.close()
-
+        except Exception:
+            await self.release_documents(document_metadata_list)
+            raise
+        
+        return {
+            "message": "Documents uploaded successfully",
+            "added_documents": len(document_metadata_list)
+        }
     async def get_seller_profile(self, token_payload: dict):
         """
         Retrieve seller profile details
@@ -502,24 +618,18 @@ class PropertyListingController:
         
         This method verifies access permissions and retrieves the actual image content
         """
-        try:
-            # If token payload is provided, verify access
-            if token_payload:
-                has_access = await self.verify_image_access(token_payload['sub'], container, image_path)
-                if not has_access:
-                    raise HTTPException(status_code=403, detail="Access denied to this image")
-            
-            # URL decode the image path to handle any encoded characters
-            decoded_image_path = urllib.parse.unquote(image_path)
-            
-            # Get the image content from Azure
-            image_content = await self.azure_storage.download_file(container, decoded_image_path)
-            return image_content
-        finally:
-            # Ensure we close the Azure storage client after all operations
-            if hasattr(self, 'azure_storage') and self.azure_storage is not None:
-                await self.azure_storage.close()
-
+        # If token payload is provided, verify access
+        if token_payload:
+            has_access = await self.verify_image_access(token_payload['sub'], container, image_path)
+            if not has_access:
+                raise HTTPException(status_code=403, detail="Access denied to this image")
+        
+        # URL decode the image path to handle any encoded characters
+        decoded_image_path = urllib.parse.unquote(image_path)
+        
+        # Get the image content from Azure
+        image_content = await self.azure_storage.download_file(container, decoded_image_path)
+        return image_content
     async def verify_image_access(self, user_id: str, container_name: str, blob_name: str) -> bool:
         """Verify if the user has access to the requested image"""
         try:
@@ -584,17 +694,25 @@ class DocumentAccessController:
     def __init__(self):
         self.auth_handler = AuthHandler()
 
-    async def list_document_requests(self, token_payload):
+    async def list_document_requests(self, token_payload, limit: Optional[int] = None, cursor: Optional[str] = None):
         """
-        Retrieve all document access requests for seller's properties
+        Retrieve document access requests for seller's properties, oldest first
+        
+        Listings and buyers are fetched in one batched query each rather than
+        per request. Returns the page and the cursor for the next one.
         """
         db = await get_database()
         document_requests_collection = db['document_requests']
         
-        # Find all document requests for properties owned by this seller
-        requests = await document_requests_collection.find({
-            'seller_id': token_payload['sub']
-        }).to_list(length=None)
+        # Find document requests for properties owned by this seller
+        requests, next_cursor = await find_page(
+            document_requests_collection, {'seller_id': token_payload['sub']}, limit, cursor
+        )
+        
+        properties, buyers = await asyncio.gather(
+            properties_by_id(db, (request.get('property_id') for request in requests)),
+            buyers_by_id(db, (request.get('buyer_id') for request in requests))
+        )
         
         # Enrich requests with property and buyer information
         for request in requests:
@@ -602,21 +720,19 @@ class DocumentAccessController:
                 request['id'] = str(request['_id'])
                 del request['_id']
                 
-            # Get property information
-            if 'property_id' in request:
-                property_doc = await db['properties'].find_one({'id': request['property_id']})
-                if property_doc:
-                    request['property_location'] = property_doc.get('location') or property_doc.get('area', 'Unknown location')
-                    request['property_reference'] = property_doc.get('reference_number') or property_doc.get('id')
+            # Property information
+            property_doc = properties.get(request.get('property_id'))
+            if property_doc:
+                request['property_location'] = property_doc.get('location') or property_doc.get('area', 'Unknown location')
+                request['property_reference'] = property_doc.get('reference_number') or property_doc.get('id')
             
-            # Get buyer information
-            if 'buyer_id' in request:
-                buyer_doc = await db['buyers'].find_one({'_id': ObjectId(request['buyer_id'])})
-                if buyer_doc:
-                    request['buyer_name'] = buyer_doc.get('name', 'Unknown buyer')
-                    request['buyer_email'] = buyer_doc.get('email', '')
-        
-        return requests
+            # Buyer information
+            buyer_doc = buyers.get(request.get('buyer_id'))
+            if buyer_doc:
+                request['buyer_name'] = buyer_doc.get('name', 'Unknown buyer')
+                request['buyer_email'] = buyer_doc.get('email', '')
+        
+        return requests, next_cursor
 
     async def get_request_details(self, token_payload, request_id):
         """
@@ -638,22 +754,26 @@ class DocumentAccessController:
         request['id'] = str(request['_id'])
         del request['_id']
         
-        # Get property information
-        if 'property_id' in request:
-            property_doc = await db['properties'].find_one({'id': request['property_id']})
-            if property_doc:
-                request['property_location'] = property_doc.get('location') or property_doc.get('area', 'Unknown location')
-                request['property_reference'] = property_doc.get('reference_number') or property_doc.get('id')
-                request['property_type'] = property_doc.get('property_type', 'Unknown type')
-                request['property_price'] = property_doc.get('price', 0)
+        # Property and buyer are independent, fetch them together
+        properties, buyers = await asyncio.gather(
+            properties_by_id(db, [request.get('property_id')], {**PROPERTY_SUMMARY_FIELDS, 'property_type': 1, 'price': 1}),
+            buyers_by_id(db, [request.get('buyer_id')])
+        )
         
-        # Get buyer information
-        if 'buyer_id' in request:
-            buyer_doc = await db['buyers'].find_one({'_id': ObjectId(request['buyer_id'])})
-            if buyer_doc:
-                request['buyer_name'] = buyer_doc.get('name', 'Unknown buyer')
-                request['buyer_email'] = buyer_doc.get('email', '')
-                request['buyer_phone'] = buyer_doc.get('mobile_number', '')
+        # Property information
+        property_doc = properties.get(request.get('property_id'))
+        if property_doc:
+            request['property_location'] = property_doc.get('location') or property_doc.get('area', 'Unknown location')
+            request['property_reference'] = property_doc.get('reference_number') or property_doc.get('id')
+            request['property_type'] = property_doc.get('property_type', 'Unknown type')
+            request['property_price'] = property_doc.get('price', 0)
+        
+        # Buyer information
+        buyer_doc = buyers.get(request.get('buyer_id'))
+        if buyer_doc:
+            request['buyer_name'] = buyer_doc.get('name', 'Unknown buyer')
+            request['buyer_email'] = buyer_doc.get('email', '')
+            request['buyer_phone'] = buyer_doc.get('mobile_number', '')
         
         return request
 
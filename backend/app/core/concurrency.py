@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FileSlots:
+    """
+    Process-wide cap on how many uploaded files are processed at once,
+    shared by every listing so a burst of large listings cannot starve the
+    crypto pool and the storage connection pool.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Metrics
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created on first use so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def run(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        async with self._get_semaphore():
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                result = await factory()
+                self.completed += 1
+                return result
+            except BaseException:
+                self.failed += 1
+                raise
+            finally:
+                self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+
+file_slots = FileSlots(settings.GLOBAL_FILE_CONCURRENCY)
+
+
+def listing_limiter() -> asyncio.Semaphore:
+    """Per-listing cap, shared by the image and document uploads of one listing"""
+    return asyncio.Semaphore(settings.LISTING_FILE_CONCURRENCY)
+
+
+async def gather_files(factories: List[Callable[[], Awaitable[Any]]], limiter: Optional[asyncio.Semaphore] = None,
+                       cleanup: Optional[Callable[[List[Any]], Awaitable[None]]] = None) -> List[Any]:
+    """
+    Run one coroutine factory per file under the per-listing and global caps.
+
+    Results come back in input order so array indices stay stable. Every file
+    is allowed to finish before the first error, in input order, is raised.
+    A failed file must remove whatever it stored itself; the results of the
+    files that succeeded are passed to cleanup (when given) before raising,
+    so a failed batch leaves nothing behind.
+    """
+    limiter = limiter or listing_limiter()
+
+    async def run(factory: Callable[[], Awaitable[Any]]) -> Any:
+        async with limiter:
+            return await file_slots.run(factory)
+
+    results = await asyncio.gather(*(run(factory) for factory in factories), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        completed = [result for result in results if not isinstance(result, BaseException)]
+        if cleanup and completed:
+            try:
+                await cleanup(completed)
+            except Exception as e:
+                logger.error(f"Cleanup after failed file batch failed: {str(e)}")
+        raise errors[0]
+    return results
+
+
+class SingleFlight:
+    """
+    Share one in-flight call among concurrent callers asking for the same key.
+
+    The call runs as its own task, so a caller that disconnects does not cancel
+    it for the others. Results (and exceptions) are only shared while the call
+    is in flight; the next caller after it finishes starts a fresh one.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Any, asyncio.Task] = {}
+
+        # Metrics
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Any, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run factory() once for concurrent callers with the same key.
+        Returns (result, shared), shared being True for callers that joined a call already in flight.
+        """
+        self.calls += 1
+        task = self._calls.get(key)
+        shared = task is not None
+
+        if shared:
+            self.coalesced += 1
+        else:
+            self.executed += 1
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: Any, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+            "coalesced_ratio": (self.coalesced / self.calls) if self.calls else None
+        }
+
+
+# Storage reads shared by concurrent requests for the same blob version
+blob_fetches = SingleFlight("blob_fetches")
@@ -20,7 +20,18 @@ class Settings(BaseSettings):
 
     # Database settings
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-    DATABASE_NAME: str = os.getenv("DATABASE_NAME", "suresign")
+    DATABASE_NAME: str = os.getenv("DATABASE_NAME", "real_estate_platform")
+    # One pooled Motor client per process; timeouts in milliseconds (0 = none)
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+    MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))
+    # Comma-separated wire compressors in preference order (zlib, zstd, snappy); empty disables
+    MONGO_COMPRESSORS: str = os.getenv("MONGO_COMPRESSORS", "")
+    MONGO_READ_PREFERENCE: str = os.getenv("MONGO_READ_PREFERENCE", "primary")
 
     # Email settings
     EMAIL_HOST: str = os.getenv("EMAIL_HOST", "smtp.gmail.com")
@@ -29,10 +40,16 @@ class Settings(BaseSettings):
     EMAIL_PASSWORD: str = os.getenv("EMAIL_PASSWORD", "your-app-password")
     EMAIL_FROM: str = os.getenv("EMAIL_FROM", "SureSign <your-email@gmail.com>")
 
+    # Storage backend ("azure" or "local" for offline development, CI and benchmarks)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "azure")
+    LOCAL_STORAGE_PATH: str = os.getenv("LOCAL_STORAGE_PATH", "local-storage")
+    LOCAL_STORAGE_BASE_URL: str = os.getenv("LOCAL_STORAGE_BASE_URL", "http://localhost:8000/local-storage")
+
     # Azure Storage settings
     AZURE_STORAGE_ACCOUNT_NAME: str = os.getenv("AZURE_STORAGE_ACCOUNT_NAME", "")
     AZURE_STORAGE_ACCOUNT_KEY: str = os.getenv("AZURE_STORAGE_ACCOUNT_KEY", "")
     AZURE_STORAGE_CONNECTION_STRING: str = os.getenv("AZURE_STORAGE_CONNECTION_STRING", "")
+    AZURE_ENDPOINT_SUFFIX: str = os.getenv("AZURE_ENDPOINT_SUFFIX", "core.windows.net")
     AZURE_CONTAINER_USER_SELFIES: str = os.getenv("AZURE_CONTAINER_USER_SELFIES", "sec-user-kyc-images")
     AZURE_CONTAINER_PROPERTY_DOCUMENTS: str = os.getenv("AZURE_CONTAINER_PROPERTY_DOCUMENTS", "property-documents")
     AZURE_CONTAINER_PROPERTY_IMAGES: str = os.getenv("AZURE_CONTAINER_PROPERTY_IMAGES", "property-images")
@@ -41,17 +58,75 @@ class Settings(BaseSettings):
     AZURE_CONTAINER_DEFAULT_POLICY: str = os.getenv("AZURE_CONTAINER_DEFAULT_POLICY", "private")
     AZURE_CONTAINER_SECURE_DOCUMENTS: str = os.getenv("AZURE_CONTAINER_SECURE_DOCUMENTS", "secure-documents")
     AZURE_CONTAINER_DOCUMENT_METADATA: str = os.getenv("AZURE_CONTAINER_DOCUMENT_METADATA", "document-metadata")
+    AZURE_POOL_CONNECTIONS: int = int(os.getenv("AZURE_POOL_CONNECTIONS", "100"))
+    AZURE_KEEPALIVE_SECONDS: int = int(os.getenv("AZURE_KEEPALIVE_SECONDS", "30"))
+    AZURE_STREAM_CHUNK_SIZE: int = int(os.getenv("AZURE_STREAM_CHUNK_SIZE", str(4 * 1024 * 1024)))
+    AZURE_UPLOAD_BLOCK_SIZE: int = int(os.getenv("AZURE_UPLOAD_BLOCK_SIZE", str(4 * 1024 * 1024)))
+    AZURE_UPLOAD_CONCURRENCY: int = int(os.getenv("AZURE_UPLOAD_CONCURRENCY", "4"))
 
     # Blockchain settings
     INFURA_URL: str = os.getenv("INFURA_URL", "")
     CONTRACT_ADDRESS: str = os.getenv("CONTRACT_ADDRESS", "")
     ETHEREUM_PRIVATE_KEY: str = os.getenv("ETHEREUM_PRIVATE_KEY", "")
 
+    # "http" uses INFURA_URL; "tester" runs an in-process EVM (needs eth-tester)
+    BLOCKCHAIN_PROVIDER: str = os.getenv("BLOCKCHAIN_PROVIDER", "http")
+    GAS_PRICE_REFRESH_SECONDS: int = int(os.getenv("GAS_PRICE_REFRESH_SECONDS", "30"))
+
+    # Document hashes are anchored on chain as one Merkle root per batch window
+    ANCHOR_BATCH_WINDOW_MS: int = int(os.getenv("ANCHOR_BATCH_WINDOW_MS", "2000"))
+    ANCHOR_MAX_BATCH_SIZE: int = int(os.getenv("ANCHOR_MAX_BATCH_SIZE", "256"))
+    # Outbox worker: retry backoff, attempts before a registration is marked failed, and sender lease
+    ANCHOR_RETRY_BASE_SECONDS: int = int(os.getenv("ANCHOR_RETRY_BASE_SECONDS", "5"))
+    ANCHOR_RETRY_MAX_SECONDS: int = int(os.getenv("ANCHOR_RETRY_MAX_SECONDS", "600"))
+    ANCHOR_MAX_ATTEMPTS: int = int(os.getenv("ANCHOR_MAX_ATTEMPTS", "10"))
+    ANCHOR_LEASE_SECONDS: int = int(os.getenv("ANCHOR_LEASE_SECONDS", "30"))
+    # How long a batch transaction may take to be mined before the batch is retried
+    ANCHOR_RECEIPT_TIMEOUT_SECONDS: int = int(os.getenv("ANCHOR_RECEIPT_TIMEOUT_SECONDS", "120"))
+
     # Encryption settings
     FILE_ENCRYPTION_KEY: str = os.getenv("FILE_ENCRYPTION_KEY", "")
     ENCRYPTION_SALT: str = os.getenv("ENCRYPTION_SALT", "")
     DOCUMENT_SECURITY_KEY: str = os.getenv("DOCUMENT_SECURITY_KEY", "")
 
+    # Envelope encryption: versioned key-encryption keys ("v1:<base64 32-byte key>,v2:...") and the one used for new documents
+    DOCUMENT_KEKS: str = os.getenv("DOCUMENT_KEKS", "")
+    DOCUMENT_KEK_ACTIVE: str = os.getenv("DOCUMENT_KEK_ACTIVE", "")
+    # Background rewrap of data keys onto the active KEK (0 disables the periodic run)
+    KEY_ROTATION_INTERVAL_SECONDS: int = int(os.getenv("KEY_ROTATION_INTERVAL_SECONDS", "3600"))
+    KEY_ROTATION_BATCH_SIZE: int = int(os.getenv("KEY_ROTATION_BATCH_SIZE", "500"))
+
+    # Document signing keys: PEM files named <kid>.pem, algorithm "ed25519" or "rsa-pss"
+    DOCUMENT_SIGNING_ALGORITHM: str = os.getenv("DOCUMENT_SIGNING_ALGORITHM", "ed25519")
+    DOCUMENT_SIGNING_KEYS_PATH: str = os.getenv("DOCUMENT_SIGNING_KEYS_PATH", "signing-keys")
+    DOCUMENT_SIGNING_KEY_ID: str = os.getenv("DOCUMENT_SIGNING_KEY_ID", "")
+
+    # Derived key cache settings
+    KEY_CACHE_MAX_ENTRIES: int = int(os.getenv("KEY_CACHE_MAX_ENTRIES", "1024"))
+    KEY_CACHE_TTL_SECONDS: int = int(os.getenv("KEY_CACHE_TTL_SECONDS", "900"))
+
+    # Worker pool settings (WATERMARK_PROCESS_POOL_SIZE=0 falls back to threads)
+    CRYPTO_THREAD_POOL_SIZE: int = int(os.getenv("CRYPTO_THREAD_POOL_SIZE", "4"))
+    WATERMARK_PROCESS_POOL_SIZE: int = int(os.getenv("WATERMARK_PROCESS_POOL_SIZE", "2"))
+    IMAGE_THREAD_POOL_SIZE: int = int(os.getenv("IMAGE_THREAD_POOL_SIZE", "2"))
+
+    # Image delivery: "proxy" streams bytes through the API, "redirect" answers 307 to a short-lived signed URL
+    IMAGE_DELIVERY_MODE: str = os.getenv("IMAGE_DELIVERY_MODE", "proxy")
+    IMAGE_SAS_TTL_SECONDS: int = int(os.getenv("IMAGE_SAS_TTL_SECONDS", "900"))
+    IMAGE_SAS_REFRESH_MARGIN_SECONDS: int = int(os.getenv("IMAGE_SAS_REFRESH_MARGIN_SECONDS", "120"))
+
+    # Read-through blob cache (comma-separated containers or aliases, empty disables it)
+    BLOB_CACHE_CONTAINERS: str = os.getenv("BLOB_CACHE_CONTAINERS", "property_images")
+    BLOB_CACHE_MEMORY_BYTES: int = int(os.getenv("BLOB_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+    BLOB_CACHE_DISK_BYTES: int = int(os.getenv("BLOB_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+    BLOB_CACHE_DISK_PATH: str = os.getenv("BLOB_CACHE_DISK_PATH", "blob-cache")
+    BLOB_CACHE_MAX_ENTRY_BYTES: int = int(os.getenv("BLOB_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024)))
+    BLOB_CACHE_REVALIDATE_SECONDS: int = int(os.getenv("BLOB_CACHE_REVALIDATE_SECONDS", "60"))
+
+    # File processing concurrency (per listing and across the whole process)
+    LISTING_FILE_CONCURRENCY: int = int(os.getenv("LISTING_FILE_CONCURRENCY", "4"))
+    GLOBAL_FILE_CONCURRENCY: int = int(os.getenv("GLOBAL_FILE_CONCURRENCY", "16"))
+
     # Document settings
     MAX_DOCUMENT_SIZE_MB: int = 10
     ALLOWED_DOCUMENT_TYPES: list = ["application/pdf"]
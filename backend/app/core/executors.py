@@ -0,0 +1,167 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(submitted_at: float, fn: Callable, args: tuple, kwargs: dict):
+    """
+    Run fn inside the pool worker and report how long it waited in the queue.
+    Module-level so it can be pickled into process pool workers.
+    """
+    wait_seconds = max(0.0, time.time() - submitted_at)
+    return wait_seconds, fn(*args, **kwargs)
+
+
+class InstrumentedExecutor:
+    """
+    Wrapper around a thread or process pool that keeps queue-depth and
+    wait-time metrics for every task submitted from the event loop.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        """Create the underlying pool on first use"""
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.name
+                )
+            logger.info(f"Started {self.kind} pool '{self.name}' with {self.max_workers} workers")
+        return self._executor
+
+    def _queue_depth(self) -> int:
+        # Tasks beyond the worker count are waiting for a free worker
+        return max(0, self.in_flight - self.max_workers)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) in the pool and await its result
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue_depth())
+
+        try:
+            wait_seconds, result = await loop.run_in_executor(
+                executor,
+                functools.partial(_timed_call, time.time(), fn, args, kwargs)
+            )
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+                self.failed += 1
+            raise
+
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue-depth and wait-time metrics for this pool"""
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "queue_depth": self._queue_depth(),
+                "max_queue_depth": self.max_queue_depth,
+                "avg_wait_ms": (self.total_wait_seconds / self.completed * 1000) if self.completed else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            logger.info(f"Stopped {self.kind} pool '{self.name}'")
+
+
+# Thread pool for crypto work; hashlib and the cryptography backend release the GIL
+crypto_executor = InstrumentedExecutor(
+    name="crypto",
+    kind="thread",
+    max_workers=settings.CRYPTO_THREAD_POOL_SIZE
+)
+
+# Process pool for pure-Python PDF work (PyPDF2 + reportlab hold the GIL)
+watermark_executor = InstrumentedExecutor(
+    name="watermark",
+    kind="process" if settings.WATERMARK_PROCESS_POOL_SIZE > 0 else "thread",
+    max_workers=settings.WATERMARK_PROCESS_POOL_SIZE or settings.CRYPTO_THREAD_POOL_SIZE
+)
+
+# Thread pool for image resizing and encoding; Pillow releases the GIL while it works
+image_executor = InstrumentedExecutor(
+    name="image",
+    kind="thread",
+    max_workers=settings.IMAGE_THREAD_POOL_SIZE
+)
+
+
+async def run_crypto(fn: Callable, *args, **kwargs) -> Any:
+    """Run a GIL-releasing crypto or hashing function off the event loop"""
+    return await crypto_executor.run(fn, *args, **kwargs)
+
+
+async def run_watermark(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run a CPU-bound document function in the watermark pool.
+    fn and its arguments must be picklable when the process pool is enabled.
+    """
+    return await watermark_executor.run(fn, *args, **kwargs)
+
+
+async def run_image(fn: Callable, *args, **kwargs) -> Any:
+    """Run an image resize or encode function off the event loop"""
+    return await image_executor.run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        crypto_executor.name: crypto_executor.stats(),
+        watermark_executor.name: watermark_executor.stats(),
+        image_executor.name: image_executor.stats()
+    }
+
+
+def shutdown_executors() -> None:
+    crypto_executor.shutdown()
+    watermark_executor.shutdown()
+    image_executor.shutdown()
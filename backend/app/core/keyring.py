@@ -0,0 +1,95 @@
+import os
+import base64
+import logging
+from typing import Dict, Optional, Tuple
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DATA_KEY_BYTES = 32
+WRAP_ALGORITHM = "AES-256-GCM"
+
+
+class KeyEncryptionKeys:
+    """
+    Versioned key-encryption keys (KEKs) for envelope encryption.
+
+    Every document is encrypted with its own random data key; only the data key
+    is encrypted ("wrapped") with a KEK. Wrapping and unwrapping is a single
+    AES-GCM operation on 32 bytes, so no KDF runs on the read path, and moving
+    to a new KEK means rewrapping data keys instead of re-encrypting documents.
+
+    KEKs are configured as DOCUMENT_KEKS="v1:<base64 key>,v2:<base64 key>" with
+    DOCUMENT_KEK_ACTIVE naming the version used for new wraps. Retired versions
+    stay listed until the rotation job has rewrapped every data key under them.
+    """
+
+    def __init__(self, spec: str, active_version: str):
+        self._keys: Dict[str, AESGCM] = {}
+        for entry in filter(None, (part.strip() for part in spec.split(","))):
+            version, _, encoded = entry.partition(":")
+            key = base64.urlsafe_b64decode(encoded.strip())
+            if len(key) != DATA_KEY_BYTES:
+                raise ValueError(f"Key-encryption key {version} must be {DATA_KEY_BYTES} bytes")
+            self._keys[version.strip()] = AESGCM(key)
+
+        self.active_version = active_version or (list(self._keys)[-1] if self._keys else None)
+        if self._keys and self.active_version not in self._keys:
+            raise ValueError(f"Active key-encryption key {self.active_version} is not configured")
+
+        # Metrics
+        self.wrapped = 0
+        self.unwrapped = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self._keys)
+
+    def _get(self, version: str) -> AESGCM:
+        kek = self._keys.get(version)
+        if kek is None:
+            # Never fall back to a generated key: data wrapped by it would be lost on restart
+            raise RuntimeError(f"Key-encryption key {version} is not configured (DOCUMENT_KEKS)")
+        return kek
+
+    @staticmethod
+    def generate_data_key() -> bytes:
+        return AESGCM.generate_key(bit_length=DATA_KEY_BYTES * 8)
+
+    def wrap(self, data_key: bytes, context: str, version: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Wrap a data key with the active (or given) KEK, bound to context (the document hash)
+
+        :return: (KEK version, base64 nonce + wrapped key)
+        """
+        version = version or self.active_version
+        if version is None:
+            raise RuntimeError("No key-encryption key is configured (DOCUMENT_KEKS)")
+        nonce = os.urandom(12)
+        wrapped = self._get(version).encrypt(nonce, data_key, f"{version}:{context}".encode())
+        self.wrapped += 1
+        return version, base64.b64encode(nonce + wrapped).decode()
+
+    def unwrap(self, version: str, wrapped_key: str, context: str) -> bytes:
+        raw = base64.b64decode(wrapped_key)
+        data_key = self._get(version).decrypt(raw[:12], raw[12:], f"{version}:{context}".encode())
+        self.unwrapped += 1
+        return data_key
+
+    def rewrap(self, version: str, wrapped_key: str, context: str) -> Tuple[str, str]:
+        """Move a wrapped data key to the active KEK"""
+        return self.wrap(self.unwrap(version, wrapped_key, context), context)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "active_version": self.active_version,
+            "versions": list(self._keys),
+            "wrapped": self.wrapped,
+            "unwrapped": self.unwrapped
+        }
+
+
+# Singleton instance shared by the document services
+document_keks = KeyEncryptionKeys(settings.DOCUMENT_KEKS, settings.DOCUMENT_KEK_ACTIVE)
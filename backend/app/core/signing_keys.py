@@ -0,0 +1,172 @@
+import os
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ALGORITHMS = ("ed25519", "rsa-pss")
+
+_PSS = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+
+def _generate(algorithm: str):
+    if algorithm == "ed25519":
+        return ed25519.Ed25519PrivateKey.generate()
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _algorithm_of(key) -> str:
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return "ed25519"
+    return "rsa-pss"
+
+
+class SigningKeyStore:
+    """
+    Document signing keys stored as PEM files, one per key id (<kid>.pem), under
+    DOCUMENT_SIGNING_KEYS_PATH (a mounted secret volume in production).
+
+    Every worker and every restart loads the same keys, so a signature made by
+    one can be verified by all. Signatures are "<kid>:<base64 signature>" and are
+    verified with the key they name, so retired keys left in the directory keep
+    verifying old signatures. Keys are loaded on first use, not at import time.
+
+    When the active key file does not exist yet it is generated, written in full
+    to a temp file and published with os.link, which fails if the file already
+    exists; a worker that loses the race loads the winner's key instead, so
+    concurrently starting workers end up sharing one key and never read a partial one.
+    Signatures cover the SHA-256 digest of the document for both algorithms.
+    """
+
+    def __init__(self, path: str, active_kid: str, algorithm: str):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown signing algorithm '{algorithm}', expected one of: {', '.join(ALGORITHMS)}")
+        self.path = os.path.abspath(path)
+        self.active_kid = active_kid or algorithm
+        self.algorithm = algorithm
+        self._private_key = None
+        self._public_keys: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.signed = 0
+        self.verified = 0
+        self.rejected = 0
+
+    def _key_path(self, kid: str) -> str:
+        if not kid or os.sep in kid or kid.startswith('.'):
+            raise ValueError(f"Invalid signing key id '{kid}'")
+        return os.path.join(self.path, f"{kid}.pem")
+
+    def _load_or_create_active(self):
+        path = self._key_path(self.active_kid)
+        try:
+            with open(path, 'rb') as handle:
+                return serialization.load_pem_private_key(handle.read(), password=None)
+        except FileNotFoundError:
+            pass
+
+        key = _generate(self.algorithm)
+        pem = key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        os.makedirs(self.path, exist_ok=True)
+        # Write the whole key to a temp file (created 0600) and link it into place,
+        # so other workers never read a partially written key
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(pem)
+                handle.flush()
+                os.fsync(handle.fileno())
+            try:
+                os.link(tmp_path, path)
+            except FileExistsError:
+                # Another worker published it first; use theirs
+                with open(path, 'rb') as handle:
+                    return serialization.load_pem_private_key(handle.read(), password=None)
+        finally:
+            os.unlink(tmp_path)
+        logger.warning(f"Generated {self.algorithm} document signing key {self.active_kid} at {path}")
+        return key
+
+    def _active_key(self):
+        if self._private_key is None:
+            with self._lock:
+                if self._private_key is None:
+                    key = self._load_or_create_active()
+                    self._public_keys[self.active_kid] = key.public_key()
+                    self._private_key = key
+        return self._private_key
+
+    def _public_key(self, kid: str):
+        key = self._public_keys.get(kid)
+        if key is None:
+            with open(self._key_path(kid), 'rb') as handle:
+                key = serialization.load_pem_private_key(handle.read(), password=None).public_key()
+            with self._lock:
+                self._public_keys[kid] = key
+        return key
+
+    def sign(self, data: bytes) -> str:
+        """Sign a document, returning '<kid>:<base64 signature>'"""
+        key = self._active_key()
+        digest = hashlib.sha256(data).digest()
+        if _algorithm_of(key) == "ed25519":
+            signature = key.sign(digest)
+        else:
+            signature = key.sign(digest, _PSS, hashes.SHA256())
+        self.signed += 1
+        return f"{self.active_kid}:{base64.b64encode(signature).decode()}"
+
+    def verify(self, data: bytes, signature: str) -> bool:
+        """
+        Verify a signature made by sign(). Signatures without a key id were made
+        by per-process keys that no longer exist and cannot be verified.
+        """
+        kid, separator, encoded = (signature or "").partition(":")
+        if not separator:
+            self.rejected += 1
+            return False
+        try:
+            key = self._public_key(kid)
+            digest = hashlib.sha256(data).digest()
+            if _algorithm_of(key) == "ed25519":
+                key.verify(base64.b64decode(encoded), digest)
+            else:
+                key.verify(base64.b64decode(encoded), digest, _PSS, hashes.SHA256())
+        except (InvalidSignature, OSError, ValueError) as e:
+            logger.error(f"Signature verification failed for key {kid}: {str(e)}")
+            self.rejected += 1
+            return False
+        self.verified += 1
+        return True
+
+    def stats(self) -> Dict[str, Optional[object]]:
+        return {
+            "algorithm": self.algorithm,
+            "active_kid": self.active_kid,
+            "loaded_keys": list(self._public_keys),
+            "signed": self.signed,
+            "verified": self.verified,
+            "rejected": self.rejected
+        }
+
+
+# Singleton instance shared by the document services
+signing_keys = SigningKeyStore(
+    path=settings.DOCUMENT_SIGNING_KEYS_PATH,
+    active_kid=settings.DOCUMENT_SIGNING_KEY_ID,
+    algorithm=settings.DOCUMENT_SIGNING_ALGORITHM.lower()
+)
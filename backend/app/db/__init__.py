@@ -1 +0,0 @@
-# Database package 
\ No newline at end of file
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.middleware.auth_middleware import AuthHandler
+from app.utils.key_cache import derived_key_cache
+from app.core.executors import executor_stats
+from app.core.concurrency import blob_fetches, file_slots
+from app.storage.cache import blob_cache
+from app.storage.signed_urls import signed_url_cache
+from app.services.key_rotation import key_rotation_job
+from app.core.signing_keys import signing_keys
+from app.blockchain.anchoring import document_anchoring
+from app.config.indexes import index_report
+from app.config.db import pool_monitor
+
+router = APIRouter(tags=["Admin"])
+
+@router.get("/metrics")
+async def get_metrics(token_payload: dict = Depends(AuthHandler.auth_wrapper)):
+    """
+    Runtime performance counters for the document pipeline
+
+    This endpoint is admin-only and reports cache and pool statistics
+    collected since the worker process started
+    """
+    # Check if user is admin
+    if token_payload.get('type') != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required for this operation")
+
+    return {
+        "derived_key_cache": derived_key_cache.stats(),
+        "executors": executor_stats(),
+        "file_slots": file_slots.stats(),
+        "blob_cache": blob_cache.stats(),
+        "signed_url_cache": signed_url_cache.stats(),
+        "blob_fetches": blob_fetches.stats(),
+        "key_rotation": key_rotation_job.stats(),
+        "signing_keys": signing_keys.stats(),
+        "document_anchoring": document_anchoring.stats(),
+        "mongo_pool": pool_monitor.stats()
+    }
+
+@router.post("/keys/rotate")
+async def rotate_document_keys(token_payload: dict = Depends(AuthHandler.auth_wrapper)):
+    """
+    Rewrap every document data key onto the active key-encryption key now,
+    instead of waiting for the next scheduled run
+    """
+    # Check if user is admin
+    if token_payload.get('type') != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required for this operation")
+
+    return await key_rotation_job.run_once()
+
+@router.get("/indexes")
+async def get_index_report(token_payload: dict = Depends(AuthHandler.auth_wrapper)):
+    """
+    Declared MongoDB indexes per collection, any that are missing or failed
+    to build, and hot queries whose plan falls back to a collection scan
+    """
+    # Check if user is admin
+    if token_payload.get('type') != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required for this operation")
+
+    return await index_report()
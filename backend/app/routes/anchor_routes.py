@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from app.middleware.auth_middleware import AuthHandler
+from app.blockchain.anchoring import document_anchoring
+
+router = APIRouter()
+
+@router.get("/documents/{document_id}/verify")
+async def verify_document_anchor(
+    document_id: str = Path(..., description="ID of the document in its listing"),
+    document_hash: str = Query(..., description="SHA-256 of the document content, hex encoded"),
+    token_payload: dict = Depends(AuthHandler.auth_wrapper)
+):
+    """
+    Check a document hash against its Merkle inclusion proof and the root
+    anchored on chain for its batch. Documents still queued for anchoring
+    report their outbox status with valid set to null.
+    """
+    if len(document_hash) != 64:
+        raise HTTPException(status_code=400, detail="document_hash must be a 64-character hexadecimal SHA-256")
+
+    result = await document_anchoring.verify_document(document_id, document_hash.lower())
+    if result is None:
+        raise HTTPException(status_code=404, detail="No anchoring record for this document")
+    return result
@@ -3,7 +3,10 @@ from typing import List, Optional, Dict
 from app.controllers.buyer import BuyerController
 from app.middleware.auth_middleware import AuthHandler
 from app.config.db import get_database
-from app.config.azure_config import AzureStorageService
+from app.config.azure_config import get_storage_service
+from app.storage.base import StorageBackend
+from app.utils.http_range import blob_response, image_response
+from app.utils.image_variants import select_variant
 import logging
 from bson import ObjectId
 from pydantic import BaseModel
@@ -71,6 +74,8 @@ async def update_profile(
     
     try:
         return await buyer_controller.update_buyer_profile(token_payload, updated_data, profile_image)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error updating profile: {str(e)}")
         raise HTTPException(
@@ -114,11 +119,10 @@ async def get_property_details(property_id: str, token_payload = Depends(AuthHan
         raise HTTPException(status_code=500, detail=f"Failed to retrieve property details: {str(e)}")
 
 @router.get("/image/{user_id}")
-async def get_user_image(user_id: str, response: Response):
+async def get_user_image(user_id: str, request: Request, response: Response, azure_storage: StorageBackend = Depends(get_storage_service)):
     """
     Get user image - simplified version that directly accesses the known container
     """
-    azure_storage = None
     try:
         # Get the user's selfie filename from database
         db = await get_database()
@@ -127,8 +131,6 @@ async def get_user_image(user_id: str, response: Response):
         if not user:
             user = await db['sellers'].find_one({"_id": ObjectId(user_id)})
         
-        # Create Azure storage service
-        azure_storage = AzureStorageService()
         container_name = "sec-user-kyc-images"  # Use the known working container
         
         # If we found the user, try to get their image
@@ -139,55 +141,49 @@ async def get_user_image(user_id: str, response: Response):
                 if not blob_name:
                     return Response(status_code=404)
                     
-                # Get blob service client
-                blob_service_client = await azure_storage.get_blob_service_client()
-                
-                # Get blob client
-                blob_client = blob_service_client.get_blob_client(
-                    container=container_name,
-                    blob=blob_name
-                )
-                
-                # Download blob
-                download_stream = await blob_client.download_blob()
-                content = await download_stream.readall()
-                
-                # Set cache headers
-                response.headers["Cache-Control"] = "public, max-age=3600"
-                
                 # Determine content type
                 content_type = "image/jpeg"
                 if blob_name.lower().endswith('.png'):
                     content_type = "image/png"
                 
-                return Response(
-                    content=content,
-                    media_type=content_type
+                # Stream the image, honouring Range requests
+                return await blob_response(
+                    azure_storage,
+                    request,
+                    container_name,
+                    blob_name,
+                    content_type,
+                    headers={"Cache-Control": "public, max-age=3600"}
                 )
+            except HTTPException:
+                raise
             except Exception as e:
                 logging.error(f"Error downloading image: {str(e)}")
                 return Response(status_code=404)
                 
         return Response(status_code=404)
             
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error serving image: {str(e)}")
         return Response(status_code=404)
-    finally:
-        # Close Azure storage client
-        if azure_storage:
-            await azure_storage.close()
 
 @router.get("/property-image/{property_id}/{image_index}")
 async def get_property_image(
     property_id: str, 
     image_index: int,
-    response: Response
+    request: Request,
+    response: Response,
+    size: Optional[str] = None,
+    azure_storage: StorageBackend = Depends(get_storage_service)
 ):
     """
     Get a property image by property ID and image index
+
+    ?size= selects a variant (thumb, card, full or original); WebP is served
+    when the Accept header allows it
     """
-    azure_storage = None
     try:
         # Get property from database
         db = await get_database()
@@ -199,8 +195,6 @@ async def get_property_image(
         # Get image data from property
         image_data = property_doc['images'][image_index]
         
-        # Create Azure storage service
-        azure_storage = AzureStorageService()
         
         # Get the filename from the image data
         blob_name = image_data.get('filename')
@@ -219,39 +213,39 @@ async def get_property_image(
         logging.info(f"Retrieving property image: container={container_name}, blob={blob_name}")
         
         try:
-            # Get blob service client
-            blob_service_client = await azure_storage.get_blob_service_client()
-            
-            # Get blob client
-            blob_client = blob_service_client.get_blob_client(
-                container=container_name,
-                blob=blob_name
-            )
-            
-            # Download blob
-            download_stream = await blob_client.download_blob()
-            content = await download_stream.readall()
-            
-            # Set cache headers
-            response.headers["Cache-Control"] = "public, max-age=3600"
-            
             # Get content type from image data or default to jpeg
             content_type = image_data.get('content_type', 'image/jpeg')
             
-            return Response(
-                content=content,
-                media_type=content_type
+            # Serve the smallest stored variant that fits ?size= and the Accept header
+            variant = select_variant(image_data, size, request.headers.get('accept'))
+            if variant:
+                blob_name = variant['filename']
+                content_type = variant['content_type']
+            
+            image_headers = {"Cache-Control": "public, max-age=3600"}
+            if image_data.get('variants'):
+                image_headers["Vary"] = "Accept"
+            
+            # Stream or redirect to the image, honouring Range requests
+            return await image_response(
+                azure_storage,
+                request,
+                container_name,
+                blob_name,
+                content_type,
+                headers=image_headers
             )
+        except HTTPException:
+            raise
         except Exception as e:
             logging.error(f"Error downloading image: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to download image: {str(e)}")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error serving image: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve image: {str(e)}")
-    finally:
-        if azure_storage:
-            await azure_storage.close()
 
 @router.post("/request-documents/{property_id}")
 async def request_document_access(
@@ -294,16 +288,23 @@ async def get_document_access(
 
 @router.get("/my-document-requests")
 async def list_my_document_requests(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; all requests when omitted"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     token_payload: dict = Depends(AuthHandler.auth_wrapper)
 ):
     """
-    List all document requests made by the buyer
+    List document requests made by the buyer, oldest first. When more
+    remain, the next page's cursor is in X-Next-Cursor.
     """
     try:
         if token_payload.get('type') != 'buyer':
             raise HTTPException(status_code=403, detail="Only buyers can access their document requests")
             
-        return await buyer_controller.list_my_document_requests(token_payload)
+        requests, next_cursor = await buyer_controller.list_my_document_requests(token_payload, limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return requests
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -316,13 +317,12 @@ async def get_property_document(
     document_index: int = Path(..., description="Index of the document in the property's documents array"),
     token: str = Query(..., description="JWT token for authentication"),
     request: Request = None,
-    db=Depends(get_database)
+    db=Depends(get_database),
+    azure_storage: StorageBackend = Depends(get_storage_service)
 ):
     """
     Get a property document with decryption and watermarking for buyers
     """
-    azure_storage = None
-    
     try:
         # Verify token and get buyer info
         try:
@@ -345,8 +345,6 @@ async def get_property_document(
         property_doc = property_data['documents'][document_index]
         logging.info(f"Retrieved property document info: {json.dumps(property_doc, default=str)}")
         
-        # Initialize Azure storage
-        azure_storage = AzureStorageService()
         
         # Get the encrypted document URL and document ID
         encrypted_url = property_doc.get('encrypted_url')
@@ -366,7 +364,8 @@ async def get_property_document(
             document_content = await secure_doc_service.retrieve_document(
                 document_id=document_id,
                 owner_id=property_data['seller_id'],
-                property_id=property_id
+                property_id=property_id,
+                content_ref=property_doc.get('content_ref')
             )
             
             if not document_content or len(document_content) == 0:
@@ -460,9 +459,6 @@ async def get_property_document(
     except Exception as e:
         logging.error(f"Error in get_property_document: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        if azure_storage:
-            await azure_storage.close()
 
 @router.post("/property/{property_id}/verify-with-lawyer")
 async def add_lawyer_for_verification(
@@ -555,13 +551,12 @@ async def get_property_document_for_lawyer(
     document_index: int = Path(..., description="Index of the document in the property's documents array"),
     token: str = Query(..., description="Lawyer verification token"),
     request: Request = None,
-    db=Depends(get_database)
+    db=Depends(get_database),
+    azure_storage: StorageBackend = Depends(get_storage_service)
 ):
     """
     Allow a lawyer to download a property document using their verification token
     """
-    azure_storage = None
-    
     try:
         # Track lawyer document access first
         await buyer_controller.track_lawyer_document_access(property_id, token, document_index)
@@ -585,8 +580,6 @@ async def get_property_document_for_lawyer(
         property_doc = property_data['documents'][document_index]
         logging.info(f"Retrieved property document info for lawyer: {json.dumps(property_doc, default=str)}")
         
-        # Initialize Azure storage
-        azure_storage = AzureStorageService()
         
         # Get the encrypted document URL and document ID
         encrypted_url = property_doc.get('encrypted_url')
@@ -606,7 +599,8 @@ async def get_property_document_for_lawyer(
             document_content = await secure_doc_service.retrieve_document(
                 document_id=document_id,
                 owner_id=property_data['seller_id'],
-                property_id=property_id
+                property_id=property_id,
+                content_ref=property_doc.get('content_ref')
             )
             
             if not document_content or len(document_content) == 0:
@@ -707,6 +701,3 @@ async def get_property_document_for_lawyer(
     except Exception as e:
         logging.error(f"Error in get_property_document_for_lawyer: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        if azure_storage:
-            await azure_storage.close()
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, Request, Depends
+from typing import Optional
+import mimetypes
+from app.config.azure_config import get_storage_service
+from app.storage.base import StorageBackend
+from app.utils.http_range import blob_response
+
+router = APIRouter()
+
+@router.get("/{container_name}/{blob_name:path}")
+async def get_local_blob(
+    request: Request,
+    container_name: str,
+    blob_name: str,
+    se: Optional[int] = None,
+    sig: Optional[str] = None,
+    storage: StorageBackend = Depends(get_storage_service)
+):
+    """
+    Serve a blob from the local storage backend, standing in for a blob URL.
+    Signed URLs from generate_url are checked here; unsigned ones only work
+    when containers are public.
+    """
+    if not storage.public_access:
+        if se is None or not sig or not storage.verify_signature(container_name, blob_name, se, sig):
+            raise HTTPException(status_code=403, detail="Invalid or expired signature")
+
+    media_type = mimetypes.guess_type(blob_name)[0] or "application/octet-stream"
+    return await blob_response(storage, request, container_name, blob_name, media_type)
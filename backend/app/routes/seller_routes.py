@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, File, UploadFile, Form, Path, Body, Request, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, File, UploadFile, Form, Path, Body, Request, Query
 from typing import List, Optional
 from bson import ObjectId
-from app.config.azure_config import AzureStorageService
+from app.config.azure_config import get_storage_service
+from app.storage.base import StorageBackend
 from app.controllers.seller import PropertyListingController, DocumentAccessController
 from app.controllers.auth import AuthController
 from app.middleware.auth_middleware import AuthHandler
@@ -24,6 +25,10 @@ from io import BytesIO
 import zipfile
 from app.utils.encryption import FileEncryptor
 from app.core.config import settings
+from app.core.executors import run_crypto
+from app.utils.uploads import iter_upload, max_image_bytes
+from app.utils.http_range import blob_response, image_response
+from app.utils.image_variants import select_variant
 import json
 
 router = APIRouter(tags=["Seller"])
@@ -36,12 +41,12 @@ async def update_profile(
     email: str = Form(...),
     mobile_number: str = Form(...),
     profile_image: Optional[UploadFile] = File(None),
-    token_payload: dict = Depends(AuthHandler.auth_wrapper)
+    token_payload: dict = Depends(AuthHandler.auth_wrapper),
+    azure_storage: StorageBackend = Depends(get_storage_service)
 ):
     """
     Update seller profile information and optionally the profile image
     """
-    azure_storage = None
     try:
         db = await get_database()
         seller_id = ObjectId(token_payload['sub'])
@@ -56,20 +61,18 @@ async def update_profile(
         # Handle profile image upload if provided
         if profile_image:
             try:
-                # Create Azure storage service
-                azure_storage = AzureStorageService()
                 container_name = "sec-user-kyc-images"
                 
                 # Generate unique filename for the image
                 file_ext = profile_image.filename.split('.')[-1]
                 new_filename = f"{uuid.uuid4().hex}.{file_ext}"
                 
-                # Upload to Azure
-                content = await profile_image.read()
-                blob_url = await azure_storage.upload_file(
+                # Stream to Azure, rejecting oversized images early
+                blob_url = await azure_storage.upload_stream(
                     container_name,
                     new_filename,
-                    content
+                    iter_upload(profile_image, max_image_bytes()),
+                    content_type=profile_image.content_type
                 )
                 
                 # Add image info to update data
@@ -90,6 +93,8 @@ async def update_profile(
                     except Exception as delete_error:
                         logging.error(f"Error deleting old profile image: {str(delete_error)}")
                 
+            except HTTPException:
+                raise
             except Exception as upload_error:
                 logging.error(f"Error uploading profile image: {str(upload_error)}")
                 raise HTTPException(
@@ -134,10 +139,6 @@ async def update_profile(
             status_code=500,
             detail="Internal server error while updating profile"
         )
-    finally:
-        # Close Azure storage client
-        if azure_storage:
-            await azure_storage.close()
 
 @router.get("/get-seller")
 async def get_seller_profile(token_payload = Depends(AuthHandler.auth_wrapper)):
@@ -147,11 +148,10 @@ async def get_seller_profile(token_payload = Depends(AuthHandler.auth_wrapper)):
     return await property_controller.get_seller_profile(token_payload)
 
 @router.get("/image/{user_id}")
-async def get_user_image(user_id: str, response: Response):
+async def get_user_image(user_id: str, request: Request, response: Response, azure_storage: StorageBackend = Depends(get_storage_service)):
     """
     Get user image - simplified version that directly accesses the known container
     """
-    azure_storage = None
     try:
         # Get the user's selfie filename from database
         db = await get_database()
@@ -160,8 +160,6 @@ async def get_user_image(user_id: str, response: Response):
         if not user:
             user = await db['buyers'].find_one({"_id": ObjectId(user_id)})
         
-        # Create Azure storage service
-        azure_storage = AzureStorageService()
         container_name = "sec-user-kyc-images"  # Use the known working container
         
         # If we found the user, try to get their image
@@ -172,44 +170,33 @@ async def get_user_image(user_id: str, response: Response):
                 if not blob_name:
                     return Response(status_code=404)
                     
-                # Get blob service client
-                blob_service_client = await azure_storage.get_blob_service_client()
-                
-                # Get blob client
-                blob_client = blob_service_client.get_blob_client(
-                    container=container_name,
-                    blob=blob_name
-                )
-                
-                # Download blob
-                download_stream = await blob_client.download_blob()
-                content = await download_stream.readall()
-                
-                # Set cache headers
-                response.headers["Cache-Control"] = "public, max-age=3600"
-                
                 # Determine content type
                 content_type = "image/jpeg"
                 if blob_name.lower().endswith('.png'):
                     content_type = "image/png"
                 
-                return Response(
-                    content=content,
-                    media_type=content_type
+                # Stream the image, honouring Range requests
+                return await blob_response(
+                    azure_storage,
+                    request,
+                    container_name,
+                    blob_name,
+                    content_type,
+                    headers={"Cache-Control": "public, max-age=3600"}
                 )
+            except HTTPException:
+                raise
             except Exception as e:
                 logging.error(f"Error downloading image: {str(e)}")
                 return Response(status_code=404)
                 
         return Response(status_code=404)
             
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error serving image: {str(e)}")
         return Response(status_code=404)
-    finally:
-        # Close Azure storage client
-        if azure_storage:
-            await azure_storage.close()
 
 @router.get("/properties")
 async def list_properties(token_payload = Depends(AuthHandler.auth_wrapper)):
@@ -257,13 +244,12 @@ async def get_property_document(
     token: Optional[str] = None,
     filename: Optional[str] = None,
     request: Request = None,
-    current_user: Optional[dict] = Depends(AuthHandler.auth_wrapper_optional)
+    current_user: Optional[dict] = Depends(AuthHandler.auth_wrapper_optional),
+    azure_storage: StorageBackend = Depends(get_storage_service)
 ):
     """
     Get a specific property document by property ID and document index
     """
-    azure_storage = None
-    
     try:
         # If no user from auth header, try token from query param
         if not current_user and token:
@@ -295,8 +281,6 @@ async def get_property_document(
         # Get the document data
         document_data = property_doc['documents'][document_index]
         
-        # Create Azure storage service
-        azure_storage = AzureStorageService()
         
         # Get document URL - handle both string and dictionary formats for backward compatibility
         document_url = None
@@ -343,39 +327,6 @@ async def get_property_document(
         
         logging.info(f"Retrieving property document: container={container_name}, blob={blob_name}")
         
-        # Get blob service client
-        blob_service_client = await azure_storage.get_blob_service_client()
-        
-        # Get blob client
-        blob_client = blob_service_client.get_blob_client(
-            container=container_name,
-            blob=blob_name
-        )
-        
-        # Download blob
-        download_stream = await blob_client.download_blob()
-        content = await download_stream.readall()
-        
-        # If the document is encrypted, decrypt it before serving
-        if is_encrypted and "raw" not in request.query_params:
-            try:
-                # Create a file encryptor instance
-                file_encryptor = FileEncryptor()
-                
-                # Decrypt the content
-                logging.info(f"Decrypting document content of size {len(content)} bytes")
-                content = file_encryptor.decrypt_data(content)
-                logging.info(f"Successfully decrypted document to {len(content)} bytes")
-            except Exception as e:
-                logging.error(f"Error decrypting document: {str(e)}")
-                # If decryption fails, provide a helpful error message
-                raise HTTPException(
-                    status_code=500, 
-                    detail="This document is encrypted and could not be decrypted. Try requesting the raw version."
-                )
-        else:
-            logging.info(f"Serving unencrypted document of size {len(content)} bytes")
-        
         # Determine content type and extension
         content_type = "application/octet-stream"  # Default
         file_extension = ".bin"
@@ -438,6 +389,59 @@ async def get_property_document(
         
         logging.info(f"Serving document: filename={final_filename}, content-type={content_type}")
         
+        # Blobs served byte-for-byte (unencrypted or raw) stream from storage with Range support
+        is_word_document = file_extension.lower() in ['.doc', '.docx']
+        verified_mode = request.query_params.get('verified', 'false').lower() == 'true'
+        serves_stored_bytes = not is_encrypted or "raw" in request.query_params
+        if serves_stored_bytes and not (is_word_document and verified_mode):
+            view_mode = request.query_params.get('view', 'false').lower() == 'true'
+            disposition = 'inline' if is_word_document and view_mode else 'attachment'
+            passthrough_headers = {
+                "Content-Disposition": f'{disposition}; filename="{final_filename}"',
+                "X-Content-Type-Options": "nosniff"
+            }
+            if is_word_document:
+                passthrough_headers["Content-Transfer-Encoding"] = "binary"
+                # Add blockchain verification header if available
+                if isinstance(document_data, dict) and document_data.get('blockchain_tx_hash'):
+                    passthrough_headers["X-Blockchain-Hash"] = document_data.get('blockchain_tx_hash')
+            else:
+                passthrough_headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+                passthrough_headers["Pragma"] = "no-cache"
+                passthrough_headers["Expires"] = "0"
+            
+            return await blob_response(
+                azure_storage,
+                request,
+                container_name,
+                blob_name,
+                content_type,
+                headers=passthrough_headers
+            )
+        
+        # Download blob
+        content = await azure_storage.download_file(container_name, blob_name)
+        
+        # If the document is encrypted, decrypt it before serving
+        if is_encrypted and "raw" not in request.query_params:
+            try:
+                # Create a file encryptor instance
+                file_encryptor = FileEncryptor()
+                
+                # Decrypt the content
+                logging.info(f"Decrypting document content of size {len(content)} bytes")
+                content = await run_crypto(file_encryptor.decrypt_data, content)
+                logging.info(f"Successfully decrypted document to {len(content)} bytes")
+            except Exception as e:
+                logging.error(f"Error decrypting document: {str(e)}")
+                # If decryption fails, provide a helpful error message
+                raise HTTPException(
+                    status_code=500, 
+                    detail="This document is encrypted and could not be decrypted. Try requesting the raw version."
+                )
+        else:
+            logging.info(f"Serving unencrypted document of size {len(content)} bytes")
+        
         # Special handling for Word documents (.doc, .docx)
         if file_extension.lower() in ['.doc', '.docx']:
             logging.info(f"Handling Word document: {blob_name} with content length {len(content)}")
@@ -571,26 +575,6 @@ async def get_property_document(
                     logging.error(f"Error creating verification package: {str(e)}")
                     raise HTTPException(status_code=500, detail=f"Failed to create verification package: {str(e)}")
             
-            # Check for raw mode (bypass blockchain verification)
-            raw_mode = request.query_params.get('raw', 'false').lower() == 'true'
-            if raw_mode:
-                logging.info(f"Serving Word document in raw mode")
-                try:
-                    # Set minimal headers to ensure the file is served unmodified
-                    response.headers["Content-Type"] = content_type
-                    response.headers["Content-Length"] = str(len(content))
-                    response.headers["Content-Disposition"] = f'attachment; filename="{final_filename}"'
-                    # Force binary transfer
-                    response.headers["Content-Transfer-Encoding"] = "binary"
-                    
-                    return Response(
-                        content=content,
-                        headers=response.headers
-                    )
-                except Exception as e:
-                    logging.error(f"Error serving raw Word document: {str(e)}")
-                    raise HTTPException(status_code=500, detail="Failed to serve raw document")
-            
             # Check if this is a viewing request or download request
             view_mode = request.query_params.get('view', 'false').lower() == 'true'
             
@@ -658,21 +642,23 @@ async def get_property_document(
     except Exception as e:
         logging.error(f"Error serving property document: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve document")
-    finally:
-        if azure_storage:
-            await azure_storage.close()
 
 @router.get("/property-image/{property_id}/{image_index}")
 async def get_property_image(
     property_id: str, 
     image_index: int,
+    request: Request,
     response: Response,
-    token_payload: dict = Depends(AuthHandler.auth_wrapper)
+    size: Optional[str] = None,
+    token_payload: dict = Depends(AuthHandler.auth_wrapper),
+    azure_storage: StorageBackend = Depends(get_storage_service)
 ):
     """
     Get a specific property image by property ID and image index
+
+    ?size= selects a variant (thumb, card, full or original); WebP is served
+    when the Accept header allows it
     """
-    azure_storage = None
     try:
         # Get the property details from database
         db = await get_database()
@@ -690,8 +676,6 @@ async def get_property_image(
         # Get the specified image
         image_data = property_doc['images'][image_index]
         
-        # Create Azure storage service
-        azure_storage = AzureStorageService()
         
         # Extract filename from URL
         image_url = image_data['url']
@@ -704,36 +688,49 @@ async def get_property_image(
         
         logging.info(f"Retrieving property image: container={container_name}, blob={blob_name}")
         
-        # Download the image
-        image_content = await azure_storage.download_file(container_name, blob_name)
-        
-        # Set cache headers
-        response.headers["Cache-Control"] = "public, max-age=3600"
-        
         # Determine content type
         content_type = image_data.get('content_type', 'image/jpeg')
         
-        return Response(
-            content=image_content,
-            media_type=content_type
+        # Serve the smallest stored variant that fits ?size= and the Accept header
+        variant = select_variant(image_data, size, request.headers.get('accept'))
+        if variant:
+            blob_name = variant['filename']
+            content_type = variant['content_type']
+        
+        image_headers = {"Cache-Control": "public, max-age=3600"}
+        if image_data.get('variants'):
+            image_headers["Vary"] = "Accept"
+        
+        # Stream or redirect to the image, honouring Range requests
+        return await image_response(
+            azure_storage,
+            request,
+            container_name,
+            blob_name,
+            content_type,
+            headers=image_headers
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error serving property image: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve image")
-    finally:
-        if azure_storage:
-            await azure_storage.close()
 
 @router.get("/public-property-image/{property_id}/{image_index}")
 async def get_public_property_image(
     property_id: str, 
     image_index: int,
-    response: Response
+    request: Request,
+    response: Response,
+    size: Optional[str] = None,
+    azure_storage: StorageBackend = Depends(get_storage_service)
 ):
     """
     Public endpoint to get property images (no authentication required)
+
+    ?size= selects a variant (thumb, card, full or original); WebP is served
+    when the Accept header allows it
     """
-    azure_storage = None
     try:
         # Get the database
         db = await get_database()
@@ -746,8 +743,6 @@ async def get_public_property_image(
         
         image_data = property_doc['images'][image_index]
         
-        # Create Azure storage service
-        azure_storage = AzureStorageService()
         
         # Get the filename from the image data
         blob_name = image_data.get('filename')
@@ -766,29 +761,39 @@ async def get_public_property_image(
         logging.info(f"Retrieving property image: container={container_name}, blob={blob_name}")
         
         try:
-            # Download image
-            image_content = await azure_storage.download_file(container_name, blob_name)
-            
-            # Set cache headers
-            response.headers["Cache-Control"] = "public, max-age=3600"
-            
             # Get content type from image data or default to jpeg
             content_type = image_data.get('content_type', 'image/jpeg')
             
-            return Response(
-                content=image_content,
-                media_type=content_type
+            # Serve the smallest stored variant that fits ?size= and the Accept header
+            variant = select_variant(image_data, size, request.headers.get('accept'))
+            if variant:
+                blob_name = variant['filename']
+                content_type = variant['content_type']
+            
+            image_headers = {"Cache-Control": "public, max-age=3600"}
+            if image_data.get('variants'):
+                image_headers["Vary"] = "Accept"
+            
+            # Stream or redirect to the image, honouring Range requests
+            return await image_response(
+                azure_storage,
+                request,
+                container_name,
+                blob_name,
+                content_type,
+                headers=image_headers
             )
+        except HTTPException:
+            raise
         except Exception as e:
             logging.error(f"Error downloading image: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to download image: {str(e)}")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error serving public property image: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve image: {str(e)}")
-    finally:
-        if azure_storage:
-            await azure_storage.close()
 
 @router.get("/property/{property_id}")
 async def get_property(property_id: str, token_payload = Depends(AuthHandler.auth_wrapper)):
@@ -799,16 +804,23 @@ async def get_property(property_id: str, token_payload = Depends(AuthHandler.aut
 
 @router.get("/document-requests")
 async def list_document_requests(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; all requests when omitted"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     token_payload: dict = Depends(AuthHandler.auth_wrapper)
 ):
     """
-    List all document access requests for properties owned by the seller
+    List document access requests for properties owned by the seller, oldest
+    first. When more remain, the next page's cursor is in X-Next-Cursor.
     """
     try:
         if token_payload.get('type') != 'seller':
             raise HTTPException(status_code=403, detail="Only sellers can access document requests")
             
-        return await document_access_controller.list_document_requests(token_payload)
+        requests, next_cursor = await document_access_controller.list_document_requests(token_payload, limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return requests
     except HTTPException as he:
         raise he
     except Exception as e:
@@ -876,16 +888,16 @@ async def handle_document_request(
 
 @router.get("/property/{property_id}/document/{document_index}/download")
 async def get_seller_document(
+    request: Request,
     property_id: str = Path(..., description="ID of the property"),
     document_index: int = Path(..., description="Index of the document in the property documents array"),
     token_payload: dict = Depends(AuthHandler.auth_wrapper),
-    db=Depends(get_database)
+    db=Depends(get_database),
+    azure_storage: StorageBackend = Depends(get_storage_service)
 ):
     """
     Get the original property document - simplified version with standard authentication
     """
-    azure_storage = None
-    
     try:
         # Verify the seller has permissions for this property
         seller_id = token_payload.get('sub')
@@ -913,8 +925,6 @@ async def get_seller_document(
         property_doc = property_data['documents'][document_index]
         logging.info(f"Retrieving original document for seller: {json.dumps(property_doc, default=str)}")
         
-        # Initialize Azure storage
-        azure_storage = AzureStorageService()
         
         # Get document name and type
         document_name = property_doc.get('document_name')
@@ -927,21 +937,12 @@ async def get_seller_document(
         # Use the designated property documents container
         container_name = azure_storage.container_property_docs
         
-        # The document should be stored in the pattern: seller_id/property_id/documents/document_name
-        blob_path = f"{seller_id}/{property_id}/documents/{document_name}"
+        # Deduplicated documents reference shared content; older entries use seller_id/property_id/documents/document_name
+        blob_path = property_doc.get('original_blob') or f"{seller_id}/{property_id}/documents/{document_name}"
         
         logging.info(f"Attempting to download document: container={container_name}, blob_path={blob_path}")
         
         try:
-            # Download the document
-            document_content = await azure_storage.download_file(
-                container_name=container_name,
-                blob_path=blob_path
-            )
-            
-            if not document_content:
-                raise HTTPException(status_code=404, detail="Document not found in storage")
-            
             # Determine content type based on file extension
             content_type = property_doc.get('content_type', 'application/octet-stream')
             if not content_type or content_type == 'application/octet-stream':
@@ -954,19 +955,23 @@ async def get_seller_document(
                 elif document_name.lower().endswith('.docx'):
                     content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
             
-            # Return the document
-            return Response(
-                content=document_content,
-                media_type=content_type,
+            # Stream the document, honouring Range requests
+            return await blob_response(
+                azure_storage,
+                request,
+                container_name,
+                blob_path,
+                content_type,
                 headers={
                     "Content-Disposition": f"attachment; filename=\"{document_name}\"",
-                    "Content-Type": content_type,
-                    "Content-Length": str(len(document_content)),
                     "Cache-Control": "no-cache"
                 }
             )
             
         except Exception as e:
+            # An unsatisfiable range is the client's error, not a missing document
+            if isinstance(e, HTTPException) and e.status_code == 416:
+                raise
             logging.error(f"Error downloading document: {str(e)}")
             
             # Try alternative approach - check if the document has an original_url we can parse differently
@@ -981,33 +986,29 @@ async def get_seller_document(
                             alt_blob_path = f"{seller_id}/{property_id}/documents/{alt_document_name}"
                             
                             logging.info(f"Trying alternative path: {alt_blob_path}")
-                            alt_content = await azure_storage.download_file(
-                                container_name=container_name,
-                                blob_path=alt_blob_path
-                            )
                             
-                            if alt_content:
-                                # Determine content type
-                                if alt_document_name.lower().endswith('.pdf'):
-                                    content_type = 'application/pdf'
-                                elif alt_document_name.lower().endswith(('.jpg', '.jpeg')):
-                                    content_type = 'image/jpeg'
-                                elif alt_document_name.lower().endswith('.png'):
-                                    content_type = 'image/png'
-                                else:
-                                    content_type = 'application/octet-stream'
-                                
-                                # Return the document
-                                return Response(
-                                    content=alt_content,
-                                    media_type=content_type,
-                                    headers={
-                                        "Content-Disposition": f"attachment; filename=\"{alt_document_name}\"",
-                                        "Content-Type": content_type,
-                                        "Content-Length": str(len(alt_content)),
-                                        "Cache-Control": "no-cache"
-                                    }
-                                )
+                            # Determine content type
+                            if alt_document_name.lower().endswith('.pdf'):
+                                content_type = 'application/pdf'
+                            elif alt_document_name.lower().endswith(('.jpg', '.jpeg')):
+                                content_type = 'image/jpeg'
+                            elif alt_document_name.lower().endswith('.png'):
+                                content_type = 'image/png'
+                            else:
+                                content_type = 'application/octet-stream'
+                            
+                            # Stream the document, honouring Range requests
+                            return await blob_response(
+                                azure_storage,
+                                request,
+                                container_name,
+                                alt_blob_path,
+                                content_type,
+                                headers={
+                                    "Content-Disposition": f"attachment; filename=\"{alt_document_name}\"",
+                                    "Cache-Control": "no-cache"
+                                }
+                            )
                 except Exception as alt_error:
                     logging.error(f"Alternative download method failed: {str(alt_error)}")
             
@@ -1019,22 +1020,20 @@ async def get_seller_document(
     except Exception as e:
         logging.error(f"Error in get_seller_document: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-    finally:
-        if azure_storage:
-            await azure_storage.close()
 
 @router.get("/property/{property_id}/document/{document_index}/recover")
 async def recover_original_document(
+    request: Request,
+    background_tasks: BackgroundTasks,
     property_id: str = Path(..., description="ID of the property"),
     document_index: int = Path(..., description="Index of the document in the property documents array"),
     token_payload: dict = Depends(AuthHandler.auth_wrapper),
-    db=Depends(get_database)
+    db=Depends(get_database),
+    azure_storage: StorageBackend = Depends(get_storage_service)
 ):
     """
     Recover an original property document by decrypting its secure version if the original is missing
     """
-    azure_storage = None
-    
     try:
         # Verify the seller has permissions for this property
         seller_id = token_payload.get('sub')
@@ -1062,8 +1061,6 @@ async def recover_original_document(
         property_doc = property_data['documents'][document_index]
         logging.info(f"Attempting to recover original document: {json.dumps(property_doc, default=str)}")
         
-        # Initialize Azure storage
-        azure_storage = AzureStorageService()
         
         # First try to get the original document
         document_name = property_doc.get('document_name')
@@ -1080,50 +1077,42 @@ async def recover_original_document(
         # Use the designated property documents container
         container_name = azure_storage.container_property_docs
         
-        # The document should be stored in the pattern: seller_id/property_id/documents/document_name
-        blob_path = f"{seller_id}/{property_id}/documents/{document_name}"
-        original_found = False
-        original_content = None
+        # Deduplicated documents reference shared content; older entries use seller_id/property_id/documents/document_name
+        blob_path = property_doc.get('original_blob') or f"{seller_id}/{property_id}/documents/{document_name}"
+        
+        # Determine content type
+        content_type = property_doc.get('content_type', 'application/octet-stream')
+        if not content_type or content_type == 'application/octet-stream':
+            if document_name.lower().endswith('.pdf'):
+                content_type = 'application/pdf'
+            elif document_name.lower().endswith(('.jpg', '.jpeg')):
+                content_type = 'image/jpeg'
+            elif document_name.lower().endswith('.png'):
+                content_type = 'image/png'
+            else:
+                content_type = 'application/octet-stream'
         
         try:
-            # Try to download original document first
+            # If the original document is still there, just stream it (honouring Range requests)
             logging.info(f"Attempting to download original document: container={container_name}, blob_path={blob_path}")
-            original_content = await azure_storage.download_file(
-                container_name=container_name,
-                blob_path=blob_path
-            )
-            
-            if original_content and len(original_content) > 0:
-                original_found = True
-                logging.info(f"Original document found, no recovery needed")
-        except Exception as e:
-            logging.warning(f"Original document not found: {str(e)}")
-        
-        # If original document is found, just return it
-        if original_found and original_content:
-            # Determine content type
-            content_type = property_doc.get('content_type', 'application/octet-stream')
-            if not content_type or content_type == 'application/octet-stream':
-                if document_name.lower().endswith('.pdf'):
-                    content_type = 'application/pdf'
-                elif document_name.lower().endswith(('.jpg', '.jpeg')):
-                    content_type = 'image/jpeg'
-                elif document_name.lower().endswith('.png'):
-                    content_type = 'image/png'
-                else:
-                    content_type = 'application/octet-stream'
-            
-            # Return the document
-            return Response(
-                content=original_content,
-                media_type=content_type,
+            original_response = await blob_response(
+                azure_storage,
+                request,
+                container_name,
+                blob_path,
+                content_type,
                 headers={
                     "Content-Disposition": f"attachment; filename=\"{document_name}\"",
-                    "Content-Type": content_type,
-                    "Content-Length": str(len(original_content)),
                     "Cache-Control": "no-cache"
                 }
             )
+            logging.info(f"Original document found, no recovery needed")
+            return original_response
+        except Exception as e:
+            # An unsatisfiable range is the client's error, not a missing document
+            if isinstance(e, HTTPException) and e.status_code == 416:
+                raise
+            logging.warning(f"Original document not found: {str(e)}")
         
         # If original document is not found, try to recover from secure document
         logging.info("Original document not found, attempting to recover from encrypted version")
@@ -1141,13 +1130,35 @@ async def recover_original_document(
         # Create secure document service
         secure_doc_service = SecureDocumentService(azure_storage)
         
+        # Chunked encrypted content is decrypted while it streams, honouring Range requests,
+        # and the original is rewritten after the response
+        content_ref = property_doc.get('content_ref')
+        decrypted = await secure_doc_service.open_decrypted(content_ref) if content_ref else None
+        if decrypted:
+            reader, encrypted_blob = decrypted
+            logging.info(f"Streaming decrypted document {content_ref}")
+            background_tasks.add_task(secure_doc_service.restore_original, content_ref)
+            return await blob_response(
+                reader,
+                request,
+                azure_storage.container_secure_docs,
+                encrypted_blob,
+                content_type,
+                headers={
+                    "Content-Disposition": f"attachment; filename=\"{document_name}\"",
+                    "Cache-Control": "no-cache",
+                    "X-Document-Recovered": "true"
+                }
+            )
+        
         try:
             # Attempt to retrieve document using secure document service
             logging.info(f"Retrieving document using SecureDocumentService: ID={document_id}")
             recovered_content = await secure_doc_service.retrieve_document(
                 document_id=document_id,
                 owner_id=seller_id,
-                property_id=property_id
+                property_id=property_id,
+                content_ref=property_doc.get('content_ref')
             )
             
             if not recovered_content or len(recovered_content) == 0:
@@ -1203,7 +1214,4 @@ async def recover_original_document(
         raise
     except Exception as e:
         logging.error(f"Error in recover_original_document: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
-    finally:
-        if azure_storage:
-            await azure_storage.close()
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
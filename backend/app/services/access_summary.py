@@ -0,0 +1,86 @@
+import logging
+from datetime import datetime
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# One document per buyer and listing with the download count of every document,
+# so the buyer's access view needs a single read
+ACCESS_SUMMARIES_COLLECTION = "document_access_summaries"
+# Download limit of a document that has no limit record yet
+DEFAULT_MAX_DOWNLOADS = 3
+
+
+def summary_id(buyer_id: str, property_id: str) -> str:
+    return f"{buyer_id}:{property_id}"
+
+
+def _document_fields(document_index: int, download_count: int, max_downloads: int) -> Dict[str, dict]:
+    key = f"documents.{document_index}"
+    return {
+        "$max": {f"{key}.download_count": download_count},
+        "$set": {f"{key}.max_downloads": max_downloads}
+    }
+
+
+async def record_download(db, buyer_id: str, property_id: str, document_index: int, download_count: int, max_downloads: int):
+    """
+    Copy a document's new download count onto the summary.
+
+    Counts only grow, so $max makes concurrent and repeated updates converge on
+    the latest value regardless of order. The limit records stay authoritative;
+    a failure here is logged and never blocks the download.
+    """
+    update = _document_fields(document_index, download_count, max_downloads)
+    update["$set"].update({"buyer_id": buyer_id, "property_id": property_id, "updated_at": datetime.utcnow()})
+    try:
+        result = await db[ACCESS_SUMMARIES_COLLECTION].update_one(
+            {"_id": summary_id(buyer_id, property_id)}, update, upsert=True
+        )
+        if result.upserted_id is not None:
+            # New summary: pick up the other documents' downloads made before summaries existed
+            await _rebuild(db, buyer_id, property_id)
+    except Exception as e:
+        logger.error(f"Failed to update access summary for {buyer_id}/{property_id}: {str(e)}")
+
+
+async def download_counts(db, buyer_id: str, property_id: str) -> Dict[int, dict]:
+    """
+    Download count and limit per document index for a buyer and listing.
+
+    Reads the summary; buyers whose downloads predate it get one query over
+    their limit records, which is then written back as their summary.
+    """
+    summary = await db[ACCESS_SUMMARIES_COLLECTION].find_one({"_id": summary_id(buyer_id, property_id)})
+    if summary is not None:
+        return {int(index): counts for index, counts in summary.get("documents", {}).items()}
+    return await _rebuild(db, buyer_id, property_id)
+
+
+async def _rebuild(db, buyer_id: str, property_id: str) -> Dict[int, dict]:
+    """
+    Merge every limit record of a buyer and listing into the summary, in one query
+    """
+    records = await db['document_access_limits'].find(
+        {'buyer_id': buyer_id, 'property_id': property_id},
+        {'_id': 0, 'document_index': 1, 'download_count': 1, 'max_downloads': 1}
+    ).to_list(length=None)
+    counts = {
+        record['document_index']: {
+            "download_count": record.get('download_count', 0),
+            "max_downloads": record.get('max_downloads', DEFAULT_MAX_DOWNLOADS)
+        } for record in records
+    }
+
+    update = {
+        "$max": {},
+        "$set": {"buyer_id": buyer_id, "property_id": property_id, "updated_at": datetime.utcnow()}
+    }
+    for document_index, document_counts in counts.items():
+        fields = _document_fields(document_index, document_counts["download_count"], document_counts["max_downloads"])
+        update["$max"].update(fields["$max"])
+        update["$set"].update(fields["$set"])
+    if not update["$max"]:
+        del update["$max"]
+    await db[ACCESS_SUMMARIES_COLLECTION].update_one({"_id": summary_id(buyer_id, property_id)}, update, upsert=True)
+    return counts
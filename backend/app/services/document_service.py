@@ -2,7 +2,7 @@ import os
 import hashlib
 from typing import Dict, Tuple, Optional, List
 from cryptography.fernet import Fernet
-from app.config.azure_config import AzureStorageService
+from app.storage.base import StorageBackend
 from app.services.blockchain_service import BlockchainService
 from app.core.config import settings
 import logging
@@ -11,7 +11,7 @@ import base64
 logger = logging.getLogger(__name__)
 
 class DocumentService:
-    def __init__(self, azure_storage: AzureStorageService, blockchain_service: BlockchainService):
+    def __init__(self, azure_storage: StorageBackend, blockchain_service: BlockchainService):
         self.azure_storage = azure_storage
         self.blockchain_service = blockchain_service
         
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from pymongo import UpdateOne
+
+from app.config.db import get_database
+from app.core.config import settings
+from app.core.executors import run_crypto
+from app.core.keyring import KeyEncryptionKeys, document_keks
+from app.services.secure_document_service import DOCUMENT_BLOBS_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+
+def _rewrap_batch(keks: KeyEncryptionKeys, records: list) -> Tuple[list, int]:
+    """
+    Rewrap a batch of data keys onto the active KEK. Runs in the crypto pool.
+    Returns the updates for the records that rewrapped and how many failed.
+    """
+    updates = []
+    failed = 0
+    for record in records:
+        try:
+            kek_version, wrapped_key = keks.rewrap(record["kek_version"], record["wrapped_key"], record["_id"])
+        except Exception as e:
+            # Missing KEK version or corrupt wrapped key; the record keeps its old version
+            logger.error(f"Failed to rewrap data key of {record['_id']}: {str(e)}")
+            failed += 1
+            continue
+        updates.append(UpdateOne(
+            # Skip records changed since they were read
+            {"_id": record["_id"], "kek_version": record["kek_version"], "wrapped_key": record["wrapped_key"]},
+            {"$set": {"kek_version": kek_version, "wrapped_key": wrapped_key, "rewrapped_at": datetime.utcnow()}}
+        ))
+    return updates, failed
+
+
+class KeyRotationJob:
+    """
+    Background rewrap of document data keys onto the active key-encryption key.
+
+    Only the wrapped keys in document_blobs change; encrypted blobs are never
+    read or rewritten. Records are processed in batches of KEY_ROTATION_BATCH_SIZE
+    with one bulk write each, and a run repeats every KEY_ROTATION_INTERVAL_SECONDS
+    so documents written by instances still on an older KEK are picked up too.
+    """
+
+    def __init__(self, keks: KeyEncryptionKeys, batch_size: int, interval_seconds: int):
+        self.keks = keks
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+        # Metrics
+        self.runs = 0
+        self.rewrapped = 0
+        self.failed = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_run_seconds: Optional[float] = None
+
+    async def run_once(self) -> Dict[str, Any]:
+        """
+        Rewrap every data key not under the active KEK, returning this run's counts
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            started = time.perf_counter()
+            rewrapped = failed = 0
+            db = await get_database()
+            collection = db[DOCUMENT_BLOBS_COLLECTION]
+            query = {"wrapped_key": {"$exists": True}, "kek_version": {"$ne": self.keks.active_version}}
+            projection = {"_id": 1, "kek_version": 1, "wrapped_key": 1}
+
+            # Records that fail to rewrap keep their old version; skip past them by _id
+            last_id = None
+            while True:
+                batch_query = dict(query, _id={"$gt": last_id}) if last_id is not None else query
+                records = await collection.find(batch_query, projection).sort("_id", 1).limit(self.batch_size).to_list(length=self.batch_size)
+                if not records:
+                    break
+                last_id = records[-1]["_id"]
+
+                updates, batch_failed = await run_crypto(_rewrap_batch, self.keks, records)
+                failed += batch_failed
+                if updates:
+                    result = await collection.bulk_write(updates, ordered=False)
+                    rewrapped += result.modified_count
+
+            self.runs += 1
+            self.rewrapped += rewrapped
+            self.failed += failed
+            self.last_run_at = datetime.utcnow()
+            self.last_run_seconds = round(time.perf_counter() - started, 3)
+            logger.info(f"Key rotation run rewrapped {rewrapped} data keys to {self.keks.active_version} ({failed} failed)")
+            return {"rewrapped": rewrapped, "failed": failed, "active_version": self.keks.active_version}
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Key rotation run failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """Start the periodic run. Called from the application lifespan."""
+        if self.interval_seconds > 0 and self.keks.configured and self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keks": self.keks.stats(),
+            "running": self._task is not None,
+            "runs": self.runs,
+            "rewrapped": self.rewrapped,
+            "failed": self.failed,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_run_seconds": self.last_run_seconds
+        }
+
+
+# Singleton instance started by the application lifespan
+key_rotation_job = KeyRotationJob(
+    document_keks,
+    batch_size=settings.KEY_ROTATION_BATCH_SIZE,
+    interval_seconds=settings.KEY_ROTATION_INTERVAL_SECONDS
+)
@@ -3,21 +3,37 @@ import hashlib
 import base64
 import json
 from typing import Dict, Tuple, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.backends import default_backend
-from app.config.azure_config import AzureStorageService
+from app.storage.base import StorageBackend
 from app.core.config import settings
+from app.utils.key_cache import derived_key_cache, key_fingerprint
+from app.core.executors import run_crypto
+from app.core.keyring import WRAP_ALGORITHM, document_keks
+from app.storage.encrypted import EncryptedBlobReader
+from app.utils import chunked_encryption
+from app.utils.chunked_encryption import ChunkedEncryptor
+from app.config.db import get_database
+from pymongo import ReturnDocument
 import logging
 import uuid
+import asyncio
+import time
 from cryptography.fernet import Fernet
 
 logger = logging.getLogger(__name__)
 
+# One record per stored document content, keyed by content_ref (owner and SHA-256), with a reference count
+DOCUMENT_BLOBS_COLLECTION = "document_blobs"
+
+# How long another upload waits on a pending content write before taking it over
+PENDING_CONTENT_TIMEOUT = timedelta(minutes=5)
+
 class SecureDocumentService:
-    def __init__(self, azure_storage: AzureStorageService):
+    def __init__(self, azure_storage: StorageBackend):
         self.azure_storage = azure_storage
         self.salt_length = 16  # 128 bits
         self.iteration_count = 100000  # High iteration count for PBKDF2
@@ -57,17 +73,26 @@ class SecureDocumentService:
         return os.urandom(self.salt_length)
 
     def _derive_key(self, salt: bytes) -> bytes:
-        """Derive encryption key using PBKDF2."""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=self.key_length,
+        """Derive encryption key using PBKDF2, reusing cached keys for repeat salts."""
+        # Use a consistent system key for derivation
+        system_key = base64.urlsafe_b64decode(self.encryption_key)
+
+        def derive():
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=self.key_length,
+                salt=salt,
+                iterations=self.iteration_count,
+                backend=default_backend()
+            )
+            return kdf.derive(system_key)
+
+        return derived_key_cache.get_or_derive(
             salt=salt,
             iterations=self.iteration_count,
-            backend=default_backend()
+            key_id=key_fingerprint(system_key),
+            derive=derive
         )
-        # Use a consistent system key for derivation
-        system_key = base64.urlsafe_b64decode(self.encryption_key)
-        return kdf.derive(system_key)
 
     def _add_watermark(self, document_data: bytes, owner_id: str, timestamp: str, doc_id: str) -> bytes:
         """
@@ -100,6 +125,263 @@ class SecureDocumentService:
         
         return encrypted_data, iv
 
+    def _hash_document(self, document_data: bytes) -> str:
+        """Calculate the SHA-256 hash of a document."""
+        return hashlib.sha256(document_data).hexdigest()
+
+    def _derive_and_encrypt(self, document_data: bytes, salt: bytes) -> Tuple[bytes, bytes]:
+        """Derive the per-document key and encrypt. Runs in the crypto pool."""
+        key = self._derive_key(salt)
+        return self._encrypt_document(document_data, key)
+
+    async def _encrypted_chunks(self, document_data: bytes, key: bytes):
+        """
+        Encrypt a document into the chunked AES-GCM format while it is uploaded,
+        one storage chunk at a time, so no second full-size copy is held
+        """
+        encryptor = ChunkedEncryptor(key)
+        yield encryptor.header.raw
+        
+        view = memoryview(document_data)
+        step = settings.AZURE_STREAM_CHUNK_SIZE
+        for position in range(0, len(document_data), step):
+            yield await run_crypto(encryptor.update, view[position:position + step])
+        yield await run_crypto(encryptor.finalize)
+
+    def _derive_and_decrypt(self, encrypted_content: bytes, iv: bytes, salt: bytes) -> bytes:
+        """
+        Derive the per-document key and decrypt. Runs in the crypto pool.
+        Chunked AES-GCM blobs are recognised by their header; anything else is legacy CBC.
+        """
+        key = self._derive_key(salt)
+        
+        if chunked_encryption.is_chunked(encrypted_content):
+            return chunked_encryption.decrypt(key, encrypted_content)
+        
+        # Create cipher for decryption
+        cipher = Cipher(
+            algorithms.AES(key),
+            modes.CBC(iv),
+            backend=default_backend()
+        )
+        
+        # Decrypt the content
+        decryptor = cipher.decryptor()
+        decrypted_padded = decryptor.update(encrypted_content) + decryptor.finalize()
+        
+        # Remove padding
+        return self._unpad_content(decrypted_padded)
+
+    @staticmethod
+    async def _timed(timings: Dict[str, float], stage: str, awaitable):
+        """Await one pipeline stage and record its duration in milliseconds."""
+        stage_started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = round((time.perf_counter() - stage_started) * 1000, 2)
+
+    @staticmethod
+    def content_ref(owner_id: str, document_hash: str) -> str:
+        """
+        Key of stored content: the document hash scoped to its owner, so content is
+        only shared between one seller's listings and nobody can probe whether
+        another seller already stored a document
+        """
+        return hashlib.sha256(f"{owner_id}|{document_hash}".encode()).hexdigest()
+
+    @staticmethod
+    def content_blob_name(content_ref: str) -> str:
+        """
+        Content-addressed blob name shared by every upload of the same document by one owner
+        """
+        return f"sha256/{content_ref[:2]}/{content_ref}"
+
+    async def _abort_writes(self, upload_tasks, blob_names: Dict[str, Tuple[str, str]]):
+        """
+        Compensate a failed content write: wait for in-flight writes and
+        delete every blob that was written, so no partial document is left behind.
+        """
+        await asyncio.gather(*upload_tasks.values(), return_exceptions=True)
+        
+        deletions = []
+        for stage, task in upload_tasks.items():
+            if task.done() and not task.cancelled() and task.exception() is None:
+                container_name, blob_name = blob_names[stage]
+                logger.warning(f"Rolling back {stage} upload: {container_name}/{blob_name}")
+                deletions.append(self.azure_storage.delete_file(container_name, blob_name))
+        
+        await asyncio.gather(*deletions, return_exceptions=True)
+
+    async def _claim_content(self, content_ref: str) -> Tuple[Optional[dict], bool]:
+        """
+        Take a reference on the stored content for content_ref
+        
+        Returns (content record, is_writer). The first upload of a hash inserts a
+        pending record and becomes the writer; later uploads only bump the
+        reference count. A pending record abandoned by a crashed writer is taken over.
+        """
+        db = await get_database()
+        now = datetime.utcnow()
+        content = await db[DOCUMENT_BLOBS_COLLECTION].find_one_and_update(
+            {"_id": content_ref},
+            {
+                "$inc": {"refcount": 1},
+                "$setOnInsert": {"status": "pending", "created_at": now, "updated_at": now}
+            },
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        if content is None:
+            return None, True
+        
+        if content.get("status") == "pending" and content.get("updated_at", now) < now - PENDING_CONTENT_TIMEOUT:
+            taken_over = await db[DOCUMENT_BLOBS_COLLECTION].update_one(
+                {"_id": content_ref, "status": "pending", "updated_at": content.get("updated_at")},
+                {"$set": {"updated_at": now}}
+            )
+            if taken_over.modified_count:
+                logger.warning(f"Taking over abandoned content write for {content_ref}")
+                return content, True
+        
+        return content, False
+
+    async def _wait_for_content(self, content_ref: str) -> dict:
+        """
+        Wait for a concurrent upload of the same content to finish writing it
+        """
+        db = await get_database()
+        deadline = time.monotonic() + PENDING_CONTENT_TIMEOUT.total_seconds()
+        while time.monotonic() < deadline:
+            content = await db[DOCUMENT_BLOBS_COLLECTION].find_one({"_id": content_ref})
+            if content is None:
+                raise RuntimeError(f"Concurrent upload of document {content_ref} failed")
+            if content.get("status") == "ready":
+                return content
+            await asyncio.sleep(0.25)
+        raise RuntimeError(f"Timed out waiting for concurrent upload of document {content_ref}")
+
+    async def _write_content(self, document_data: bytes, document_hash: str, content_ref: str, content_type: str, timings: Dict[str, float]) -> dict:
+        """
+        Write the original, encrypted copy and encryption metadata of new content,
+        then mark its record ready. Every blob is rolled back if one write fails.
+        """
+        blob_name = self.content_blob_name(content_ref)
+        blob_names = {
+            "original": (self.property_documents_container, blob_name),
+            "encrypted": (self.secure_documents_container, blob_name),
+            "metadata": (self.document_metadata_container, f"{blob_name}.json")
+        }
+        
+        # Upload the original while the document is encrypted
+        logging.info(f"Uploading original document: {blob_name}")
+        upload_tasks = {"original": asyncio.ensure_future(self._timed(timings, "upload_original", self.azure_storage.upload_file(
+            container_name=self.property_documents_container,
+            file_name=blob_name,
+            file_content=document_data,
+            content_type=content_type
+        )))}
+        
+        try:
+            # Random data key for this content, wrapped by the active key-encryption key
+            # (the document is encrypted WITHOUT adding watermark to the binary data)
+            key = document_keks.generate_data_key()
+            kek_version, wrapped_key = document_keks.wrap(key, content_ref)
+        except Exception:
+            await self._abort_writes(upload_tasks, blob_names)
+            raise
+        
+        # Content-level metadata only: per-upload details (owner, listing, chain tx) live in the listing entry.
+        # The chunked format carries its nonces in the blob header, so there is no IV to record.
+        metadata = {
+            "document_hash": document_hash,
+            "encryption_algorithm": chunked_encryption.ALGORITHM,
+            "format_version": chunked_encryption.FORMAT_VERSION,
+            "segment_size": chunked_encryption.DEFAULT_SEGMENT_SIZE,
+            "key_wrapping": {
+                "algorithm": WRAP_ALGORITHM,
+                "kek_version": kek_version
+            },
+            "content_type": content_type
+        }
+        
+        logging.info(f"Uploading encrypted document: {blob_name}")
+        upload_tasks["encrypted"] = asyncio.ensure_future(self._timed(timings, "encrypt_and_upload", self.azure_storage.upload_stream(
+            container_name=self.secure_documents_container,
+            file_name=blob_name,
+            stream=self._encrypted_chunks(document_data, key),
+            content_type=content_type,
+            metadata=metadata
+        )))
+        upload_tasks["metadata"] = asyncio.ensure_future(self._timed(timings, "upload_metadata", self.azure_storage.upload_file(
+            container_name=self.document_metadata_container,
+            file_name=f"{blob_name}.json",
+            file_content=json.dumps(metadata).encode(),
+            content_type="application/json"
+        )))
+        
+        # Wait for every write, then undo the successful ones if any of them failed
+        results = await asyncio.gather(*upload_tasks.values(), return_exceptions=True)
+        failures = [result for result in results if isinstance(result, BaseException)]
+        if failures:
+            await self._abort_writes(upload_tasks, blob_names)
+            raise failures[0]
+        
+        # The wrapped data key is kept in the content record only, so rotating
+        # the KEK is a database update that never rewrites a blob
+        original_url, encrypted_url, _ = results
+        content = {
+            "status": "ready",
+            "original_blob": blob_name,
+            "encrypted_blob": blob_name,
+            "metadata_blob": f"{blob_name}.json",
+            "original_url": original_url,
+            "encrypted_url": encrypted_url,
+            "wrapped_key": wrapped_key,
+            "kek_version": kek_version,
+            "encryption_algorithm": metadata["encryption_algorithm"],
+            "content_type": content_type,
+            "size": len(document_data),
+            "document_hash": document_hash,
+            "updated_at": datetime.utcnow()
+        }
+        db = await get_database()
+        await db[DOCUMENT_BLOBS_COLLECTION].update_one({"_id": content_ref}, {"$set": content})
+        return content
+
+    async def _drop_claim(self, content_ref: str):
+        """
+        Remove the pending record of a failed content write so the next upload retries it
+        """
+        db = await get_database()
+        await db[DOCUMENT_BLOBS_COLLECTION].delete_one({"_id": content_ref, "status": "pending"})
+
+    async def release_document(self, content_ref: str):
+        """
+        Drop one listing's reference to stored content, deleting the blobs with the last reference
+        """
+        db = await get_database()
+        content = await db[DOCUMENT_BLOBS_COLLECTION].find_one_and_update(
+            {"_id": content_ref},
+            {"$inc": {"refcount": -1}, "$set": {"updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if content is None or content.get("refcount", 0) > 0:
+            return
+        
+        # Only the caller that removes the record deletes the blobs
+        removed = await db[DOCUMENT_BLOBS_COLLECTION].delete_one({"_id": content_ref, "refcount": {"$lte": 0}})
+        if not removed.deleted_count:
+            return
+        
+        logging.info(f"Deleting unreferenced document content {content_ref}")
+        await asyncio.gather(
+            self.azure_storage.delete_file(self.property_documents_container, content["original_blob"]),
+            self.azure_storage.delete_file(self.secure_documents_container, content["encrypted_blob"]),
+            self.azure_storage.delete_file(self.document_metadata_container, content["metadata_blob"]),
+            return_exceptions=True
+        )
+
     async def process_document(
         self,
         document_data: bytes,
@@ -107,125 +389,188 @@ class SecureDocumentService:
         owner_id: str,
         content_type: str,
         property_id: str,
-        blockchain_service=None  # Optional blockchain service for verification
+        anchoring_service=None  # Optional on-chain anchoring for verification
     ) -> Dict[str, str]:
         """
         Process and store a document with encryption and watermarking.
+        
+        Blobs are content-addressed by the owner and the document's SHA-256, so
+        an upload whose content the same seller already stored takes a reference
+        and skips the blob writes. The returned listing entry references the shared blobs.
         """
         try:
+            started = time.perf_counter()
+            
             # Generate unique document ID
             doc_id = str(uuid.uuid4())
             timestamp = datetime.utcnow().isoformat()
             
-            # Calculate document hash
-            document_hash = hashlib.sha256(document_data).hexdigest()
+            # Calculate document hash off the event loop
+            document_hash = await run_crypto(self._hash_document, document_data)
             
-            # Update path structure to include property_id
-            original_blob_name = f"{owner_id}/{property_id}/documents/{document_name}"
-            
-            # Upload original document first
-            logging.info(f"Uploading original document: {original_blob_name}")
-            original_url = await self.azure_storage.upload_file(
-                container_name=self.property_documents_container,
-                file_name=original_blob_name,
-                file_content=document_data,
-                content_type=content_type
-            )
+            timings = {}
             
-            # Generate salt and derive key
-            salt = self._generate_salt()
-            key = self._derive_key(salt)
+            # Record the upload in the anchoring outbox while the content is stored
+            chain_task = None
+            if anchoring_service:
+                chain_task = asyncio.ensure_future(self._timed(timings, "blockchain_anchor", anchoring_service.register_document(
+                    document_hash=document_hash,
+                    owner_id=owner_id,
+                    document_id=doc_id,
+                    timestamp=timestamp
+                )))
             
-            # Encrypt document WITHOUT adding watermark to the binary data
-            encrypted_data, iv = self._encrypt_document(document_data, key)
+            content_ref = self.content_ref(owner_id, document_hash)
+            try:
+                content, is_writer = await self._claim_content(content_ref)
+                if is_writer:
+                    try:
+                        content = await self._write_content(document_data, document_hash, content_ref, content_type, timings)
+                    except Exception:
+                        await self._drop_claim(content_ref)
+                        raise
+                else:
+                    logging.info(f"Document {document_name} matches stored content {content_ref}, skipping blob writes")
+                    if content.get("status") != "ready":
+                        try:
+                            content = await self._timed(timings, "wait_for_content", self._wait_for_content(content_ref))
+                        except Exception:
+                            # Give back the reference taken by the claim
+                            await self.release_document(content_ref)
+                            raise
+            except Exception:
+                if chain_task:
+                    chain_task.cancel()
+                raise
             
-            # If blockchain service is provided, register document hash
-            blockchain_tx_hash = None
-            if blockchain_service:
+            anchor = {}
+            if chain_task:
                 try:
-                    blockchain_tx_hash = await blockchain_service.register_document(
-                        document_hash=document_hash,
-                        owner_id=owner_id,
-                        document_id=doc_id,
-                        timestamp=timestamp
-                    )
+                    anchor = await chain_task
                 except Exception as e:
                     logger.error(f"Failed to register document on blockchain: {str(e)}")
             
-            # Create metadata with watermark info, blockchain hash and property_id
-            metadata = {
-                "document_name": document_name,
-                "salt": base64.b64encode(salt).decode(),
-                "iv": base64.b64encode(iv).decode(),
-                "document_hash": document_hash,
-                "owner_id": owner_id,
-                "property_id": property_id,
-                "timestamp": timestamp,
-                "document_id": doc_id,
-                "encryption_algorithm": "AES-256-CBC",
-                "key_derivation": {
-                    "algorithm": "PBKDF2-HMAC-SHA256",
-                    "iterations": self.iteration_count
-                },
-                "content_type": content_type,
-                "watermark": {
-                    "owner_id": owner_id,
-                    "timestamp": timestamp,
-                    "document_id": doc_id
-                },
-                "blockchain_verification": {
-                    "tx_hash": blockchain_tx_hash,
-                    "network": "sepolia",
-                    "verification_url": f"https://sepolia.etherscan.io/tx/{blockchain_tx_hash}" if blockchain_tx_hash else None
-                }
-            }
-            
-            # Update path structure for encrypted document
-            encrypted_blob_name = f"{owner_id}/{property_id}/documents/{doc_id}_{document_name}"
-            logging.info(f"Uploading encrypted document: {encrypted_blob_name}")
-            encrypted_url = await self.azure_storage.upload_file(
-                container_name=self.secure_documents_container,
-                file_name=encrypted_blob_name,
-                file_content=encrypted_data,
-                content_type=content_type,
-                metadata=metadata
-            )
-            
-            # Update path structure for metadata
-            metadata_blob_name = f"{owner_id}/{property_id}/documents/{doc_id}_metadata.json"
-            logging.info(f"Uploading document metadata: {metadata_blob_name}")
-            metadata_content = json.dumps(metadata).encode()
-            await self.azure_storage.upload_file(
-                container_name=self.document_metadata_container,
-                file_name=metadata_blob_name,
-                file_content=metadata_content,
-                content_type="application/json"
-            )
+            timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+            logging.info(f"Processed document {doc_id} with stage timings (ms): {timings}")
             
             return {
                 "document_id": doc_id,
                 "property_id": property_id,
-                "original_url": original_url,
-                "encrypted_url": encrypted_url,
+                "original_url": content["original_url"],
+                "encrypted_url": content["encrypted_url"],
                 "document_hash": document_hash,
-                "blockchain_tx_hash": blockchain_tx_hash,
+                # Reference to the shared content record and its blobs
+                "content_ref": content_ref,
+                "original_blob": content["original_blob"],
+                "encrypted_blob": content["encrypted_blob"],
+                # Anchoring is queued: the transaction of this document's batch and its
+                # inclusion proof are filled in by the anchoring worker once sent
+                "blockchain_status": anchor.get("status"),
+                "blockchain_tx_hash": None,
+                "merkle_root": None,
+                "merkle_proof": None,
                 "owner_id": owner_id,
                 "timestamp": timestamp,
                 "content_type": content_type,
-                "document_name": document_name
+                "document_name": document_name,
+                "stage_timings_ms": timings
             }
             
         except Exception as e:
             logger.error(f"Error processing document: {str(e)}")
             raise
 
-    async def retrieve_document(self, document_id: str, owner_id: str, property_id: str) -> bytes:
+    @staticmethod
+    def _content_key(content: dict) -> bytes:
+        """
+        Unwrap the data key of stored content. A single AES-GCM operation, cheap enough for the event loop.
+        Only for records with a wrapped key; callers derive the key of content written
+        before envelope encryption from its salt with _derive_key.
+        """
+        return document_keks.unwrap(content["kek_version"], content["wrapped_key"], content["_id"])
+
+    async def _retrieve_content(self, content_ref: str) -> Optional[bytes]:
+        """
+        Read content-addressed document content: the original, or the decrypted copy
+        """
+        db = await get_database()
+        content = await db[DOCUMENT_BLOBS_COLLECTION].find_one({"_id": content_ref, "status": "ready"})
+        if content is None:
+            return None
+        
+        try:
+            return await self.azure_storage.download_file(
+                container_name=self.property_documents_container,
+                blob_path=content["original_blob"]
+            )
+        except Exception as e:
+            logging.warning(f"Original content {content_ref} unavailable, decrypting: {str(e)}")
+        
+        encrypted_content = await self.azure_storage.download_file(
+            container_name=self.secure_documents_container,
+            blob_path=content["encrypted_blob"]
+        )
+        if content.get("wrapped_key"):
+            return await run_crypto(chunked_encryption.decrypt, self._content_key(content), encrypted_content)
+        return await run_crypto(
+            self._derive_and_decrypt,
+            encrypted_content,
+            base64.b64decode(content.get("iv", "")),
+            base64.b64decode(content["salt"])
+        )
+
+    async def open_decrypted(self, content_ref: str) -> Optional[Tuple[EncryptedBlobReader, str]]:
+        """
+        Plaintext view of stored content in the chunked format, for streaming and
+        byte-range reads without decrypting the whole document
+        
+        Returns (reader, blob name) to use with blob_response, or None for content
+        stored in a format that can only be decrypted whole.
+        """
+        db = await get_database()
+        content = await db[DOCUMENT_BLOBS_COLLECTION].find_one({"_id": content_ref, "status": "ready"})
+        if content is None or content.get("encryption_algorithm") != chunked_encryption.ALGORITHM:
+            return None
+        
+        if content.get("wrapped_key"):
+            key = self._content_key(content)
+        else:
+            key = await run_crypto(self._derive_key, base64.b64decode(content["salt"]))
+        return EncryptedBlobReader(self.azure_storage, key), content["encrypted_blob"]
+
+    async def restore_original(self, content_ref: str) -> bool:
+        """
+        Rewrite a missing original from the encrypted copy, decrypting while uploading
+        """
+        opened = await self.open_decrypted(content_ref)
+        if opened is None:
+            return False
+        
+        reader, blob_name = opened
+        db = await get_database()
+        content = await db[DOCUMENT_BLOBS_COLLECTION].find_one({"_id": content_ref})
+        plaintext = await reader.open_stream(self.secure_documents_container, blob_name)
+        await self.azure_storage.upload_stream(
+            container_name=self.property_documents_container,
+            file_name=content["original_blob"],
+            stream=plaintext,
+            content_type=content.get("content_type")
+        )
+        return True
+
+    async def retrieve_document(self, document_id: str, owner_id: str, property_id: str, content_ref: Optional[str] = None) -> bytes:
         """
         Retrieve a document from secure storage.
+        Entries with a content_ref read the shared content-addressed blobs.
         """
         try:
             logging.info(f"Retrieving document: ID={document_id}, owner={owner_id}, property={property_id}")
             
+            if content_ref:
+                content = await self._retrieve_content(content_ref)
+                if content:
+                    return content
+            
             # Try to fetch the original document first as a fallback
             try:
                 # Get metadata to find the document name
@@ -271,23 +616,11 @@ class SecureDocumentService:
                         
                         if salt and iv:
                             try:
-                                # Derive the same key used for encryption
-                                key = self._derive_key(salt)
-                                
-                                # Create cipher for decryption
-                                cipher = Cipher(
-                                    algorithms.AES(key),
-                                    modes.CBC(iv),
-                                    backend=default_backend()
+                                # Derive the same key used for encryption and decrypt in the crypto pool
+                                decrypted_content = await run_crypto(
+                                    self._derive_and_decrypt, encrypted_content, iv, salt
                                 )
                                 
-                                # Decrypt
-                                decryptor = cipher.decryptor()
-                                decrypted_padded = decryptor.update(encrypted_content) + decryptor.finalize()
-                                
-                                # Remove padding
-                                decrypted_content = self._unpad_content(decrypted_padded)
-                                
                                 if len(decrypted_content) > 0:
                                     logging.info(f"Successfully decrypted document ({len(decrypted_content)} bytes)")
                                     return decrypted_content
@@ -298,7 +631,7 @@ class SecureDocumentService:
                 logging.warning("Trying alternative method to locate document")
                 fallback_blob_name = f"{owner_id}/{property_id}/documents/{document_id}_*"
                 
-                # This would require implementing a list_blobs method in AzureStorageService
+                # This would require implementing a list_blobs method in the storage backend
                 # For now, we'll raise an exception
                 raise ValueError("Document not found through standard retrieval methods")
                 
@@ -339,22 +672,8 @@ class SecureDocumentService:
         Decrypt a document using the provided parameters.
         """
         try:
-            # Derive the key using the same salt
-            key = self._derive_key(salt)
-            
-            # Create cipher for decryption
-            cipher = Cipher(
-                algorithms.AES(key),
-                modes.CBC(iv),
-                backend=default_backend()
-            )
-            
-            # Decrypt the content
-            decryptor = cipher.decryptor()
-            decrypted_content = decryptor.update(encrypted_content) + decryptor.finalize()
-            
-            # Remove padding
-            return self._unpad_content(decrypted_content)
+            # Derive the key using the same salt and decrypt in the crypto pool
+            return await run_crypto(self._derive_and_decrypt, encrypted_content, iv, salt)
             
         except Exception as e:
             logging.error(f"Decryption error: {str(e)}")
@@ -429,21 +748,11 @@ class SecureDocumentService:
         Encrypt the document using AES-256.
         """
         try:
-            # Generate a random IV
-            iv = os.urandom(16)
-            
             # Create cipher with the correct key size
             key = base64.urlsafe_b64decode(self.encryption_key)
-            cipher = Cipher(
-                algorithms.AES(key),
-                modes.CBC(iv),
-                backend=default_backend()
-            )
             
-            # Encrypt the content
-            encryptor = cipher.encryptor()
-            padded_content = self._pad_content(content)
-            encrypted_content = encryptor.update(padded_content) + encryptor.finalize()
+            # Encrypt the content in the crypto pool
+            encrypted_content, iv = await run_crypto(self._encrypt_document, content, key)
             
             # Return IV + encrypted content
             return iv + encrypted_content
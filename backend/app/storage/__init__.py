@@ -0,0 +1 @@
+from app.storage.base import BlobStream, StorageBackend
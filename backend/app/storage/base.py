@@ -0,0 +1,167 @@
+import os
+import uuid
+import hashlib
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+
+class BlobStream(ABC):
+    """
+    Async iterator over a stored blob (or a byte range of it), yielding bounded chunks.
+
+    Attributes:
+        size: Number of bytes this stream will yield
+        total_size: Size of the whole blob, used for Content-Range
+        offset: Position of the first yielded byte within the blob
+        content_type: Stored content type, if the backend recorded one
+        etag: Strong entity tag of the stored blob (quoted), used for conditional GETs
+        last_modified: Time the blob was last written
+    """
+    size: int
+    total_size: int
+    offset: int
+    content_type: Optional[str]
+    etag: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
+    @abstractmethod
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        ...
+
+class StorageBackend(ABC):
+    """
+    Interface shared by the storage implementations (Azure Blob Storage, local filesystem)
+
+    Containers are addressed by their configured names or by the aliases
+    accepted by resolve_container (e.g. 'property_images', 'documents').
+    """
+    def __init__(self):
+        # Container names from environment variables
+        self.container_user_selfies = os.getenv('AZURE_CONTAINER_USER_SELFIES', 'sec-user-kyc-images')
+        self.container_property_docs = os.getenv('AZURE_CONTAINER_PROPERTY_DOCUMENTS', 'sec-property-legal-docs')
+        self.container_property_images = os.getenv('AZURE_CONTAINER_PROPERTY_IMAGES', 'sec-property-verification-images')
+        self.container_secure_docs = os.getenv('AZURE_CONTAINER_SECURE_DOCUMENTS', 'documents')
+        self.container_doc_metadata = os.getenv('AZURE_CONTAINER_DOCUMENT_METADATA', 'document-metadata')
+
+        # Security configuration
+        self.public_access = os.getenv('AZURE_CONTAINER_PUBLIC_ACCESS', 'false').lower() == 'true'
+
+    def _resolve_upload_container(self, container_name: str) -> str:
+        """
+        Map a container alias to the configured container name for uploads
+        """
+        if container_name == 'user_selfies':
+            container_name = self.container_user_selfies
+        elif container_name == 'property_documents' or container_name == 'property-documents':
+            container_name = self.container_property_docs
+        elif container_name == 'property_images' or container_name == 'property-images':
+            container_name = self.container_property_images
+        elif container_name == 'secure_documents' or container_name == 'documents':
+            container_name = self.container_secure_docs
+        elif container_name == 'document_metadata' or container_name == 'document-metadata':
+            container_name = self.container_doc_metadata
+        return container_name
+
+    def _resolve_download_container(self, container_name: str) -> str:
+        """
+        Map a container alias to the configured container name for downloads
+        """
+        # Map container names for backward compatibility
+        if container_name == 'property-images':
+            container_name = 'property_images'
+        elif container_name == 'property-documents':
+            container_name = 'property_documents'
+        elif container_name == 'secure-documents':
+            container_name = 'secure_documents'
+        elif container_name == 'document-metadata':
+            container_name = 'document_metadata'
+
+        # Map container type to actual container name if needed
+        if container_name == 'user_selfies':
+            container_name = self.container_user_selfies
+        elif container_name == 'property_documents':
+            container_name = self.container_property_docs
+        elif container_name == 'property_images':
+            container_name = self.container_property_images
+        elif container_name == 'secure_documents' or container_name == 'documents':
+            container_name = self.container_secure_docs
+        elif container_name == 'document_metadata' or container_name == 'document-metadata':
+            container_name = self.container_doc_metadata
+
+        return container_name
+
+    def generate_secure_filename(self, original_filename, user_id=None):
+        """
+        Generate a secure, non-guessable filename for storage
+
+        :param original_filename: Original file name
+        :param user_id: Optional user ID to include in the hash
+        :return: Secure filename
+        """
+        # Get file extension
+        if '.' in original_filename:
+            ext = original_filename.rsplit('.', 1)[1].lower()
+        else:
+            ext = 'bin'
+
+        # Generate a random UUID
+        random_id = str(uuid.uuid4())
+
+        # Add user_id to the hash if provided
+        if user_id:
+            hash_base = f"{random_id}_{user_id}_{datetime.utcnow().timestamp()}"
+        else:
+            hash_base = f"{random_id}_{datetime.utcnow().timestamp()}"
+
+        # Create a hash of the base
+        filename_hash = hashlib.sha256(hash_base.encode()).hexdigest()[:16]
+
+        # Return secure filename
+        return f"{filename_hash}.{ext}"
+
+    async def connect(self):
+        """
+        Open connections ahead of the first request. Called from the application lifespan.
+        """
+        return None
+
+    @abstractmethod
+    async def upload_file(self, container_name: str, file_name: str, file_content: bytes, content_type=None, metadata=None) -> str:
+        """Store bytes under container/file_name and return a URL for the blob"""
+
+    @abstractmethod
+    async def upload_stream(self, container_name: str, file_name: str, stream: AsyncIterator[bytes], content_type=None, metadata=None) -> str:
+        """Store an async byte stream without buffering it whole and return a URL for the blob"""
+
+    @abstractmethod
+    async def download_file(self, container_name: str, blob_path: str) -> bytes:
+        """Read a whole blob, raising HTTPException(404) when it does not exist"""
+
+    @abstractmethod
+    async def open_stream(self, container_name: str, blob_path: str, offset: Optional[int] = None, length: Optional[int] = None,
+                          if_none_match: Optional[str] = None, if_modified_since: Optional[datetime] = None) -> BlobStream:
+        """
+        Open a chunked read of a blob or byte range, raising 404 / 416 before any bytes are sent.
+        When the blob matches if_none_match, or is unchanged since if_modified_since,
+        raise HTTPException(304) without reading the body.
+        """
+
+    @abstractmethod
+    async def get_blob_size(self, container_name: str, blob_path: str) -> int:
+        """Size of a blob in bytes"""
+
+    @abstractmethod
+    async def delete_file(self, container_name: str, blob_name: str) -> bool:
+        """Delete a blob, returning False instead of raising when that fails"""
+
+    @abstractmethod
+    async def list_blobs(self, container_name: str, prefix: str = "") -> List[str]:
+        """Names of the blobs in a container that start with prefix"""
+
+    @abstractmethod
+    def generate_url(self, container_name: str, blob_name: str, signed: bool = True, expiry: Optional[timedelta] = None) -> str:
+        """Direct URL for a blob, with a time-limited read signature when signed is set"""
+
+    @abstractmethod
+    async def close(self):
+        """Release connections. Only called at application shutdown."""
@@ -0,0 +1,325 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.storage.base import BlobStream
+
+logger = logging.getLogger(__name__)
+
+
+class CachedBlob:
+    """
+    A cached blob body together with the validators used to revalidate it
+    """
+    __slots__ = ("data", "etag", "content_type", "last_modified", "validated_at")
+
+    def __init__(self, data: bytes, etag: Optional[str], content_type: Optional[str] = None,
+                 last_modified: Optional[datetime] = None, validated_at: float = 0.0):
+        self.data = data
+        self.etag = etag
+        self.content_type = content_type
+        self.last_modified = last_modified
+        # Monotonic time of the last confirmation from storage (0 forces a revalidation)
+        self.validated_at = validated_at
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+class CachedBlobStream(BlobStream):
+    """
+    Chunked read of a cached blob, or of a byte range of it
+    """
+    def __init__(self, blob: CachedBlob, offset: int, length: int, chunk_size: int):
+        self._blob = blob
+        self._chunk_size = chunk_size
+        self.offset = offset
+        self.size = length
+        self.total_size = blob.size
+        self.content_type = blob.content_type
+        self.etag = blob.etag
+        self.last_modified = blob.last_modified
+
+    async def __aiter__(self):
+        view = memoryview(self._blob.data)
+        position = self.offset
+        end = self.offset + self.size
+        while position < end:
+            chunk_end = min(position + self._chunk_size, end)
+            yield bytes(view[position:chunk_end])
+            position = chunk_end
+
+
+class BlobCache:
+    """
+    Two-tier LRU cache of blob bodies, bounded by total bytes per tier.
+
+    Entries live in memory first. When the memory tier is over budget the
+    least recently used entries are demoted to files under the disk path, and
+    the disk tier in turn drops its least recently used files. Entries are
+    trusted for revalidate_seconds, after which the caller revalidates them
+    against storage with the stored ETag.
+
+    The cache is only touched from the event loop; file I/O runs in worker threads.
+    """
+
+    def __init__(self, memory_bytes: int, disk_bytes: int, disk_path: str,
+                 max_entry_bytes: int, revalidate_seconds: int):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.disk_path = os.path.abspath(disk_path)
+        self.max_entry_bytes = max_entry_bytes
+        self.revalidate_seconds = revalidate_seconds
+
+        self._memory: "OrderedDict[str, CachedBlob]" = OrderedDict()
+        self._memory_used = 0
+        # Disk index: key -> (size, validated_at); entries from a previous run start unvalidated
+        self._disk: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._disk_used = 0
+        self._disk_loaded = False
+
+        # Metrics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.revalidated = 0
+        self.refreshed = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    def cacheable(self, size: int) -> bool:
+        return size <= self.max_entry_bytes and (size <= self.memory_bytes or size <= self.disk_bytes)
+
+    def is_fresh(self, blob: CachedBlob) -> bool:
+        return time.monotonic() - blob.validated_at < self.revalidate_seconds
+
+    def mark_validated(self, key: str, blob: CachedBlob) -> None:
+        blob.validated_at = time.monotonic()
+        if key in self._disk:
+            self._disk[key] = (self._disk[key][0], blob.validated_at)
+
+    def record(self, outcome: str) -> None:
+        """
+        Count the outcome of one lookup: memory_hit, disk_hit, revalidated,
+        refreshed (stale entry had changed), miss or uncacheable
+        """
+        if outcome == "memory_hit":
+            self.memory_hits += 1
+        elif outcome == "disk_hit":
+            self.disk_hits += 1
+        elif outcome == "revalidated":
+            self.revalidated += 1
+        elif outcome == "refreshed":
+            self.refreshed += 1
+        elif outcome == "uncacheable":
+            self.uncacheable += 1
+        else:
+            self.misses += 1
+
+    # Disk tier
+
+    def _file_base(self, key: str) -> str:
+        return os.path.join(self.disk_path, hashlib.sha256(key.encode()).hexdigest())
+
+    def _load_disk_index(self) -> "OrderedDict[str, Tuple[int, float]]":
+        """Rebuild the disk index from the sidecar files of a previous run"""
+        index = OrderedDict()
+        os.makedirs(self.disk_path, exist_ok=True)
+        sidecars = [name for name in os.listdir(self.disk_path) if name.endswith(".json")]
+        for name in sorted(sidecars, key=lambda n: os.path.getmtime(os.path.join(self.disk_path, n))):
+            try:
+                with open(os.path.join(self.disk_path, name), "rb") as handle:
+                    meta = json.loads(handle.read())
+                index[meta["key"]] = (os.path.getsize(os.path.join(self.disk_path, name[:-5] + ".blob")), 0.0)
+            except (OSError, ValueError, KeyError):
+                continue
+        return index
+
+    async def _ensure_disk_index(self) -> None:
+        if self._disk_loaded or self.disk_bytes <= 0:
+            return
+        self._disk_loaded = True
+        try:
+            self._disk = await asyncio.to_thread(self._load_disk_index)
+            self._disk_used = sum(size for size, _ in self._disk.values())
+            await self._evict_disk()
+        except OSError as e:
+            logger.error(f"Blob cache disk tier unavailable at {self.disk_path}: {str(e)}")
+            self.disk_bytes = 0
+
+    def _write_disk_entry(self, key: str, blob: CachedBlob) -> None:
+        os.makedirs(self.disk_path, exist_ok=True)
+        base = self._file_base(key)
+        meta = {
+            "key": key,
+            "etag": blob.etag,
+            "content_type": blob.content_type,
+            "last_modified": blob.last_modified.isoformat() if blob.last_modified else None
+        }
+        for path, payload in ((base + ".blob", blob.data), (base + ".json", json.dumps(meta).encode())):
+            fd, temp_path = tempfile.mkstemp(dir=self.disk_path, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(payload)
+            os.replace(temp_path, path)
+
+    def _read_disk_entry(self, key: str) -> Optional[CachedBlob]:
+        base = self._file_base(key)
+        try:
+            with open(base + ".json", "rb") as handle:
+                meta = json.loads(handle.read())
+            with open(base + ".blob", "rb") as handle:
+                data = handle.read()
+        except (OSError, ValueError):
+            return None
+        last_modified = datetime.fromisoformat(meta["last_modified"]) if meta.get("last_modified") else None
+        return CachedBlob(data, meta.get("etag"), meta.get("content_type"), last_modified)
+
+    def _remove_disk_entry(self, key: str) -> None:
+        base = self._file_base(key)
+        for path in (base + ".blob", base + ".json"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def _evict_disk(self) -> None:
+        while self._disk_used > self.disk_bytes and self._disk:
+            key, (size, _) = self._disk.popitem(last=False)
+            self._disk_used -= size
+            self.disk_evictions += 1
+            await asyncio.to_thread(self._remove_disk_entry, key)
+
+    def _forget_disk(self, key: str) -> bool:
+        entry = self._disk.pop(key, None)
+        if entry is None:
+            return False
+        self._disk_used -= entry[0]
+        return True
+
+    async def _drop_disk(self, key: str) -> None:
+        if self._forget_disk(key):
+            await asyncio.to_thread(self._remove_disk_entry, key)
+
+    async def _demote(self, key: str, blob: CachedBlob) -> None:
+        if blob.size > self.disk_bytes:
+            return
+        await self._ensure_disk_index()
+        try:
+            await asyncio.to_thread(self._write_disk_entry, key, blob)
+        except OSError as e:
+            logger.error(f"Failed to write blob cache entry for {key}: {str(e)}")
+            return
+        self._forget_disk(key)
+        self._disk[key] = (blob.size, blob.validated_at)
+        self._disk_used += blob.size
+        await self._evict_disk()
+
+    # Memory tier
+
+    def _drop_memory(self, key: str) -> None:
+        blob = self._memory.pop(key, None)
+        if blob is not None:
+            self._memory_used -= blob.size
+
+    async def get(self, key: str) -> Tuple[Optional[CachedBlob], Optional[str]]:
+        """
+        Look up a blob, returning (blob, tier) where tier is "memory" or "disk".
+        Disk hits are promoted back to the memory tier.
+        """
+        blob = self._memory.get(key)
+        if blob is not None:
+            self._memory.move_to_end(key)
+            return blob, "memory"
+
+        await self._ensure_disk_index()
+        entry = self._disk.get(key)
+        if entry is None:
+            return None, None
+
+        blob = await asyncio.to_thread(self._read_disk_entry, key)
+        if blob is None:
+            self._forget_disk(key)
+            return None, None
+
+        blob.validated_at = entry[1]
+        if blob.size <= self.memory_bytes:
+            await self.put(key, blob)
+        else:
+            self._disk.move_to_end(key)
+        return blob, "disk"
+
+    async def put(self, key: str, blob: CachedBlob) -> None:
+        """
+        Store a blob in the memory tier, demoting least recently used entries to disk
+        """
+        if not self.cacheable(blob.size):
+            await self.invalidate(key)
+            return
+
+        self._drop_memory(key)
+        if blob.size > self.memory_bytes:
+            await self._demote(key, blob)
+            return
+
+        await self._drop_disk(key)
+        # A concurrent put of the same key may have inserted during the await;
+        # drop it again with no await before inserting so its size is not double counted
+        self._drop_memory(key)
+        self._memory[key] = blob
+        self._memory_used += blob.size
+
+        while self._memory_used > self.memory_bytes and self._memory:
+            old_key, old_blob = self._memory.popitem(last=False)
+            self._memory_used -= old_blob.size
+            self.memory_evictions += 1
+            await self._demote(old_key, old_blob)
+
+    async def invalidate(self, key: str) -> None:
+        """
+        Forget a blob, called when it is overwritten or deleted through this process
+        """
+        self._drop_memory(key)
+        await self._ensure_disk_index()
+        await self._drop_disk(key)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Return hit/miss counters and tier usage for monitoring"""
+        hits = self.memory_hits + self.disk_hits + self.revalidated
+        lookups = hits + self.refreshed + self.misses + self.uncacheable
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_used,
+            "memory_limit_bytes": self.memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_used,
+            "disk_limit_bytes": self.disk_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "revalidated": self.revalidated,
+            "refreshed": self.refreshed,
+            "misses": self.misses,
+            "uncacheable": self.uncacheable,
+            "memory_evictions": self.memory_evictions,
+            "disk_evictions": self.disk_evictions,
+            "hit_ratio": (hits / lookups) if lookups else None
+        }
+
+
+# Singleton instance shared by the storage service
+blob_cache = BlobCache(
+    memory_bytes=settings.BLOB_CACHE_MEMORY_BYTES,
+    disk_bytes=settings.BLOB_CACHE_DISK_BYTES,
+    disk_path=settings.BLOB_CACHE_DISK_PATH,
+    max_entry_bytes=settings.BLOB_CACHE_MAX_ENTRY_BYTES,
+    revalidate_seconds=settings.BLOB_CACHE_REVALIDATE_SECONDS
+)
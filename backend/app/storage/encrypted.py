@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+from app.core.executors import run_crypto
+from app.storage.base import BlobStream, StorageBackend
+from app.utils import chunked_encryption
+from app.utils.chunked_encryption import ChunkedDecryptor, Header
+
+class DecryptingBlobStream(BlobStream):
+    """
+    Plaintext of a byte range of a chunked encrypted blob, decrypted segment by
+    segment as the ciphertext streams in
+    """
+    def __init__(self, source: BlobStream, key: bytes, header: Header, first_index: int, last_index: int,
+                 skip: int, offset: int, size: int, total_size: int):
+        self._source = source
+        self._decryptor = ChunkedDecryptor(key, header, first_index, last_index)
+        self._skip = skip
+        self.offset = offset
+        self.size = size
+        self.total_size = total_size
+        self.content_type = source.content_type
+        self.etag = source.etag
+        self.last_modified = source.last_modified
+
+    async def __aiter__(self):
+        skip = self._skip
+        remaining = self.size
+
+        async for chunk in self._source:
+            plaintext = await run_crypto(self._decryptor.update, chunk)
+            if skip:
+                dropped = min(skip, len(plaintext))
+                plaintext = plaintext[dropped:]
+                skip -= dropped
+            if plaintext and remaining:
+                plaintext = plaintext[:remaining]
+                remaining -= len(plaintext)
+                yield plaintext
+
+        plaintext = (await run_crypto(self._decryptor.finalize))[skip:remaining + skip]
+        if plaintext:
+            yield plaintext
+
+class EncryptedBlobReader:
+    """
+    Read-only view of chunked encrypted blobs in plaintext offsets
+
+    Implements the open_stream / get_blob_size calls used by blob_response, so a
+    decrypted document can be streamed with Range and conditional GET support.
+    Each open reads the 16-byte header first, then only the segments covering
+    the requested range.
+    """
+    def __init__(self, storage: StorageBackend, key: bytes):
+        self.storage = storage
+        self._key = key
+
+    async def _read_header(self, container_name: str, blob_path: str, **conditions):
+        header_stream = await self.storage.open_stream(
+            container_name, blob_path, offset=0, length=chunked_encryption.HEADER_SIZE, **conditions
+        )
+        raw = b"".join([chunk async for chunk in header_stream])
+        try:
+            header = chunked_encryption.parse_header(raw)
+            segments, plaintext_size = chunked_encryption.segment_layout(header, header_stream.total_size)
+        except ValueError as e:
+            raise HTTPException(status_code=500, detail=f"Unreadable encrypted document: {str(e)}")
+        return header, header_stream.total_size, segments, plaintext_size
+
+    async def get_blob_size(self, container_name: str, blob_path: str) -> int:
+        _, _, _, plaintext_size = await self._read_header(container_name, blob_path)
+        return plaintext_size
+
+    async def open_stream(self, container_name: str, blob_path: str, offset: Optional[int] = None, length: Optional[int] = None,
+                          if_none_match: Optional[str] = None, if_modified_since: Optional[datetime] = None) -> DecryptingBlobStream:
+        header, blob_size, segments, plaintext_size = await self._read_header(
+            container_name, blob_path, if_none_match=if_none_match, if_modified_since=if_modified_since
+        )
+
+        start = offset or 0
+        if offset is not None and start >= plaintext_size:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{plaintext_size}"}
+            )
+        size = plaintext_size - start if length is None else min(length, plaintext_size - start)
+
+        cipher_offset, cipher_length, first_index, skip = chunked_encryption.ciphertext_range(header, blob_size, start, size)
+        source = await self.storage.open_stream(container_name, blob_path, offset=cipher_offset, length=cipher_length)
+        return DecryptingBlobStream(source, self._key, header, first_index, segments - 1, skip, start, size, plaintext_size)
@@ -0,0 +1,290 @@
+import os
+import json
+import mmap
+import hmac
+import asyncio
+import hashlib
+import logging
+import tempfile
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+from fastapi import HTTPException
+from app.core.config import settings
+from app.storage.base import BlobStream, StorageBackend
+from app.utils.http_range import is_not_modified, not_modified
+
+# Per-container directory holding the content type and metadata of each blob
+_META_DIR = ".meta"
+
+class LocalBlobStream(BlobStream):
+    """
+    Chunked read of a local blob through a read-only memory map.
+    Each chunk is copied out of the map in a worker thread, so page faults
+    on a cold file never block the event loop.
+    """
+    def __init__(self, path: str, offset: int, length: int, total_size: int, content_type: Optional[str], chunk_size: int,
+                 etag: Optional[str] = None, last_modified: Optional[datetime] = None):
+        self._path = path
+        self.offset = offset
+        self.size = length
+        self.total_size = total_size
+        self.content_type = content_type
+        self.etag = etag
+        self.last_modified = last_modified
+        self._chunk_size = chunk_size
+
+    async def __aiter__(self):
+        if self.size == 0:
+            return
+
+        handle = await asyncio.to_thread(open, self._path, 'rb')
+        try:
+            mapped = await asyncio.to_thread(mmap.mmap, handle.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                position = self.offset
+                end = self.offset + self.size
+                while position < end:
+                    chunk_end = min(position + self._chunk_size, end)
+                    yield await asyncio.to_thread(mapped.__getitem__, slice(position, chunk_end))
+                    position = chunk_end
+            finally:
+                mapped.close()
+        finally:
+            handle.close()
+
+class LocalStorageService(StorageBackend):
+    """
+    Filesystem storage backend for offline development, CI and benchmarks
+
+    Containers are directories under LOCAL_STORAGE_PATH. Writes go to a temporary
+    file in the target directory and are published with os.replace, so readers
+    never see a partial blob. Reads use memory maps.
+    """
+    def __init__(self, root: Optional[str] = None):
+        super().__init__()
+        self.root = os.path.abspath(root or settings.LOCAL_STORAGE_PATH)
+        self.base_url = settings.LOCAL_STORAGE_BASE_URL.rstrip('/')
+        self.stream_chunk_size = settings.AZURE_STREAM_CHUNK_SIZE
+        self._signing_key = settings.JWT_SECRET_KEY.encode()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _blob_path(self, container_name: str, blob_name: str) -> str:
+        # Keep every blob inside the container directory
+        container_dir = os.path.join(self.root, container_name)
+        path = os.path.abspath(os.path.join(container_dir, blob_name))
+        if not path.startswith(container_dir + os.sep):
+            raise HTTPException(status_code=400, detail=f"Invalid blob name '{blob_name}'")
+        return path
+
+    def _meta_path(self, container_name: str, blob_name: str) -> str:
+        return self._blob_path(container_name, os.path.join(_META_DIR, f"{blob_name}.json"))
+
+    @staticmethod
+    def _atomic_write(path: str, chunks) -> None:
+        """Write chunks to a temporary sibling file, then rename it over path"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                for chunk in chunks:
+                    handle.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def _write_meta(self, container_name: str, blob_name: str, content_type, metadata, content_hash: str) -> None:
+        meta = {
+            "content_type": content_type,
+            "metadata": {str(k): str(v) for k, v in (metadata or {}).items()},
+            "last_modified": datetime.utcnow().isoformat(),
+            # Strong entity tag derived from the content
+            "etag": f'"{content_hash[:32]}"'
+        }
+        self._atomic_write(self._meta_path(container_name, blob_name), [json.dumps(meta).encode()])
+
+    def _read_meta(self, container_name: str, blob_name: str) -> dict:
+        try:
+            with open(self._meta_path(container_name, blob_name), 'rb') as handle:
+                return json.loads(handle.read())
+        except (OSError, ValueError):
+            return {}
+
+    async def upload_file(self, container_name: str, file_name: str, file_content: bytes, content_type=None, metadata=None) -> str:
+        """
+        Write a blob atomically and return its URL
+        """
+        container_name = self._resolve_upload_container(container_name)
+        path = self._blob_path(container_name, file_name)
+
+        def write():
+            self._atomic_write(path, [file_content])
+            self._write_meta(container_name, file_name, content_type, metadata, hashlib.sha256(file_content).hexdigest())
+
+        await asyncio.to_thread(write)
+        return self.generate_url(container_name, file_name, signed=not self.public_access)
+
+    async def upload_stream(self, container_name: str, file_name: str, stream: AsyncIterator[bytes], content_type=None, metadata=None) -> str:
+        """
+        Write an async byte stream to a temporary file and publish it atomically
+        """
+        container_name = self._resolve_upload_container(container_name)
+        path = self._blob_path(container_name, file_name)
+        directory = os.path.dirname(path)
+        await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        handle = os.fdopen(fd, 'wb')
+        content_hash = hashlib.sha256()
+        try:
+            async for chunk in stream:
+                content_hash.update(chunk)
+                await asyncio.to_thread(handle.write, chunk)
+            handle.close()
+            await asyncio.to_thread(os.replace, temp_path, path)
+            await asyncio.to_thread(self._write_meta, container_name, file_name, content_type, metadata, content_hash.hexdigest())
+        except BaseException:
+            handle.close()
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        return self.generate_url(container_name, file_name, signed=not self.public_access)
+
+    async def download_file(self, container_name: str, blob_path: str) -> bytes:
+        """
+        Read a whole blob through a memory map
+        """
+        blob_path = urllib.parse.unquote(blob_path)
+        container_name = self._resolve_download_container(container_name)
+        path = self._blob_path(container_name, blob_path)
+
+        def read() -> bytes:
+            with open(path, 'rb') as handle:
+                if os.fstat(handle.fileno()).st_size == 0:
+                    return b""
+                with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[:]
+
+        try:
+            content = await asyncio.to_thread(read)
+        except FileNotFoundError:
+            logging.error(f"Blob '{blob_path}' not found in container '{container_name}'")
+            raise HTTPException(status_code=404, detail=f"File '{blob_path}' not found")
+
+        if not content:
+            logging.error(f"Downloaded content is empty from {container_name}/{blob_path}")
+            raise HTTPException(status_code=500, detail="Downloaded content is empty")
+
+        return content
+
+    async def open_stream(self, container_name: str, blob_path: str, offset: Optional[int] = None, length: Optional[int] = None,
+                          if_none_match: Optional[str] = None, if_modified_since: Optional[datetime] = None) -> LocalBlobStream:
+        """
+        Open a chunked, optionally ranged, read of a local blob
+        """
+        blob_path = urllib.parse.unquote(blob_path)
+        container_name = self._resolve_download_container(container_name)
+        path = self._blob_path(container_name, blob_path)
+        try:
+            stat = await asyncio.to_thread(os.stat, path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"File '{blob_path}' not found")
+        total_size = stat.st_size
+
+        # Blobs written before content hashes were recorded fall back to size and mtime
+        meta = await asyncio.to_thread(self._read_meta, container_name, blob_path)
+        etag = meta.get("etag") or f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        last_modified = datetime.utcfromtimestamp(stat.st_mtime)
+        if is_not_modified(etag, last_modified, if_none_match, if_modified_since):
+            raise not_modified(etag, last_modified)
+
+        start = offset or 0
+        if offset is not None and start >= total_size:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{total_size}"}
+            )
+        size = total_size - start if length is None else min(length, total_size - start)
+
+        return LocalBlobStream(
+            path,
+            start,
+            size,
+            total_size,
+            meta.get("content_type"),
+            self.stream_chunk_size,
+            etag=etag,
+            last_modified=last_modified
+        )
+
+    async def get_blob_size(self, container_name: str, blob_path: str) -> int:
+        container_name = self._resolve_download_container(container_name)
+        try:
+            return await asyncio.to_thread(os.path.getsize, self._blob_path(container_name, blob_path))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"File '{blob_path}' not found")
+
+    async def delete_file(self, container_name: str, blob_name: str) -> bool:
+        def remove():
+            os.remove(self._blob_path(container_name, blob_name))
+            meta_path = self._meta_path(container_name, blob_name)
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+
+        try:
+            await asyncio.to_thread(remove)
+            return True
+        except Exception as e:
+            logging.error(f"Error deleting local file: {str(e)}")
+            return False
+
+    async def list_blobs(self, container_name: str, prefix: str = "") -> List[str]:
+        container_name = self._resolve_download_container(container_name)
+        container_dir = os.path.join(self.root, container_name)
+
+        def walk() -> List[str]:
+            names = []
+            for directory, subdirs, files in os.walk(container_dir):
+                # Skip the metadata tree
+                subdirs[:] = [d for d in subdirs if d != _META_DIR]
+                for file_name in files:
+                    if file_name.startswith(".upload-"):
+                        continue
+                    name = os.path.relpath(os.path.join(directory, file_name), container_dir).replace(os.sep, '/')
+                    if name.startswith(prefix):
+                        names.append(name)
+            return sorted(names)
+
+        return await asyncio.to_thread(walk)
+
+    def _signature(self, container_name: str, blob_name: str, expires: int) -> str:
+        message = f"{container_name}/{blob_name}:{expires}".encode()
+        return hmac.new(self._signing_key, message, hashlib.sha256).hexdigest()
+
+    def generate_url(self, container_name: str, blob_name: str, signed: bool = True, expiry: Optional[timedelta] = None) -> str:
+        """
+        URL shaped like a blob URL (container/blob), signed with an HMAC and expiry time
+        """
+        url = f"{self.base_url}/{container_name}/{urllib.parse.quote(blob_name, safe='~/')}"
+        if not signed:
+            return url
+
+        expires = int(time.time() + (expiry or timedelta(days=7)).total_seconds())
+        return f"{url}?se={expires}&sig={self._signature(container_name, blob_name, expires)}"
+
+    def verify_signature(self, container_name: str, blob_name: str, expires: int, signature: str) -> bool:
+        """
+        Check a signature produced by generate_url and that it has not expired
+        """
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(signature, self._signature(container_name, blob_name, expires))
+
+    async def close(self):
+        return None
@@ -0,0 +1,72 @@
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.storage.base import StorageBackend
+
+
+class SignedUrlCache:
+    """
+    Short-lived signed read URLs, reused per blob until shortly before they expire.
+
+    Signing is cheap, but handing every visitor the same URL for a blob lets
+    browsers and proxies cache the image bytes behind it.
+    """
+
+    def __init__(self, ttl_seconds: int = 300, refresh_margin_seconds: int = 60, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = min(refresh_margin_seconds, ttl_seconds // 2)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float]]" = OrderedDict()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, storage: StorageBackend, container_name: str, blob_name: str) -> Tuple[str, int]:
+        """
+        Return (url, seconds the URL may still be handed out) for a blob
+        """
+        cache_key = (container_name, blob_name)
+        now = time.monotonic()
+
+        entry = self._entries.get(cache_key)
+        if entry and entry[1] - self.refresh_margin_seconds > now:
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return entry[0], int(entry[1] - self.refresh_margin_seconds - now)
+
+        self.misses += 1
+        url = storage.generate_url(
+            container_name,
+            blob_name,
+            signed=not storage.public_access,
+            expiry=timedelta(seconds=self.ttl_seconds)
+        )
+        self._entries[cache_key] = (url, now + self.ttl_seconds)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return url, self.ttl_seconds - self.refresh_margin_seconds
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Return hit/miss counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl_seconds,
+            "refresh_margin_seconds": self.refresh_margin_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else None
+        }
+
+
+# Singleton instance shared by the image routes
+signed_url_cache = SignedUrlCache(
+    ttl_seconds=settings.IMAGE_SAS_TTL_SECONDS,
+    refresh_margin_seconds=settings.IMAGE_SAS_REFRESH_MARGIN_SECONDS
+)
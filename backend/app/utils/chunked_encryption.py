@@ -0,0 +1,164 @@
+import os
+import struct
+from typing import NamedTuple, Optional, Tuple
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# Chunked AES-256-GCM container
+#
+#   header:   magic "SSGC" | version (1 byte) | segment size (uint32) | nonce prefix (7 bytes)
+#   segments: AES-GCM(plaintext segment) || 16-byte tag, every segment but the last full size
+#
+# Segment i is sealed with nonce = prefix | i (uint32) | last flag (1 byte) and the
+# header as associated data, so segments cannot be reordered, truncated or moved
+# between blobs. Because every sealed segment but the last has the same size, any
+# plaintext byte range maps to a ciphertext range that can be fetched and opened
+# on its own.
+
+MAGIC = b"SSGC"
+FORMAT_VERSION = 1
+ALGORITHM = "AES-256-GCM-CHUNKED"
+DEFAULT_SEGMENT_SIZE = 64 * 1024
+TAG_SIZE = 16
+
+_HEADER = struct.Struct(">4sBI7s")
+HEADER_SIZE = _HEADER.size
+
+class Header(NamedTuple):
+    segment_size: int
+    nonce_prefix: bytes
+    raw: bytes
+
+    @property
+    def sealed_size(self) -> int:
+        return self.segment_size + TAG_SIZE
+
+def is_chunked(data: bytes) -> bool:
+    """
+    Whether data starts with a chunked container header (Fernet tokens and CBC output never do)
+    """
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+def parse_header(data: bytes) -> Header:
+    if len(data) < HEADER_SIZE:
+        raise ValueError("Encrypted blob is shorter than its header")
+    raw = bytes(data[:HEADER_SIZE])
+    magic, version, segment_size, nonce_prefix = _HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError("Not a chunked encrypted blob")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported chunked encryption version {version}")
+    if segment_size <= 0:
+        raise ValueError("Invalid segment size")
+    return Header(segment_size, nonce_prefix, raw)
+
+def _nonce(header: Header, index: int, last: bool) -> bytes:
+    return header.nonce_prefix + struct.pack(">IB", index, 1 if last else 0)
+
+def segment_layout(header: Header, blob_size: int) -> Tuple[int, int]:
+    """
+    (segment count, plaintext size) of an encrypted blob of blob_size bytes
+    """
+    body = blob_size - HEADER_SIZE
+    full, remainder = divmod(body, header.sealed_size)
+    if remainder == 0 and full > 0:
+        return full, full * header.segment_size
+    if remainder < TAG_SIZE:
+        raise ValueError("Encrypted blob is truncated")
+    return full + 1, full * header.segment_size + remainder - TAG_SIZE
+
+def ciphertext_range(header: Header, blob_size: int, offset: int, length: Optional[int]) -> Tuple[int, int, int, int]:
+    """
+    Map a plaintext range to the sealed segments covering it
+
+    :return: (ciphertext offset, ciphertext length, index of the first segment,
+              bytes to skip at the start of the first decrypted segment)
+    """
+    _, plaintext_size = segment_layout(header, blob_size)
+    end = plaintext_size if length is None else min(offset + length, plaintext_size)
+    first = offset // header.segment_size
+    last = max(first, (end - 1) // header.segment_size)
+    start = HEADER_SIZE + first * header.sealed_size
+    stop = min(HEADER_SIZE + (last + 1) * header.sealed_size, blob_size)
+    return start, stop - start, first, offset - first * header.segment_size
+
+class ChunkedEncryptor:
+    """
+    Incremental encryption: feed plaintext to update() and concatenate the header,
+    every update() result and finalize()
+    """
+    def __init__(self, key: bytes, segment_size: int = DEFAULT_SEGMENT_SIZE):
+        raw = _HEADER.pack(MAGIC, FORMAT_VERSION, segment_size, os.urandom(7))
+        self.header = parse_header(raw)
+        self._aead = AESGCM(key)
+        self._buffer = bytearray()
+        self._index = 0
+
+    def _seal(self, segment, last: bool) -> bytes:
+        sealed = self._aead.encrypt(_nonce(self.header, self._index, last), bytes(segment), self.header.raw)
+        self._index += 1
+        return sealed
+
+    def update(self, data: bytes) -> bytes:
+        # A full segment is held back until more data arrives, since the last one is sealed differently
+        self._buffer.extend(data)
+        segment_size = self.header.segment_size
+        sealed = []
+        position = 0
+        while len(self._buffer) - position > segment_size:
+            sealed.append(self._seal(memoryview(self._buffer)[position:position + segment_size], last=False))
+            position += segment_size
+        del self._buffer[:position]
+        return b"".join(sealed)
+
+    def finalize(self) -> bytes:
+        sealed = self._seal(self._buffer, last=True)
+        self._buffer = bytearray()
+        return sealed
+
+class ChunkedDecryptor:
+    """
+    Incremental decryption of sealed segments, from the first one or from any segment index
+
+    Without last_index the final segment is recognised at finalize(), so a blob
+    cut at a segment boundary fails authentication instead of decrypting short.
+    """
+    def __init__(self, key: bytes, header: Header, first_index: int = 0, last_index: Optional[int] = None):
+        self.header = header
+        self._aead = AESGCM(key)
+        self._buffer = bytearray()
+        self._index = first_index
+        self._last_index = last_index
+
+    def _open(self, sealed, last: bool) -> bytes:
+        plaintext = self._aead.decrypt(_nonce(self.header, self._index, last), bytes(sealed), self.header.raw)
+        self._index += 1
+        return plaintext
+
+    def update(self, data: bytes) -> bytes:
+        self._buffer.extend(data)
+        sealed_size = self.header.sealed_size
+        opened = []
+        position = 0
+        while len(self._buffer) - position > sealed_size:
+            opened.append(self._open(memoryview(self._buffer)[position:position + sealed_size], self._index == self._last_index))
+            position += sealed_size
+        del self._buffer[:position]
+        return b"".join(opened)
+
+    def finalize(self) -> bytes:
+        if not self._buffer:
+            return b""
+        last = self._last_index is None or self._index == self._last_index
+        plaintext = self._open(self._buffer, last)
+        self._buffer = bytearray()
+        return plaintext
+
+def encrypt(key: bytes, data: bytes, segment_size: int = DEFAULT_SEGMENT_SIZE) -> bytes:
+    """Encrypt a whole buffer into the chunked format"""
+    encryptor = ChunkedEncryptor(key, segment_size)
+    return encryptor.header.raw + encryptor.update(data) + encryptor.finalize()
+
+def decrypt(key: bytes, blob: bytes) -> bytes:
+    """Decrypt and authenticate a whole chunked blob"""
+    decryptor = ChunkedDecryptor(key, parse_header(blob))
+    return decryptor.update(memoryview(blob)[HEADER_SIZE:]) + decryptor.finalize()
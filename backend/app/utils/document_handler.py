@@ -5,7 +5,7 @@ import logging
 from datetime import datetime
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import serialization
 import fitz  # PyMuPDF
 from reportlab.pdfgen import canvas
@@ -15,6 +15,7 @@ from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.colors import gray
 from azure.storage.blob import BlobServiceClient
 from azure.core.exceptions import ResourceNotFoundError
+from app.core.signing_keys import signing_keys
 
 class DocumentHandler:
     def __init__(self, connection_string: str):
@@ -50,27 +51,6 @@ class DocumentHandler:
         """Generate a new Fernet encryption key."""
         return Fernet.generate_key()
 
-    def _generate_rsa_keys(self):
-        """Generate RSA key pair for digital signatures."""
-        private_key = rsa.generate_private_key(
-            public_exponent=65537,
-            key_size=2048
-        )
-        public_key = private_key.public_key()
-        
-        # Serialize keys
-        private_pem = private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.PKCS8,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        public_pem = public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        )
-        
-        return private_pem, public_pem
-
     def _add_watermark(self, pdf_content: bytes, watermark_text: str) -> bytes:
         """Add watermark to PDF content."""
         # Create a temporary PDF with watermark
@@ -83,21 +63,8 @@ class DocumentHandler:
         # Save to bytes
         return doc.write()
 
-    def _sign_document(self, content: bytes, private_key: bytes) -> bytes:
-        """Digitally sign the document content."""
-        private_key_obj = serialization.load_pem_private_key(private_key, password=None)
-        signature = private_key_obj.sign(
-            content,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        return signature
-
     def _verify_signature(self, content: bytes, signature: bytes, public_key: bytes) -> bool:
-        """Verify the document signature."""
+        """Verify a signature made with a per-document RSA key (documents uploaded before shared signing keys)."""
         try:
             public_key_obj = serialization.load_pem_public_key(public_key)
             public_key_obj.verify(
@@ -127,15 +94,14 @@ class DocumentHandler:
     async def upload_document(self, file_content: bytes, original_filename: str, seller_info: dict) -> dict:
         """Upload and process a document with encryption and watermarking."""
         try:
-            # Generate keys
+            # Generate the document key
             encryption_key = self._generate_encryption_key()
-            private_key, public_key = self._generate_rsa_keys()
             
             # Generate document ID
             document_id = base64.urlsafe_b64encode(os.urandom(16)).decode()
             
-            # Sign the document
-            signature = self._sign_document(file_content, private_key)
+            # Sign the document with the shared signing key ("<kid>:<signature>")
+            signature = signing_keys.sign(file_content)
             
             # Encrypt the document
             encrypted_content = self._encrypt_file(file_content, encryption_key)
@@ -152,8 +118,7 @@ class DocumentHandler:
             keys_blob_name = f"{document_id}/keys.json"
             keys_data = {
                 "encryption_key": base64.b64encode(encryption_key).decode(),
-                "public_key": base64.b64encode(public_key).decode(),
-                "signature": base64.b64encode(signature).decode()
+                "signature": signature
             }
             keys_blob_client = self.blob_service_client.get_blob_client(
                 container=self.keys_container,
@@ -213,10 +178,16 @@ class DocumentHandler:
             encryption_key = base64.b64decode(keys_data["encryption_key"])
             decrypted_content = self._decrypt_file(encrypted_content, encryption_key)
             
-            # Verify signature
-            signature = base64.b64decode(keys_data["signature"])
-            public_key = base64.b64decode(keys_data["public_key"])
-            if not self._verify_signature(decrypted_content, signature, public_key):
+            # Verify signature: documents uploaded before shared signing keys carry their own public key
+            if "public_key" in keys_data:
+                verified = self._verify_signature(
+                    decrypted_content,
+                    base64.b64decode(keys_data["signature"]),
+                    base64.b64decode(keys_data["public_key"])
+                )
+            else:
+                verified = signing_keys.verify(decrypted_content, keys_data["signature"])
+            if not verified:
                 raise ValueError("Document signature verification failed")
             
             # Add watermark if buyer info is provided
@@ -4,11 +4,14 @@ from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
+from app.utils.key_cache import derived_key_cache, key_fingerprint
+from app.utils import chunked_encryption
 
 class FileEncryptor:
     def __init__(self):
         # Use a strong salt from environment or generate a secure one
         self.salt = os.getenv('ENCRYPTION_SALT', os.urandom(16)).encode()
+        self.iteration_count = 100000
     
     def _generate_key(self, password: str = None):
         """
@@ -20,36 +23,47 @@ class FileEncryptor:
         if not password:
             password = os.getenv('FILE_ENCRYPTION_KEY', os.urandom(32).hex())
         
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
+        def derive():
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=self.salt,
+                iterations=self.iteration_count
+            )
+            return kdf.derive(password.encode())
+        
+        # The salt is static, so every call with the same password reuses the cached key
+        derived = derived_key_cache.get_or_derive(
             salt=self.salt,
-            iterations=100000
+            iterations=self.iteration_count,
+            key_id=key_fingerprint(password),
+            derive=derive
         )
-        key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
+        key = base64.urlsafe_b64encode(derived)
         return key
 
     def encrypt_data(self, data: bytes, password: str = None) -> bytes:
         """
-        Encrypt file data
+        Encrypt file data in the chunked AES-GCM format
         
         :param data: File content as bytes
         :param password: Optional encryption password
         :return: Encrypted bytes
         """
         key = self._generate_key(password)
-        f = Fernet(key)
-        return f.encrypt(data)
+        return chunked_encryption.encrypt(base64.urlsafe_b64decode(key), data)
 
     def decrypt_data(self, encrypted_data: bytes, password: str = None) -> bytes:
         """
-        Decrypt file data
+        Decrypt file data, either chunked AES-GCM or a Fernet token written before it
         
         :param encrypted_data: Encrypted file content
         :param password: Optional decryption password
         :return: Decrypted bytes
         """
         key = self._generate_key(password)
+        if chunked_encryption.is_chunked(encrypted_data):
+            return chunked_encryption.decrypt(base64.urlsafe_b64decode(key), encrypted_data)
         f = Fernet(key)
         return f.decrypt(encrypted_data)
 
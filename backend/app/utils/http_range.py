@@ -0,0 +1,204 @@
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import RedirectResponse, StreamingResponse
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional, Tuple
+import re
+from app.core.config import settings
+from app.storage.signed_urls import signed_url_cache
+
+_RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def parse_range_header(value: Optional[str]) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Parse a single "bytes=start-end" Range header
+
+    Returns (start, end) where end may be None for an open range, or (None, n) for
+    a suffix range of the last n bytes. Missing, malformed and multi-range headers
+    return None so the caller serves the full body, as RFC 7233 allows.
+    """
+    if not value:
+        return None
+
+    match = _RANGE_PATTERN.match(value.strip())
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        # Suffix range: the last n bytes
+        return None, int(end)
+
+    start = int(start)
+    end = int(end) if end else None
+    if end is not None and end < start:
+        return None
+    return start, end
+
+def parse_if_none_match(value: Optional[str]) -> List[str]:
+    """
+    Entity tags listed in an If-None-Match header, with weak prefixes removed
+    since If-None-Match uses the weak comparison
+    """
+    if not value:
+        return []
+    tags = []
+    for tag in value.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag:
+            tags.append(tag)
+    return tags
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an HTTP date (If-Modified-Since), returning None when it is malformed
+    """
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def format_http_date(value: datetime) -> str:
+    """
+    Format a datetime for Last-Modified, treating naive values as UTC
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def validator_headers(etag: Optional[str], last_modified: Optional[datetime]) -> dict:
+    """
+    ETag / Last-Modified response headers for a blob
+    """
+    headers = {}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = format_http_date(last_modified)
+    return headers
+
+def is_not_modified(etag: Optional[str], last_modified: Optional[datetime], if_none_match: Optional[str] = None, if_modified_since: Optional[datetime] = None) -> bool:
+    """
+    Evaluate If-None-Match (a single entity tag) or, when it is absent, If-Modified-Since
+    against a blob's validators
+    """
+    if if_none_match:
+        return bool(etag) and etag.replace('W/', '', 1) == if_none_match.replace('W/', '', 1)
+    if if_modified_since and last_modified:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have one second resolution
+        return last_modified.replace(microsecond=0) <= if_modified_since
+    return False
+
+def not_modified(etag: Optional[str], last_modified: Optional[datetime] = None) -> HTTPException:
+    """
+    Raised by storage backends when a conditional read matched, before any body is fetched
+    """
+    return HTTPException(status_code=304, headers=validator_headers(etag, last_modified))
+
+def _unsatisfiable(size: int) -> HTTPException:
+    return HTTPException(
+        status_code=416,
+        detail="Requested range not satisfiable",
+        headers={"Content-Range": f"bytes */{size}"}
+    )
+
+async def blob_response(storage, request: Optional[Request], container_name: str, blob_path: str, media_type: str, headers: Optional[dict] = None) -> StreamingResponse:
+    """
+    Stream a stored blob, honouring a Range header with a 206 partial response
+    and If-None-Match / If-Modified-Since with a 304 that skips the download
+
+    Only use this for blobs served byte-for-byte; decrypted or watermarked content
+    has no stable offsets in storage.
+
+    :param storage: The storage service to read from
+    :param request: Incoming request, used for its Range header
+    :param container_name: Container holding the blob
+    :param blob_path: Path of the blob within the container
+    :param media_type: Content type of the response
+    :param headers: Extra response headers (cache policy, disposition)
+    """
+    response_headers = dict(headers or {})
+    response_headers["Accept-Ranges"] = "bytes"
+
+    byte_range = parse_range_header(request.headers.get('range')) if request is not None else None
+
+    # A single entity tag (the usual browser revalidation) is evaluated by storage itself;
+    # lists and "*" are compared once the blob's ETag is known
+    etags = parse_if_none_match(request.headers.get('if-none-match')) if request is not None else []
+    conditions = {}
+    if len(etags) == 1 and etags[0] != '*':
+        conditions["if_none_match"] = etags[0]
+    elif not etags and request is not None:
+        conditions["if_modified_since"] = parse_http_date(request.headers.get('if-modified-since'))
+
+    try:
+        if byte_range is None:
+            blob_stream = await storage.open_stream(container_name, blob_path, **conditions)
+        else:
+            blob_stream = await _open_range(storage, container_name, blob_path, byte_range, conditions)
+    except HTTPException as e:
+        if e.status_code != 304:
+            raise
+        return _not_modified_response(e.headers, response_headers)
+
+    if etags and ('*' in etags or (blob_stream.etag and blob_stream.etag in etags)):
+        return _not_modified_response(validator_headers(blob_stream.etag, blob_stream.last_modified), response_headers)
+
+    response_headers.update(validator_headers(blob_stream.etag, blob_stream.last_modified))
+    response_headers["Content-Length"] = str(blob_stream.size)
+
+    if byte_range is None:
+        return StreamingResponse(blob_stream, status_code=200, media_type=media_type, headers=response_headers)
+
+    last = blob_stream.offset + blob_stream.size - 1
+    response_headers["Content-Range"] = f"bytes {blob_stream.offset}-{last}/{blob_stream.total_size}"
+    return StreamingResponse(blob_stream, status_code=206, media_type=media_type, headers=response_headers)
+
+def _not_modified_response(validators: Optional[dict], response_headers: dict) -> Response:
+    # 304 repeats the validators and caching headers of the 200, without a body
+    headers = {k: v for k, v in response_headers.items() if k in ("Cache-Control", "Expires", "Vary")}
+    headers.update(validators or {})
+    return Response(status_code=304, headers=headers)
+
+async def _open_range(storage, container_name: str, blob_path: str, byte_range: Tuple[Optional[int], Optional[int]], conditions: dict):
+
+    start, end = byte_range
+    if start is None:
+        # Suffix ranges need the blob size to find their offset
+        blob_size = await storage.get_blob_size(container_name, blob_path)
+        if end == 0 or blob_size == 0:
+            raise _unsatisfiable(blob_size)
+        start = max(blob_size - end, 0)
+        end = None
+
+    length = end - start + 1 if end is not None else None
+    return await storage.open_stream(container_name, blob_path, offset=start, length=length, **conditions)
+
+async def image_response(storage, request: Optional[Request], container_name: str, blob_path: str, media_type: str, headers: Optional[dict] = None):
+    """
+    Serve a public image by proxying it (blob_response), or with IMAGE_DELIVERY_MODE=redirect
+    by a 307 to a short-lived read-only signed URL so the bytes bypass the API workers
+
+    Callers run their auth checks before this. The redirect may be cached by the
+    browser only while the signed URL is still handed out to others.
+    """
+    if settings.IMAGE_DELIVERY_MODE.lower() != "redirect":
+        return await blob_response(storage, request, container_name, blob_path, media_type, headers=headers)
+
+    url, valid_seconds = signed_url_cache.get(storage, container_name, blob_path)
+    response_headers = {"Cache-Control": f"private, max-age={valid_seconds}"}
+    if headers and "Vary" in headers:
+        response_headers["Vary"] = headers["Vary"]
+    return RedirectResponse(url, status_code=307, headers=response_headers)
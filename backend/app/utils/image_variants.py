@@ -0,0 +1,127 @@
+from fastapi import HTTPException
+from io import BytesIO
+from typing import List, Optional, Tuple
+from PIL import Image, ImageOps
+
+# Longest edge in pixels of each derivative, smallest first
+VARIANT_SIZES = {
+    "thumb": 320,
+    "card": 800,
+    "full": 1600
+}
+
+# Encodings generated for every size: format name -> (Pillow format, content type)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg")
+}
+
+VARIANT_QUALITY = 80
+
+# Served when variants exist and the client does not ask for a size
+DEFAULT_VARIANT_SIZE = "full"
+
+def variant_filename(filename: str, size: str, image_format: str) -> str:
+    """
+    Blob name of a derivative, kept next to the original so a prefix listing finds both
+    """
+    return f"{filename}.{size}.{image_format}"
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    pillow_format, _ = VARIANT_FORMATS[image_format]
+    if pillow_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+
+    buffer = BytesIO()
+    if pillow_format == "JPEG":
+        image.save(buffer, format=pillow_format, quality=VARIANT_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, format=pillow_format, quality=VARIANT_QUALITY, method=4)
+    return buffer.getvalue()
+
+def generate_variants(image_bytes: bytes) -> Tuple[Tuple[int, int], List[dict]]:
+    """
+    Resize an uploaded image to every variant size and encode each one as WebP and JPEG
+
+    CPU-bound; run it in the image worker pool. Images are never upscaled, so a
+    size whose edge is not smaller than the previous variant's is skipped.
+
+    :param image_bytes: The original upload
+    :return: ((width, height) of the original, list of variants with their encoded 'data')
+    """
+    with Image.open(BytesIO(image_bytes)) as source:
+        original_size = source.size
+
+        # Let the JPEG decoder downscale by a power of two while decoding
+        largest_edge = max(VARIANT_SIZES.values())
+        source.draft("RGB", (largest_edge, largest_edge))
+
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    variants = []
+    previous_edge = None
+    # Resize from the largest size down, each step starting from the previous result
+    for size, edge in sorted(VARIANT_SIZES.items(), key=lambda item: item[1], reverse=True):
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.LANCZOS)
+        resized_edge = max(resized.size)
+        if previous_edge is not None and resized_edge >= previous_edge:
+            continue
+        previous_edge = resized_edge
+        image = resized
+
+        for image_format, (_, content_type) in VARIANT_FORMATS.items():
+            data = _encode(resized, image_format)
+            variants.append({
+                "size": size,
+                "format": image_format,
+                "content_type": content_type,
+                "width": resized.width,
+                "height": resized.height,
+                "bytes": len(data),
+                "data": data
+            })
+
+    # The smallest sizes were appended last
+    variants.reverse()
+    return original_size, variants
+
+def select_variant(image_data: dict, size: Optional[str], accept: Optional[str]) -> Optional[dict]:
+    """
+    Pick the smallest stored variant that satisfies the requested size and the Accept header
+
+    Returns None when the original should be served: no variants were stored,
+    or size is "original". Variants are compared on their actual longest edge,
+    so a size skipped at upload (the original was already smaller) is served
+    by the largest variant that fits.
+    """
+    if size is not None and size != "original" and size not in VARIANT_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown image size '{size}', expected one of: original, {', '.join(VARIANT_SIZES)}"
+        )
+
+    variants = image_data.get('variants') or []
+    if not variants or size == "original":
+        return None
+
+    requested_edge = VARIANT_SIZES[size or DEFAULT_VARIANT_SIZE]
+    accepted = {"image/jpeg"}
+    if accept and "image/webp" in accept:
+        accepted.add("image/webp")
+
+    candidates = [
+        variant for variant in variants
+        if variant['content_type'] in accepted and max(variant['width'], variant['height']) <= requested_edge
+    ]
+    if not candidates:
+        return None
+
+    # Largest edge up to the requested one, then the fewest bytes
+    best_edge = max(max(variant['width'], variant['height']) for variant in candidates)
+    return min(
+        (variant for variant in candidates if max(variant['width'], variant['height']) == best_edge),
+        key=lambda variant: variant['bytes']
+    )
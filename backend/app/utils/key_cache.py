@@ -0,0 +1,115 @@
+import hashlib
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def key_fingerprint(key_material) -> str:
+    """
+    Return a short, non-reversible identifier for a master key or password.
+    Used as the key id part of the cache key so that two different master keys
+    never share cached derived keys.
+    """
+    if isinstance(key_material, str):
+        key_material = key_material.encode()
+    return hashlib.sha256(key_material).hexdigest()[:16]
+
+
+class DerivedKeyCache:
+    """
+    Bounded, TTL-evicting cache for PBKDF2-derived keys.
+
+    Entries are keyed by (salt, iteration count, key id) and the derived key
+    material is kept in a mutable bytearray so it can be overwritten with zeros
+    when the entry expires, is evicted or the cache is cleared.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: int = 900):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[bytes, int, str], Tuple[bytearray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _zeroize(buffer: bytearray) -> None:
+        """Overwrite key material in place"""
+        for i in range(len(buffer)):
+            buffer[i] = 0
+
+    def _evict(self, cache_key) -> None:
+        buffer, _ = self._entries.pop(cache_key)
+        self._zeroize(buffer)
+        self.evictions += 1
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [k for k, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for cache_key in expired:
+            self._evict(cache_key)
+
+    def get_or_derive(self, salt: bytes, iterations: int, key_id: str, derive: Callable[[], bytes]) -> bytes:
+        """
+        Return the cached derived key for (salt, iterations, key_id), calling
+        derive() and caching the result on a miss.
+        """
+        cache_key = (bytes(salt), iterations, key_id)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return bytes(entry[0])
+            if entry:
+                # Expired entry
+                self._evict(cache_key)
+            self.misses += 1
+
+        # Run the KDF outside the lock so concurrent misses for other keys are not serialized
+        derived = derive()
+
+        with self._lock:
+            self._purge_expired(now)
+            if cache_key not in self._entries:
+                self._entries[cache_key] = (bytearray(derived), now + self.ttl_seconds)
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._evict(oldest_key)
+
+        return derived
+
+    def clear(self) -> None:
+        """Zeroize and drop every cached key"""
+        with self._lock:
+            for cache_key in list(self._entries.keys()):
+                self._evict(cache_key)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else None
+            }
+
+
+# Singleton instance shared by every service that derives keys
+derived_key_cache = DerivedKeyCache(
+    max_entries=settings.KEY_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.KEY_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,54 @@
+from bson import ObjectId
+from fastapi import HTTPException
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Listing fields shown next to a document request
+PROPERTY_SUMMARY_FIELDS = {'_id': 0, 'id': 1, 'location': 1, 'area': 1, 'reference_number': 1}
+# Buyer fields shown next to a document request
+BUYER_SUMMARY_FIELDS = {'name': 1, 'email': 1, 'mobile_number': 1}
+
+async def find_page(collection, query: dict, limit: Optional[int] = None, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of documents in _id order, resuming after cursor
+
+    :param collection: Collection holding ObjectId keyed documents
+    :param query: Filter for the documents
+    :param limit: Page size, or None for every remaining document
+    :param cursor: _id of the last document on the previous page
+    :return: The page, and the cursor for the next page (None on the last page)
+    """
+    if cursor:
+        if not ObjectId.is_valid(cursor):
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+        query = {**query, '_id': {'$gt': ObjectId(cursor)}}
+
+    find = collection.find(query).sort('_id', 1)
+    if limit:
+        # One extra document tells whether another page follows
+        documents = await find.limit(limit + 1).to_list(length=limit + 1)
+        if len(documents) > limit:
+            documents = documents[:limit]
+            return documents, str(documents[-1]['_id'])
+        return documents, None
+
+    return await find.to_list(length=None), None
+
+async def properties_by_id(db, property_ids: Iterable[str], projection: dict = PROPERTY_SUMMARY_FIELDS) -> Dict[str, dict]:
+    """
+    Fetch listings by their id field in one query, keyed by id
+    """
+    ids = list({property_id for property_id in property_ids if property_id})
+    if not ids:
+        return {}
+    properties = await db['properties'].find({'id': {'$in': ids}}, projection).to_list(length=None)
+    return {property_doc['id']: property_doc for property_doc in properties}
+
+async def buyers_by_id(db, buyer_ids: Iterable[str], projection: dict = BUYER_SUMMARY_FIELDS) -> Dict[str, dict]:
+    """
+    Fetch buyers by their string ids in one query, keyed by string id
+    """
+    ids = list({ObjectId(buyer_id) for buyer_id in buyer_ids if buyer_id and ObjectId.is_valid(buyer_id)})
+    if not ids:
+        return {}
+    buyers = await db['buyers'].find({'_id': {'$in': ids}}, projection).to_list(length=None)
+    return {str(buyer['_id']): buyer for buyer in buyers}
@@ -0,0 +1,57 @@
+from fastapi import HTTPException, UploadFile
+from typing import AsyncIterator
+from app.core.config import settings
+
+# Read size used when pulling bytes off an UploadFile
+UPLOAD_READ_CHUNK_SIZE = 256 * 1024
+
+def limit_for_mb(size_mb: int) -> int:
+    """
+    Convert a megabyte limit from settings to bytes
+    """
+    return size_mb * 1024 * 1024
+
+async def iter_upload(upload: UploadFile, max_bytes: int, chunk_size: int = UPLOAD_READ_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Yield an upload in chunks, rejecting it with 413 as soon as it grows past max_bytes
+
+    :param upload: The incoming UploadFile
+    :param max_bytes: Largest accepted size in bytes
+    :param chunk_size: Number of bytes to read per chunk
+    """
+    received = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File {upload.filename} exceeds the {max_bytes // (1024 * 1024)} MB limit"
+            )
+
+        yield chunk
+
+async def read_upload_limited(upload: UploadFile, max_bytes: int) -> bytes:
+    """
+    Read a whole upload into memory, stopping with 413 once it passes max_bytes.
+    Used where the full payload is needed anyway (hashing and encrypting documents).
+    """
+    buffer = bytearray()
+    async for chunk in iter_upload(upload, max_bytes):
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+def max_image_bytes() -> int:
+    """
+    Size limit for image uploads (selfies, profile and property images)
+    """
+    return limit_for_mb(settings.MAX_IMAGE_SIZE_MB)
+
+def max_document_bytes() -> int:
+    """
+    Size limit for property document uploads
+    """
+    return limit_for_mb(settings.MAX_DOCUMENT_SIZE_MB)
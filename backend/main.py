@@ -1,14 +1,56 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routes import auth_routes
 from app.routes import seller_routes
 from app.routes import buyer_routes
+from app.routes import admin_routes
+from app.routes import local_storage_routes
+from app.routes import anchor_routes
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.executors import shutdown_executors
+from app.config.azure_config import init_storage_service, close_storage_service
+from app.config.db import init_database, close_database
+from app.config.indexes import ensure_indexes
+from app.core.keyring import document_keks
+from app.services.key_rotation import key_rotation_job
+from app.blockchain.anchoring import document_anchoring
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown
+    """
+    # Every document upload wraps its data key; refuse to start rather than fail each upload
+    if not document_keks.configured:
+        raise RuntimeError(
+            "DOCUMENT_KEKS is not set; configure at least one key-encryption key "
+            "(see .env.example) before starting the API"
+        )
+    # One pooled storage client for the whole process
+    await init_storage_service()
+    # One pooled MongoDB client for the whole process
+    await init_database()
+    # Declared MongoDB indexes, created if missing
+    await ensure_indexes()
+    # Rewrap document data keys still under a retired key-encryption key
+    key_rotation_job.start()
+    # Drain the on-chain anchoring outbox in the background
+    document_anchoring.start()
+    yield
+    await key_rotation_job.stop()
+    # Queued registrations stay in the outbox for the next worker
+    await document_anchoring.stop()
+    await close_storage_service()
+    close_database()
+    # Stop the crypto and watermark worker pools
+    shutdown_executors()
 
 app = FastAPI(
     title=settings.APP_NAME,
     description="API for secure property registration platform",
-    version=settings.APP_VERSION
+    version=settings.APP_VERSION,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -23,6 +65,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # Pagination cursor on list endpoints
 )
 
 # Include authentication routes
@@ -34,6 +77,16 @@ app.include_router(seller_routes.router, prefix="/seller", tags=["Seller"])
 # Include buyer routes
 app.include_router(buyer_routes.router, prefix="/buyer", tags=["Buyer"])
 
+# Include admin routes
+app.include_router(admin_routes.router, prefix="/admin", tags=["Admin"])
+
+# Include document anchoring verification routes
+app.include_router(anchor_routes.router, prefix="/anchors", tags=["Anchoring"])
+
+# Serve blob URLs issued by the local storage backend
+if settings.STORAGE_BACKEND.lower() == "local":
+    app.include_router(local_storage_routes.router, prefix="/local-storage", tags=["Local Storage"])
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,86 @@
+"""
+End-to-end check of the anchoring outbox against an in-process EVM
+
+Queues registrations through DocumentAnchoringService, drains the outbox with
+the worker's own drain pass, and verifies every document's inclusion proof and
+anchored root. The chain is eth-tester, so no network or funded key is needed;
+MongoDB is the one configured in .env (use a scratch database).
+
+Usage (from the backend directory):
+    pip install "eth-tester[py-evm]"
+    BLOCKCHAIN_PROVIDER=tester python scripts/anchor_outbox_check.py [--documents 50]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.blockchain.anchoring import (  # noqa: E402
+    ANCHOR_OUTBOX_COLLECTION,
+    DocumentAnchoringService
+)
+from app.config.db import get_database  # noqa: E402
+from app.core.config import settings  # noqa: E402
+
+
+async def run(documents: int, batch_size: int):
+    if settings.BLOCKCHAIN_PROVIDER.lower() != "tester":
+        raise SystemExit("Set BLOCKCHAIN_PROVIDER=tester so no transactions reach a real network")
+
+    service = DocumentAnchoringService(
+        window_ms=0,
+        max_batch_size=batch_size,
+        retry_base_seconds=1,
+        retry_max_seconds=1,
+        max_attempts=3,
+        lease_seconds=30,
+        receipt_timeout_seconds=30
+    )
+
+    hashes = {}
+    started = time.perf_counter()
+    for _ in range(documents):
+        document_id = str(uuid.uuid4())
+        hashes[document_id] = hashlib.sha256(os.urandom(64)).hexdigest()
+        receipt = await service.register_document(hashes[document_id], "outbox-check", document_id, datetime.utcnow().isoformat())
+        assert receipt["status"] == "pending"
+    enqueue_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    while await service.drain_once():
+        pass
+    drain_ms = (time.perf_counter() - started) * 1000
+
+    invalid = 0
+    for document_id, document_hash in hashes.items():
+        result = await service.verify_document(document_id, document_hash)
+        if not (result and result["valid"] and result["root_on_chain"]):
+            invalid += 1
+
+    db = await get_database()
+    await db[ANCHOR_OUTBOX_COLLECTION].delete_many({"_id": {"$in": list(hashes)}})
+
+    stats = service.stats()
+    print(f"enqueued {documents} registrations in {enqueue_ms:.1f} ms ({enqueue_ms / documents:.2f} ms each)")
+    print(f"anchored in {stats['batches']} transactions in {drain_ms:.1f} ms, {stats['failed_batches']} failed batches")
+    print(f"verified {documents - invalid}/{documents} documents")
+    if invalid:
+        raise SystemExit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(run(args.documents, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Query counts and latency of the document request listings
+
+Seeds a scratch database with one seller, a set of listings and buyers, and
+--requests document requests, then lists them three ways, counting the
+MongoDB commands each sends:
+
+  per-request   the previous enrichment loop (one listing and one buyer
+                lookup per request)
+  batched       DocumentAccessController.list_document_requests (one $in
+                fetch for listings and one for buyers)
+  paged         the same, walking every page of --page-size
+
+Usage (from the backend directory, against a scratch database):
+    DATABASE_NAME=suresign_bench python scripts/bench_request_listing.py [--requests 300]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from bson import ObjectId
+from pymongo import monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Registered before the shared client is created so it sees every command
+counter = CommandCounter()
+monitoring.register(counter)
+
+from app.config.db import get_database  # noqa: E402
+from app.config.indexes import ensure_indexes  # noqa: E402
+from app.controllers.seller import DocumentAccessController  # noqa: E402
+
+COLLECTIONS = ("properties", "buyers", "document_requests")
+
+
+async def per_request_listing(db, seller_id: str):
+    """The enrichment loop replaced by the batched lookups"""
+    requests = await db['document_requests'].find({'seller_id': seller_id}).to_list(length=None)
+    for request in requests:
+        property_doc = await db['properties'].find_one({'id': request['property_id']})
+        if property_doc:
+            request['property_location'] = property_doc.get('location')
+        buyer_doc = await db['buyers'].find_one({'_id': ObjectId(request['buyer_id'])})
+        if buyer_doc:
+            request['buyer_name'] = buyer_doc.get('name')
+    return requests
+
+
+async def seed(db, seller_id: str, requests: int, listings: int, buyers: int):
+    property_ids = [str(uuid.uuid4()) for _ in range(listings)]
+    await db['properties'].insert_many([
+        {'id': property_id, 'seller_id': seller_id, 'location': f"Plot {index}", 'status': 'LIVE'}
+        for index, property_id in enumerate(property_ids)
+    ])
+    buyer_ids = (await db['buyers'].insert_many([
+        {'name': f"Buyer {index}", 'email': f"bench-{uuid.uuid4().hex}@example.com", 'mobile_number': uuid.uuid4().hex[:12]}
+        for index in range(buyers)
+    ])).inserted_ids
+    await db['document_requests'].insert_many([
+        {'property_id': property_ids[index % listings], 'buyer_id': str(buyer_ids[index % buyers]),
+         'seller_id': seller_id, 'status': 'pending', 'message': ''}
+        for index in range(requests)
+    ])
+
+
+async def measure(label: str, fn):
+    counter.commands.clear()
+    started = time.perf_counter()
+    count = await fn()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    queries = sum(counter.commands[name] for name in ("find", "getMore", "aggregate"))
+    print(f"{label:<13} {count:>8} {queries:>8} {elapsed_ms:>10.1f}")
+
+
+async def run(args):
+    db = await get_database()
+    await ensure_indexes()
+    seller_id = str(ObjectId())
+    await seed(db, seller_id, args.requests, args.listings, args.buyers)
+    token_payload = {'sub': seller_id, 'type': 'seller'}
+    controller = DocumentAccessController()
+
+    async def per_request():
+        return len(await per_request_listing(db, seller_id))
+
+    async def batched():
+        requests, _ = await controller.list_document_requests(token_payload)
+        return len(requests)
+
+    async def paged():
+        total, cursor = 0, None
+        while True:
+            requests, cursor = await controller.list_document_requests(token_payload, args.page_size, cursor)
+            total += len(requests)
+            if not cursor:
+                return total
+
+    try:
+        print(f"{'listing':<13} {'requests':>8} {'queries':>8} {'ms':>10}")
+        await measure("per-request", per_request)
+        await measure("batched", batched)
+        await measure("paged", paged)
+    finally:
+        await db['document_requests'].delete_many({'seller_id': seller_id})
+        await db['properties'].delete_many({'seller_id': seller_id})
+        await db['buyers'].delete_many({'email': {'$regex': '^bench-'}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--listings", type=int, default=20)
+    parser.add_argument("--buyers", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
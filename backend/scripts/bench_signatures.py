@@ -0,0 +1,92 @@
+"""
+Micro-benchmark of the document signature schemes
+
+Compares RSA-2048 PSS (the previous default) with Ed25519 for key generation,
+key loading from PEM, signing and verification, on document sizes between a
+one-page scan and the upload limit (MAX_DOCUMENT_SIZE_MB). Both schemes sign
+the SHA-256 digest of the document, as SigningKeyStore does, so the hash is
+included in the sign/verify timings.
+
+Usage (from the backend directory):
+    python scripts/bench_signatures.py [--iterations 200]
+"""
+import argparse
+import hashlib
+import os
+import statistics
+import time
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+
+DOCUMENT_SIZES = [
+    ("100 KiB", 100 * 1024),
+    ("1 MiB", 1024 * 1024),
+    ("10 MiB", 10 * 1024 * 1024)
+]
+
+_PSS = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+SCHEMES = {
+    "rsa-2048-pss": {
+        "generate": lambda: rsa.generate_private_key(public_exponent=65537, key_size=2048),
+        "sign": lambda key, digest: key.sign(digest, _PSS, hashes.SHA256()),
+        "verify": lambda key, signature, digest: key.verify(signature, digest, _PSS, hashes.SHA256())
+    },
+    "ed25519": {
+        "generate": ed25519.Ed25519PrivateKey.generate,
+        "sign": lambda key, digest: key.sign(digest),
+        "verify": lambda key, signature, digest: key.verify(signature, digest)
+    }
+}
+
+
+def measure(fn, iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": statistics.mean(samples),
+        "p95_ms": samples[int(len(samples) * 0.95) - 1]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    documents = {label: os.urandom(size) for label, size in DOCUMENT_SIZES}
+    rows = []
+
+    for name, scheme in SCHEMES.items():
+        key_iterations = max(args.iterations // 20, 5)
+        rows.append((name, "generate key", "-", measure(scheme["generate"], key_iterations)))
+
+        key = scheme["generate"]()
+        pem = key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        rows.append((name, "load PEM", "-", measure(lambda: serialization.load_pem_private_key(pem, password=None), args.iterations)))
+
+        public_key = key.public_key()
+        for label, document in documents.items():
+            signature = scheme["sign"](key, hashlib.sha256(document).digest())
+            rows.append((name, "sign", label, measure(
+                lambda: scheme["sign"](key, hashlib.sha256(document).digest()), args.iterations
+            )))
+            rows.append((name, "verify", label, measure(
+                lambda: scheme["verify"](public_key, signature, hashlib.sha256(document).digest()), args.iterations
+            )))
+
+    print(f"{'scheme':<14} {'operation':<13} {'document':<9} {'mean ms':>10} {'p95 ms':>10}")
+    for name, operation, label, result in rows:
+        print(f"{name:<14} {operation:<13} {label:<9} {result['mean_ms']:>10.3f} {result['p95_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()